@@ -0,0 +1,264 @@
+"""End-to-end capture benchmark on a simulated scrolling page.
+
+Runs the real capture path (CaptureSession -> CapturePipeline -> FrameStore
+-> streaming PDF) against benchmarks/simulator.SimulatedPage, then times
+each stage on its own. Every scenario runs in a fresh process so peak RSS
+is per scenario. Every scenario must store exactly the page's height (one
+full period for a looping feed), or the run exits with status 1. Results are printed and written as JSON:
+
+    python benchmarks/bench_capture.py --scenario static-1080p --scenario lazy-1080p -o bench.json
+    python benchmarks/bench_capture.py --width 2560 --height 1440 --page-height 60000 --sticky-header 80
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "static-1080p": {"width": 1920, "height": 1080, "page_height": 20000},
+    # Adaptive settle waits up to "delay" for lazy images, so give it room above lazy_delay
+    "lazy-1080p": {"width": 1920, "height": 1080, "page_height": 20000, "lazy_delay": 0.3, "delay": 1.0},
+    "sticky-1440p": {"width": 2560, "height": 1440, "page_height": 30000, "sticky_header": 80},
+    # Navbar plus a cookie banner pinned to the bottom; both should only be stored once. Calibrated,
+    # because the fixed 85% scroll is more than the 896 rows left visible between them
+    "banners-1080p": {"width": 1920, "height": 1080, "page_height": 20000, "sticky_header": 64,
+                      "sticky_footer": 120, "calibrate": True},
+    "long-4k": {"width": 3840, "height": 2160, "page_height": 60000},
+    # Endless feed that starts over every 10 scrolls (918px each); capture should stop on the loop
+    "looping-feed-1080p": {"width": 1920, "height": 1080, "page_height": 9180, "wrap": True},
+    # Scroll distance measured before capture instead of set by hand; 0.6px per click like a high-DPI wheel
+    "calibrated-1080p": {"width": 1920, "height": 1080, "page_height": 20000, "pixels_per_click": 0.6,
+                         "calibrate": True},
+}
+PAGE_OPTIONS = ("width", "height", "page_height", "sticky_header", "lazy_delay", "image_fraction", "image_path",
+                "wrap", "pixels_per_click", "sticky_footer")
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ms = np.asarray(samples) * 1000
+    return {"count": len(samples), "mean_ms": round(float(ms.mean()), 3),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p90_ms": round(float(np.percentile(ms, 90)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3)}
+
+
+class TimedPage:
+    """Wraps a SimulatedPage to record how long each grab and scroll takes."""
+
+    def __init__(self, page):
+        self.page = page
+        self.grab_times = []
+        self.scroll_times = []
+
+    def grab(self, bbox=None):
+        start = time.perf_counter()
+        img = self.page.grab(bbox)
+        self.grab_times.append(time.perf_counter() - start)
+        return img
+
+    def scroll(self, clicks):
+        start = time.perf_counter()
+        self.page.scroll(clicks)
+        self.scroll_times.append(time.perf_counter() - start)
+
+    def screen_size(self):
+        return self.page.screen_size()
+
+
+def time_stages(frames, store):
+    """Time each processing stage on its own over already-grabbed frames."""
+    from page_end import PageEndDetector
+    from stitching import FrameStitcher
+    from pdf_writer import StreamingPdfWriter
+    from core import save_tall_png
+
+    detector, stitcher = PageEndDetector(), FrameStitcher()
+    stages = {"thumbnail": [], "compare": [], "signature": [], "stitch": [], "encode": []}
+    writer = StreamingPdfWriter()
+    for frame in frames:
+        start = time.perf_counter()
+        thumbnail = detector.thumbnail(frame)
+        stages["thumbnail"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        detector.push_thumbnail(thumbnail)
+        stages["compare"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        signature = stitcher.signature(frame)
+        stages["signature"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        stitcher.add(frame, signature)
+        stages["stitch"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        writer.encode_image(frame)
+        stages["encode"].append(time.perf_counter() - start)
+    writer.discard()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        save_tall_png(store, os.path.join(tmp, "tall.png"))
+        stages["tall_png"] = [time.perf_counter() - start]
+    return {name: percentiles(samples) for name, samples in stages.items()}
+
+
+def run_scenario(name, options, delay, max_frames):
+    """Capture one simulated page end to end; runs inside a worker process."""
+    from simulator import SimulatedPage
+    from core import CaptureSession, ScreenSource
+    from frame_store import FrameStore
+    from pdf_writer import StreamingPdfWriter
+
+    page = SimulatedPage(**{key: value for key, value in options.items() if key in PAGE_OPTIONS})
+    timed = TimedPage(page)
+    from calibration import ScrollProfiles
+    calibrate = options.get("calibrate", False)
+    manual_height = 0 if calibrate else int(page.height * 0.85 / page.pixels_per_click)
+    profiles = ScrollProfiles(path=None)  # Calibrate every run instead of reusing the user's profiles
+    source = ScreenSource(delay=options.get("delay", delay), manual_height=manual_height,
+                          adaptive_delay=options.get("lazy_delay", 0) > 0, grabber=timed,
+                          bbox=(0, 0, page.width, page.height), scroller=timed.scroll,
+                          calibrate=calibrate, profiles=profiles)
+    store = FrameStore()
+    writer = StreamingPdfWriter()
+    session = CaptureSession(source, max_frames=max_frames, store=store, pdf_writer=writer,
+                             on_status=lambda message: None)
+
+    start = time.perf_counter()
+    frames = session.run()
+    capture_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "out.pdf")
+        start = time.perf_counter()
+        session.pdf_writer.save_to(output)
+        save_seconds = time.perf_counter() - start
+        pdf_bytes = os.path.getsize(output)
+
+    # Re-grab a handful of viewports for the per-stage timings
+    page.position = 0
+    sample = []
+    for _ in range(min(frames, 12)):
+        sample.append(page.grab())
+        page.scroll(-int(page.height * 0.85 / page.pixels_per_click))
+    stages = time_stages(sample, store)
+    stages["grab"] = percentiles(timed.grab_times)
+    stages["scroll"] = percentiles(timed.scroll_times)
+    stages["save_pdf"] = percentiles([save_seconds])
+
+    stored_height = sum(height for _, height in store.sizes)
+    if max_frames:
+        # A partial capture can't be checked against the page
+        height_ok = None
+    elif page.wrap:
+        # An endless feed has no bottom: one full period, plus at most the part of a screen where it wraps around
+        height_ok = page.page_height <= stored_height < page.page_height + page.height
+    else:
+        height_ok = stored_height == page.page_height
+    result = {
+        "scenario": name, "options": options,
+        "frames": frames, "pages": len(store), "stored_height": stored_height,
+        "page_height": page.page_height, "height_ok": height_ok, "page_end_detected": session.page_end_detected,
+        "loop_detected": session.loop_detected, "duplicates_dropped": session.duplicates,
+        "capture_seconds": round(capture_seconds, 3),
+        "frames_per_second": round(frames / capture_seconds, 2) if capture_seconds else None,
+        "pdf_bytes": pdf_bytes, "peak_rss_bytes": peak_rss_bytes(), "stages": stages,
+    }
+    session.pdf_writer.discard()
+    store.clear()
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the capture path on a simulated page")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Preset to run (repeatable; default: all presets unless custom options are given)")
+    parser.add_argument("--width", type=int)
+    parser.add_argument("--height", type=int)
+    parser.add_argument("--page-height", type=int)
+    parser.add_argument("--sticky-header", type=int)
+    parser.add_argument("--sticky-footer", type=int)
+    parser.add_argument("--lazy-delay", type=float)
+    parser.add_argument("--image-fraction", type=float)
+    parser.add_argument("--image-path", help="Use a tall screenshot instead of a synthetic page")
+    parser.add_argument("--pixels-per-click", type=float)
+    parser.add_argument("--wrap", action="store_true", default=None,
+                        help="Endless page that starts over at the bottom (use with --max-frames)")
+    parser.add_argument("--delay", type=float, default=0.05,
+                        help="Delay (or settle cap) after each scroll, unless the scenario sets its own")
+    parser.add_argument("--max-frames", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    custom = {key: getattr(args, key) for key in PAGE_OPTIONS if getattr(args, key) is not None}
+    runs = [(name, dict(SCENARIOS[name])) for name in (args.scenario or [])]
+    if custom:
+        base = runs or [("custom", dict(SCENARIOS["static-1080p"]))]
+        runs = [(name, dict(options, **custom)) for name, options in base]
+    elif not runs:
+        runs = list(SCENARIOS.items())
+
+    results = []
+    failed = []
+    for name, options in runs:
+        # A fresh process per scenario keeps the peak RSS numbers independent
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(run_scenario, name, options, args.delay, args.max_frames).result()
+        results.append(result)
+        rss = result["peak_rss_bytes"]
+        rss_text = f"{rss / 1024 / 1024:.0f} MB" if rss else "n/a"
+        print(f"{name}: {result['frames']} frames at {result['frames_per_second']} fps, "
+              f"{result['capture_seconds']}s capture, {result['pdf_bytes'] / 1024:.0f} KB PDF, peak RSS {rss_text}")
+        if result["height_ok"] is False:
+            failed.append(name)
+            print(f"    FAILED: stored {result['stored_height']} rows of a {result['page_height']}-row page")
+        for stage, stats in result["stages"].items():
+            if stats:
+                print(f"    {stage:10s} p50 {stats['p50_ms']:8.2f} ms   p90 {stats['p90_ms']:8.2f} ms   "
+                      f"p99 {stats['p99_ms']:8.2f} ms")
+
+    report = {"revision": git_revision(), "python": platform.python_version(), "platform": platform.platform(),
+              "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"Results written to {args.output}")
+    if failed:
+        print(f"Stored height differs from the page in: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Time the streaming tall-image exports on a very tall simulated capture.
+
+Builds a FrameStore of synthetic strips (spilling to disk past a small RAM
+budget, as a long capture would), exports it as one tall PNG and as a
+Deep Zoom pyramid, and reports throughput and how far each export raised
+the peak RSS. Every export runs in a fresh process so the numbers don't
+mix. --canvas also times the old approach of pasting everything into one
+image first, for comparison on heights where that still fits:
+
+    python benchmarks/bench_export.py                        # 200k rows
+    python benchmarks/bench_export.py --height 20000 --canvas
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_capture import peak_rss_bytes
+from bench_pagination import build_store
+
+
+def folder_bytes(path):
+    return sum(os.path.getsize(os.path.join(folder, name)) for folder, _, names in os.walk(path) for name in names)
+
+
+def paste_canvas(store, path):
+    sizes = store.sizes
+    combined = Image.new('RGB', (max(width for width, _ in sizes), sum(height for _, height in sizes)), "white")
+    top = 0
+    for img in store:
+        combined.paste(img, (0, top))
+        top += img.height
+    combined.save(path, format="PNG")
+
+
+def run_export(kind, args):
+    """Build the store and export it once; runs inside a worker process."""
+    from tall_export import export_tall_png, export_deep_zoom
+    store = build_store(args.width, args.height, args.strip_height, args.ram_budget_mb * 1024 * 1024)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            before = peak_rss_bytes() or 0
+            start = time.perf_counter()
+            if kind == "png":
+                path = os.path.join(tmp, "tall.png")
+                export_tall_png(store, path)
+                detail = f"{os.path.getsize(path) / 1024 / 1024:.1f} MB"
+            elif kind == "deep zoom":
+                stats = export_deep_zoom(store, os.path.join(tmp, "tall.dzi"), tile_format=args.tile_format)
+                size = folder_bytes(os.path.join(tmp, "tall_files")) / 1024 / 1024
+                detail = f"{stats['tiles']} tiles, {stats['levels']} levels, {size:.1f} MB"
+            else:
+                path = os.path.join(tmp, "canvas.png")
+                paste_canvas(store, path)
+                detail = f"{os.path.getsize(path) / 1024 / 1024:.1f} MB"
+            seconds = time.perf_counter() - start
+            return seconds, max(0, (peak_rss_bytes() or 0) - before), detail
+    finally:
+        store.clear()
+
+
+def main():
+    from tall_export import TILE_FORMATS, DEFAULT_TILE_FORMAT
+
+    parser = argparse.ArgumentParser(description="Benchmark streaming tall-image export")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=200000, help="Total capture height in pixels")
+    parser.add_argument("--strip-height", type=int, default=1000, help="Height of each stored strip")
+    parser.add_argument("--ram-budget-mb", type=int, default=64)
+    parser.add_argument("--tile-format", choices=sorted(TILE_FORMATS), default=DEFAULT_TILE_FORMAT)
+    parser.add_argument("--canvas", action="store_true", help="Also time pasting into one full-size image")
+    args = parser.parse_args()
+
+    pixels = args.width * args.height
+    print(f"{args.width}x{args.height} in strips of {args.strip_height} rows")
+    for kind in ["png", "deep zoom"] + (["canvas"] if args.canvas else []):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            seconds, growth, detail = pool.submit(run_export, kind, args).result()
+        print(f"{kind:10s} {seconds:6.2f}s  {pixels / seconds / 1e6:7.1f} Mpx/s  "
+              f"peak RSS +{growth / 1024 / 1024:6.0f} MB  {detail}")
+
+
+if __name__ == "__main__":
+    main()
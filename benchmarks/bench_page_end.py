@@ -0,0 +1,108 @@
+"""Micro-benchmark: per-frame page-end check cost, legacy loop vs PageEndDetector.
+
+Run from the repository root:
+    python benchmarks/bench_page_end.py --frames 30 --width 3840 --height 2160
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from page_end import PageEndDetector  # noqa: E402
+
+
+def legacy_check_page_end(img1, img2, scroll_height):
+    """The original CaptureThread.check_page_end, kept verbatim for comparison."""
+    img1 = img1.resize((100, 100)).convert('L')
+    img2 = img2.resize((100, 100)).convert('L')
+
+    pixels1 = list(img1.getdata())
+    pixels2 = list(img2.getdata())
+    diff_pixels = sum(1 for p1, p2 in zip(pixels1, pixels2) if abs(p1 - p2) > 40)
+    similarity = 1 - (diff_pixels / len(pixels1))
+
+    original_height = img2.size[1]
+    scale_factor = original_height / 100
+
+    bottom_diff = 0
+    for y in range(99, -1, -1):
+        row1 = [img1.getpixel((x, y)) for x in range(100)]
+        row2 = [img2.getpixel((x, y)) for x in range(100)]
+        if any(abs(p1 - p2) > 40 for p1, p2 in zip(row1, row2)):
+            bottom_diff = 100 - y
+            break
+
+    remaining_height = (bottom_diff * scale_factor) if bottom_diff > 0 else 0
+
+    return similarity, remaining_height
+
+
+def make_frames(count, width, height, seed=0):
+    """Build frames by sliding a viewport down a random tall page."""
+    rng = np.random.default_rng(seed)
+    step = height * 3 // 4
+    page = rng.integers(0, 256, size=(height + step * count, width // 8, 3), dtype=np.uint8)
+    page = np.repeat(page, 8, axis=1)  # cheap way to get a wide page with some structure
+    return [Image.fromarray(page[i * step:i * step + height]) for i in range(count)]
+
+
+def bench_legacy(frames):
+    timings = []
+    previous = None
+    results = []
+    for frame in frames:
+        start = time.perf_counter()
+        if previous is not None:
+            results.append(legacy_check_page_end(frame, previous, 0))
+        timings.append(time.perf_counter() - start)
+        previous = frame
+    return timings[1:], results
+
+
+def bench_detector(frames):
+    timings = []
+    detector = PageEndDetector()
+    results = []
+    for frame in frames:
+        start = time.perf_counter()
+        result = detector.push(frame)
+        timings.append(time.perf_counter() - start)
+        if result is not None:
+            results.append(result)
+    return timings[1:], results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames, args.width, args.height)
+    legacy_times, legacy_results = bench_legacy(frames)
+    detector_times, detector_results = bench_detector(frames)
+
+    # The detector pre-reduces frames before resampling, so its numbers can
+    # drift by a hair; what matters is that page-end decisions stay the same
+    detector = PageEndDetector()
+    max_delta = 0.0
+    for (s1, r1), (s2, r2) in zip(legacy_results, detector_results):
+        max_delta = max(max_delta, abs(s1 - s2))
+        assert detector.is_page_end(s1, r1) == detector.is_page_end(s2, r2), "page-end decision changed"
+
+    legacy_ms = 1000 * sum(legacy_times) / len(legacy_times)
+    detector_ms = 1000 * sum(detector_times) / len(detector_times)
+    print(f"{args.frames} frames at {args.width}x{args.height}")
+    print(f"legacy check_page_end: {legacy_ms:8.2f} ms/frame")
+    print(f"PageEndDetector.push:  {detector_ms:8.2f} ms/frame")
+    print(f"speedup:               {legacy_ms / detector_ms:8.2f}x")
+    print(f"max similarity delta:  {max_delta:8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Time content-aware pagination on a very tall simulated capture.
+
+Builds a FrameStore of synthetic strips (spilling to disk past a small RAM
+budget, as a long capture would), then reports how long the row-activity
+profile takes, the most memory it allocated, and how many page breaks
+land on busy rows compared with cutting at fixed page heights:
+
+    python benchmarks/bench_pagination.py                         # 100k rows, A4
+    python benchmarks/bench_pagination.py --height 200000 --page-size letter
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_store(width, height, strip_height, ram_budget):
+    from frame_store import FrameStore
+    from simulator import synthetic_page
+    store = FrameStore(ram_budget=ram_budget)
+    for index, top in enumerate(range(0, height, strip_height)):
+        page, _ = synthetic_page(width, min(strip_height, height - top), seed=index)
+        store.append(Image.fromarray(page))
+    return store
+
+
+def main():
+    from pagination import PAPER_SIZES, row_activity, find_breaks, page_height_for
+
+    parser = argparse.ArgumentParser(description="Benchmark content-aware pagination")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=100000, help="Total capture height in pixels")
+    parser.add_argument("--strip-height", type=int, default=1000, help="Height of each stored strip")
+    parser.add_argument("--ram-budget-mb", type=int, default=64)
+    parser.add_argument("--page-size", choices=sorted(PAPER_SIZES), default="a4")
+    args = parser.parse_args()
+
+    store = build_store(args.width, args.height, args.strip_height, args.ram_budget_mb * 1024 * 1024)
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        activity = row_activity(store)
+        profile_seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        page_height = page_height_for(args.width, args.page_size)
+        start = time.perf_counter()
+        pages = find_breaks(activity, page_height)
+        break_seconds = time.perf_counter() - start
+
+        fixed = range(page_height, len(activity), page_height)
+        busy_fixed = sum(1 for row in fixed if activity[row] > 0)
+        busy_chosen = sum(1 for _, bottom in pages[:-1] if activity[bottom] > 0)
+        pixels = args.width * len(activity)
+        print(f"{len(activity)} rows in {len(store)} strips, {args.page_size} pages of {page_height}px")
+        print(f"profile    {profile_seconds:6.2f}s  {pixels / profile_seconds / 1e6:7.1f} Mpx/s  "
+              f"peak {peak / 1024 / 1024:.1f} MB allocated")
+        print(f"breaks     {break_seconds * 1000:6.1f} ms  {len(pages)} pages")
+        print(f"cuts through content: fixed height {busy_fixed}/{len(fixed)}, "
+              f"content-aware {busy_chosen}/{len(pages) - 1}")
+    finally:
+        store.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the PDF output profiles on the same frames.
+
+Encodes every frame with each profile in pdf_writer.PROFILES, plus the old
+"Pillow save_all" path as a baseline, and reports file size, encode time
+and which encoder each profile chose:
+
+    python benchmarks/bench_profiles.py                      # simulated text + photo page
+    python benchmarks/bench_profiles.py --frames recorded/   # a folder of captured frames
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_frames(args):
+    if args.frames:
+        from core import DirectorySource
+        return list(DirectorySource(args.frames).frames(on_status=lambda message: None))
+    from simulator import synthetic_page
+    page, _ = synthetic_page(args.width, args.height * args.count, image_fraction=args.image_fraction)
+    frames = [Image.fromarray(page[top:top + args.height]) for top in range(0, page.shape[0], args.height)]
+    # A repeated frame, as when the page end is reached twice
+    return frames + frames[-1:]
+
+
+def pillow_baseline(frames, path):
+    start = time.perf_counter()
+    rgb = [img.convert('RGB') for img in frames]
+    rgb[0].save(path, save_all=True, append_images=rgb[1:], resolution=100.0)
+    return time.perf_counter() - start
+
+
+def main():
+    from pdf_writer import StreamingPdfWriter, PROFILES
+
+    parser = argparse.ArgumentParser(description="Compare PDF output profiles")
+    parser.add_argument("--frames", help="Folder of frame images (default: a simulated page)")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--count", type=int, default=12, help="Simulated frames")
+    parser.add_argument("--image-fraction", type=float, default=0.3)
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    print(f"{len(frames)} frames")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "baseline.pdf")
+        seconds = pillow_baseline(frames, path)
+        print(f"{'pillow':10s} {os.path.getsize(path) / 1024:9.0f} KB  {seconds:6.2f}s")
+        for name in PROFILES:
+            writer = StreamingPdfWriter(os.path.join(tmp, f"{name}.pdf"), profile=name)
+            for img in frames:
+                writer.add_page(img)
+            writer.close()
+            stats = writer.stats()
+            encoders = ", ".join(f"{encoder} {count}" for encoder, count in sorted(stats["encoders"].items()))
+            print(f"{name:10s} {stats['bytes'] / 1024:9.0f} KB  {stats['encode_seconds']:6.2f}s  "
+                  f"{stats['deduplicated']} shared  ({encoders})")
+
+
+if __name__ == "__main__":
+    main()
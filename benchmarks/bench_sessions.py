@@ -0,0 +1,90 @@
+"""Capture several simulated windows at once and compare with capturing them one after another.
+
+Each window is a SimulatedPage on a SimulatedDesktop: they share one focus
+and mouse wheel, so every scroll has to go through the scheduler's input
+arbiter, while settle waits, grabs, stitching and PDF encoding of the
+sessions overlap. Checks that every session stored exactly its own page:
+
+    python benchmarks/bench_sessions.py                    # 4 windows
+    python benchmarks/bench_sessions.py --windows 8 --delay 0.3 --focus-delay 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def capture(args, concurrent):
+    """Capture args.windows fresh pages; returns (scheduler stats, results, pages)."""
+    from calibration import ScrollProfiles
+    from scheduler import SessionScheduler
+    from simulator import SimulatedDesktop, SimulatedPage
+
+    desktop = SimulatedDesktop(focus_delay=args.focus_delay)
+    pages = [SimulatedPage(width=args.width, height=args.height, page_height=args.page_height, seed=index,
+                           lazy_delay=args.lazy_delay)
+             for index in range(args.windows)]
+    source = {"type": "screen", "delay": args.delay, "scroll_height": int(args.height * 0.85),
+              "adaptive_delay": args.lazy_delay > 0, "calibrate": False}
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = [(dict(source=source, name=f"window {index}", output=os.path.join(tmp, f"window-{index}.pdf"),
+                      workers=args.workers), desktop.window(page, f"window {index}"))
+                for index, page in enumerate(pages)]
+        quiet = lambda progress: None
+        profiles = ScrollProfiles(path=None)
+        if concurrent:
+            scheduler = SessionScheduler(on_update=quiet, profiles=profiles)
+            for job, target in jobs:
+                scheduler.add(job, target)
+            results = scheduler.run()
+            return scheduler.stats(), results, pages
+        stats, results = {"seconds": 0.0, "focus_switches": 0}, []
+        for job, target in jobs:
+            scheduler = SessionScheduler(on_update=quiet, profiles=profiles)
+            scheduler.add(job, target)
+            results += scheduler.run()
+            stats["seconds"] += scheduler.stats()["seconds"]
+            stats["focus_switches"] += scheduler.stats()["focus_switches"]
+        return stats, results, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent capture sessions on simulated windows")
+    parser.add_argument("--windows", type=int, default=4)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--page-height", type=int, default=12000)
+    parser.add_argument("--delay", type=float, default=0.2, help="Delay (or settle cap) after each scroll")
+    parser.add_argument("--lazy-delay", type=float, default=0.0, help="Lazy image delay; enables settle waits")
+    parser.add_argument("--focus-delay", type=float, default=0.01, help="Seconds a window switch takes")
+    parser.add_argument("--workers", type=int, default=1, help="Pipeline worker threads per session")
+    args = parser.parse_args()
+
+    print(f"{args.windows} windows of {args.width}x{args.height}, pages {args.page_height}px tall, "
+          f"{args.delay}s delay")
+    timings = {}
+    for mode, concurrent in (("sequential", False), ("concurrent", True)):
+        stats, results, pages = capture(args, concurrent)
+        failed = [result for result in results if "error" in result]
+        wrong = [result["output"] for result, page in zip(results, pages)
+                 if "error" not in result and result["height"] != page.page_height]
+        frames = sum(result.get("frames", 0) for result in results)
+        timings[mode] = stats["seconds"]
+        line = (f"{mode:10s} {stats['seconds']:6.2f}s  {frames} frames  {frames / stats['seconds']:5.1f} fps  "
+                f"{stats['focus_switches']} focus switches")
+        if "input_wait_seconds" in stats:
+            line += f", {stats['input_wait_seconds']:.2f}s waiting for the input"
+        print(line)
+        for result in failed:
+            print(f"    FAILED {result['output']}: {result['error']}")
+        if wrong:
+            print(f"    WRONG HEIGHT: {', '.join(os.path.basename(output) for output in wrong)}")
+    print(f"speed-up {timings['sequential'] / timings['concurrent']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Check that settle waits don't capture lazy-loading placeholders.
+
+Captures simulated pages whose images only load lazy_delay seconds after
+they scroll into view, with the adaptive settle wait and with a fixed
+delay, and compares what was stored with the real page: its height and how
+many pixels differ (placeholders captured instead of images). Exits with
+status 1 if any capture is off, so settle regressions fail loudly:
+
+    python benchmarks/bench_settle.py
+    python benchmarks/bench_settle.py --lazy-delay 0.1 --lazy-delay 0.3 --delay 1.5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def capture(args, lazy_delay, adaptive):
+    """Capture one lazy page; returns (seconds, stored height, page height, differing pixels)."""
+    from core import CaptureSession, ScreenSource
+    from frame_store import FrameStore
+    from simulator import SimulatedPage
+
+    page = SimulatedPage(width=args.width, height=args.height, page_height=args.page_height, lazy_delay=lazy_delay)
+    source = ScreenSource(delay=args.delay, manual_height=int(page.height * 0.85), adaptive_delay=adaptive,
+                          grabber=page, bbox=(0, 0, page.width, page.height), scroller=page.scroll)
+    store = FrameStore()
+    session = CaptureSession(source, store=store, on_status=lambda message: None)
+    start = time.perf_counter()
+    session.run()
+    seconds = time.perf_counter() - start
+    try:
+        stored = np.concatenate([np.asarray(img.convert('RGB')) for img in store])
+    finally:
+        store.clear()
+    rows = min(len(stored), page.page_height)
+    differing = int((stored[:rows] != page.page[:rows]).any(axis=2).sum())
+    return seconds, len(stored), page.page_height, differing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check settle waits against lazy-loading pages")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--page-height", type=int, default=10000)
+    parser.add_argument("--lazy-delay", type=float, action="append",
+                        help="Seconds until images load (repeatable; default: 0.1, 0.2 and 0.3)")
+    parser.add_argument("--delay", type=float, default=1.0, help="Fixed delay, and the cap of the adaptive wait")
+    args = parser.parse_args()
+
+    failed = False
+    for lazy_delay in args.lazy_delay or [0.1, 0.2, 0.3]:
+        for mode, adaptive in (("adaptive", True), ("fixed", False)):
+            seconds, stored_height, page_height, differing = capture(args, lazy_delay, adaptive)
+            ok = stored_height == page_height and not differing
+            failed = failed or not ok
+            print(f"lazy {lazy_delay:.2f}s  {mode:8s} {seconds:6.2f}s  {stored_height}/{page_height} rows  "
+                  f"{differing} pixels differ  {'ok' if ok else 'FAILED'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""A fake browser viewport over a tall synthetic (or loaded) page.
+
+SimulatedPage stands in for both ImageGrab.grab and pyautogui.scroll, so the
+whole capture path can run without a screen, a browser or a mouse.
+"""
+import time
+
+import numpy as np
+from PIL import Image
+
+PLACEHOLDER = 235  # gray box shown where a lazy image hasn't loaded yet
+
+
+def synthetic_page(width, height, seed=0, image_fraction=0.3):
+    """Build a page of text-like lines with photo-like blocks mixed in.
+
+    Returns the page array and the list of (top, bottom, left, right) image blocks.
+    """
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    blocks = []
+    y = 20
+    while y < height - 400:
+        if rng.random() < image_fraction:
+            block_height = int(rng.integers(150, 400))
+            left = int(rng.integers(20, width // 4))
+            right = int(rng.integers(width // 2, width - 20))
+            # Smooth gradient plus noise, so it compresses like a photo rather than like text
+            gradient = np.linspace(0, 255, right - left, dtype=np.float32)
+            block = (gradient[None, :, None] * rng.random(3)[None, None, :]
+                     + rng.normal(0, 18, (block_height, right - left, 3)))
+            page[y:y + block_height, left:right] = np.clip(block, 0, 255).astype(np.uint8)
+            blocks.append((y, y + block_height, left, right))
+            y += block_height + int(rng.integers(20, 60))
+        else:
+            line_height = int(rng.integers(12, 22))
+            right = int(rng.integers(width // 3, width - 40))
+            # Alternating dark runs approximate glyphs on a line of text
+            runs = rng.integers(0, 2, size=(right - 40) // 6).repeat(6)
+            line = np.where(runs[None, :] > 0, 30, 255).astype(np.uint8)
+            page[y:y + line_height, 40:40 + line.shape[1]] = line[:, :, None]
+            y += line_height + int(rng.integers(6, 30))
+    return page, blocks
+
+
+def fixed_bar(width, height, color, seed=0):
+    """A navigation bar or cookie banner: a flat colour with a line of link-like text."""
+    rng = np.random.default_rng(seed)
+    bar = np.empty((height, width, 3), dtype=np.uint8)
+    bar[:] = color
+    if height >= 24:
+        runs = rng.integers(0, 2, size=(width - 80) // 8).repeat(8)
+        text = 255 - np.asarray(color, dtype=np.uint8)
+        middle = height // 2
+        bar[middle - 6:middle + 6, 40:40 + runs.size][:, runs > 0] = text
+    return bar
+
+
+class SimulatedPage:
+    """Viewport over a tall page that scrolls, sticks a header (and footer) and lazy-loads images.
+
+    grab() mirrors ImageGrab.grab(bbox=...), scroll() mirrors pyautogui.scroll
+    (negative clicks scroll down, one click = pixels_per_click pixels).
+    Image blocks stay as gray placeholders until lazy_delay seconds after
+    they first came into view. With wrap set the page never ends: scrolling
+    past the bottom starts over at the top, like a feed recycling its items.
+    """
+
+    def __init__(self, width=1920, height=1080, page_height=20000, sticky_header=0, lazy_delay=0.0,
+                 image_fraction=0.3, image_path=None, pixels_per_click=1.0, seed=0, wrap=False, sticky_footer=0):
+        self.width = width
+        self.height = height
+        self.sticky_header = sticky_header
+        self.sticky_footer = sticky_footer
+        self.lazy_delay = lazy_delay
+        self.pixels_per_click = pixels_per_click
+        self.wrap = wrap
+        if image_path:
+            img = Image.open(image_path).convert('RGB')
+            img = img.resize((width, max(height, int(img.height * width / img.width))))
+            self.page, self.blocks = np.asarray(img), []
+        else:
+            self.page, self.blocks = synthetic_page(width, max(page_height, height), seed, image_fraction)
+        self.header = fixed_bar(width, sticky_header, (40, 60, 90), seed + 1)
+        self.footer = fixed_bar(width, sticky_footer, (250, 240, 200), seed + 2)
+        self.position = 0
+        self.seen_at = {}
+        self.grab_count = 0
+        self.scroll_count = 0
+        self._mark_visible()
+
+    @property
+    def page_height(self):
+        return self.page.shape[0]
+
+    @property
+    def at_bottom(self):
+        return not self.wrap and self.position >= self.page_height - self.height
+
+    def _mark_visible(self):
+        now = time.perf_counter()
+        for index, (top, bottom, _, _) in enumerate(self.blocks):
+            if index not in self.seen_at and bottom > self.position and top < self.position + self.height:
+                self.seen_at[index] = now
+
+    def scroll(self, clicks):
+        self.scroll_count += 1
+        self.position += int(round(-clicks * self.pixels_per_click))
+        if self.wrap:
+            self.position %= self.page_height
+        else:
+            self.position = max(0, min(self.position, self.page_height - self.height))
+        self._mark_visible()
+
+    def screen_size(self):
+        return self.width, self.height
+
+    def viewport(self):
+        if self.wrap:
+            view = self.page.take(range(self.position, self.position + self.height), axis=0, mode="wrap")
+        else:
+            view = self.page[self.position:self.position + self.height].copy()
+        if self.lazy_delay > 0:
+            now = time.perf_counter()
+            for index, seen in self.seen_at.items():
+                if now - seen >= self.lazy_delay:
+                    continue
+                top, bottom, left, right = self.blocks[index]
+                top, bottom = max(top - self.position, 0), min(bottom - self.position, self.height)
+                if bottom > top:
+                    view[top:bottom, left:right] = PLACEHOLDER
+        if self.sticky_header:
+            view[:self.sticky_header] = self.header
+        if self.sticky_footer:
+            view[-self.sticky_footer:] = self.footer
+        return view
+
+    def grab(self, bbox=None):
+        self.grab_count += 1
+        img = Image.fromarray(self.viewport())
+        return img.crop(bbox) if bbox else img
+
+
+class SimulatedDesktop:
+    """Several SimulatedPages side by side, sharing one focus and mouse wheel like real windows.
+
+    window(page) returns a capture target (see targets.py) for the page:
+    focus() makes it the window scrolls go to, after focus_delay seconds
+    for the window manager, and scroll() goes to whichever page has focus,
+    so a scheduler that forgets to refocus scrolls the wrong page.
+    """
+
+    def __init__(self, focus_delay=0.01):
+        self.focus_delay = focus_delay
+        self.focused = None
+        self.focus_count = 0
+
+    def window(self, page, name=None):
+        return SimulatedWindow(self, page, name)
+
+
+class SimulatedWindow:
+    """Capture target for one page of a SimulatedDesktop; the page is also its grabber."""
+
+    def __init__(self, desktop, page, name=None):
+        self.desktop = desktop
+        self.page = page
+        self.name = name or f"window {id(page):x}"
+        self.bbox = (0, 0, page.width, page.height)
+        self.grabber = page
+
+    def focus(self):
+        time.sleep(self.desktop.focus_delay)
+        self.desktop.focused = self.page
+        self.desktop.focus_count += 1
+
+    def scroll(self, clicks):
+        if self.desktop.focused is not None:
+            self.desktop.focused.scroll(clicks)
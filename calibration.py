@@ -0,0 +1,129 @@
+"""Measure how far one scroll click really moves the page, and remember it.
+
+The fixed default scroll heights only fit one DPI, browser and OS wheel
+setting. Calibration scrolls down by a probe amount, measures the pixel
+displacement between a grab before and after with the stitcher's offset
+estimate, scrolls back, and picks the number of clicks that leaves
+TARGET_OVERLAP of the frame shared between neighbouring frames: enough for
+stitching to line them up, and as few frames as possible.
+
+Results are cached in a small JSON file keyed by screen size, capture
+region and browser, so later captures on the same setup skip the probe.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from grabbers import find_content_bbox
+
+PROFILES_PATH = os.path.join(tempfile.gettempdir(), "scroll2pdf-scroll-profiles.json")
+# Share of each frame that should also be on the next one
+TARGET_OVERLAP = 0.12
+# First probe, in scroll clicks; doubled while the page doesn't move, halved while frames don't overlap
+PROBE_CLICKS = 240
+MAX_PROBES = 5
+# Never let a probe scroll further than this share of the frame, so before and after still overlap
+MAX_PROBE_SHARE = 0.6
+
+
+def browser_name(title):
+    """Which known browser a window title belongs to, or "unknown"."""
+    from window_prep import BROWSER_TITLES
+    for browser in BROWSER_TITLES:
+        if title and browser in title:
+            return browser
+    return "unknown"
+
+
+def profile_key(screen_size, bbox, browser):
+    """Cache key for one display, capture region and browser."""
+    screen = f"{screen_size[0]}x{screen_size[1]}"
+    region = ",".join(str(value) for value in bbox) if bbox else "full"
+    return f"{screen}|{region}|{browser or 'unknown'}"
+
+
+def measure_scroll(grab, scroll, bbox, clicks, delay):
+    """Scroll down by clicks and back; return (pixels the content moved or None, content height).
+
+    Static toolbars, the scrollbar and fixed headers or footers are cropped
+    away first so they can't spoil the overlap check, and don't count as
+    content height.
+    """
+    from sticky import static_bands, crop_bands
+    from stitching import row_signature, estimate_offset
+    before = grab(bbox)
+    scroll(-clicks)
+    time.sleep(delay)
+    after = grab(bbox)
+    scroll(clicks)
+    time.sleep(delay)
+    box = find_content_bbox(before, after)
+    before_signature, after_signature = row_signature(before.crop(box)), row_signature(after.crop(box))
+    bands = static_bands(before_signature, after_signature) or (0, 0)
+    before_signature, after_signature = crop_bands(before_signature, bands), crop_bands(after_signature, bands)
+    return estimate_offset(before_signature, after_signature), len(after_signature)
+
+
+def calibrate(grab, scroll, bbox, delay, on_status=print, overlap=TARGET_OVERLAP,
+              probe=PROBE_CLICKS, max_probes=MAX_PROBES):
+    """Return a profile dict with pixels_per_click and scroll_height (clicks), or None if nothing moved."""
+    on_status("Calibrating scroll distance...")
+    for _ in range(max_probes):
+        offset, frame_height = measure_scroll(grab, scroll, bbox, probe, delay)
+        if offset is None:
+            # Scrolled too far for the grabs to overlap, or the page changed under us
+            probe = max(1, probe // 2)
+            continue
+        if offset == 0:
+            probe *= 2
+            continue
+        pixels_per_click = offset / probe
+        if offset > frame_height * MAX_PROBE_SHARE:
+            # Measured fine, but check again with a probe that stays well inside the frame
+            probe = max(1, int(frame_height * MAX_PROBE_SHARE / 2 / pixels_per_click))
+            continue
+        clicks = max(1, int(frame_height * (1 - overlap) / pixels_per_click))
+        on_status(f"Calibrated scroll: {pixels_per_click:.3f}px per click, {clicks} clicks per frame")
+        return {"pixels_per_click": pixels_per_click, "scroll_height": clicks, "frame_height": frame_height,
+                "overlap": overlap, "measured": time.time()}
+    on_status("Scroll calibration failed - the page did not move measurably")
+    return None
+
+
+class ScrollProfiles:
+    """Calibration results by profile_key(), kept in one JSON file (only in memory if path is None)."""
+
+    def __init__(self, path=PROFILES_PATH):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if not self.path:
+            return self.entries
+        try:
+            with open(self.path, "r", encoding="utf-8") as profiles_file:
+                return json.load(profiles_file)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        with self.lock:
+            return self._load().get(key)
+
+    def put(self, key, profile):
+        with self.lock:
+            profiles = self._load()
+            profiles[key] = profile
+            if not self.path:
+                return
+            try:
+                temp = self.path + ".tmp"
+                with open(temp, "w", encoding="utf-8") as profiles_file:
+                    json.dump(profiles, profiles_file, indent=2)
+                os.replace(temp, self.path)
+            except OSError as e:
+                print(f"Could not save scroll profile: {str(e)}")
+
@@ -0,0 +1,176 @@
+"""Command-line entry point for running captures without the GUI.
+
+    python cli.py process FRAMES_DIR -o out.pdf
+    python cli.py run jobs.json --processes 4
+    python cli.py capture -o out.pdf --max-scrolls 20 --session sessions/long-page
+    python cli.py resume sessions/long-page
+
+A jobs file is a JSON list of job specs (or {"jobs": [...]}), e.g.
+    [{"source": "archive/session-01", "output": "out/session-01.pdf"},
+     {"source": {"type": "directory", "path": "archive/session-02"},
+      "output": "out/session-02.png", "stitch": false}]
+
+Screen jobs that each name a "window" (part of its title), "monitor" or
+"bbox" are captured at the same time, taking turns with the mouse wheel:
+    [{"source": {"type": "screen", "window": "Docs - Firefox"}, "output": "docs.pdf"},
+     {"source": {"type": "screen", "window": "Issues - Chrome"}, "output": "issues.pdf"}]
+"""
+import argparse
+import json
+import sys
+
+from core import run_job, run_jobs, OUTPUT_FORMATS
+from journal import is_session, load_settings
+from ocr import DEFAULT_LANG
+from pagination import PAGE_SIZES, DEFAULT_PAGE_SIZE
+from pdf_writer import PROFILES, DEFAULT_PROFILE, format_stats
+from tall_export import TILE_FORMATS, DEFAULT_TILE_FORMAT
+
+
+def print_result(result):
+    if "error" in result:
+        print(f"FAILED {result['output']}: {result['error']}")
+    else:
+        print(f"{result['output']}: {result['pages']} pages from {result['frames']} frames, "
+              f"{result['height']}px tall, {result['bytes'] / 1024:.0f} KB in {result['seconds']:.1f}s")
+        timings = [f"{key[:-3]} {value:.1f} ms" for key, value in result.get("per_frame", {}).items()
+                   if key.endswith("_ms")]
+        if timings:
+            print("    per frame: " + ", ".join(timings))
+        if result.get("duplicates_dropped") or result.get("loop_detected"):
+            print(f"    {result['duplicates_dropped']} repeated frames dropped"
+                  + (", stopped on a content loop" if result["loop_detected"] else ""))
+        if result.get("pdf"):
+            print("    " + format_stats(result["pdf"]))
+        if "tiles" in result:
+            print(f"    Deep Zoom: {result['tiles']} tiles in {result['levels']} levels")
+        if "ocr_frames" in result:
+            print(f"    OCR: {result['ocr_frames']} frames recognised, {result['ocr_cached']} from cache")
+
+
+def load_jobs(path):
+    with open(path, "r", encoding="utf-8") as jobs_file:
+        jobs = json.load(jobs_file)
+    if isinstance(jobs, dict):
+        jobs = jobs["jobs"]
+    return jobs
+
+
+def add_processing_options(parser):
+    parser.add_argument("-o", "--output", required=True, help="Output file (.pdf, .png or .dzi)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Output format (default: from file name)")
+    parser.add_argument("--tile-format", choices=sorted(TILE_FORMATS), default=DEFAULT_TILE_FORMAT,
+                        help="Image format of Deep Zoom (.dzi) tiles")
+    parser.add_argument("--no-stitch", action="store_true", help="Keep whole frames instead of trimming overlap")
+    parser.add_argument("--no-end-detection", action="store_true", help="Don't stop at a detected page end")
+    parser.add_argument("--trace", help="Append per-frame stage timings to this JSON-lines file")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="Keep frames that repeat an earlier frame of the session")
+    parser.add_argument("--keep-sticky", action="store_true",
+                        help="Keep fixed headers and footers in every frame instead of cropping them")
+    parser.add_argument("--no-loop-stop", action="store_true",
+                        help="Don't stop when the page keeps repeating earlier frames")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="PDF size/quality trade-off (default: %(default)s)")
+    parser.add_argument("--ocr", nargs="?", const=DEFAULT_LANG, metavar="LANG",
+                        help="Searchable PDF: add an invisible OCR text layer (Tesseract language, "
+                             "default: %(const)s)")
+    parser.add_argument("--ocr-processes", type=int, help="OCR worker processes (default: one per CPU)")
+    parser.add_argument("--session", help="Persist the capture to this directory so it can be resumed")
+    parser.add_argument("--page-size", choices=PAGE_SIZES, default=DEFAULT_PAGE_SIZE,
+                        help="PDF pages: one per frame, or paper-shaped pages broken at blank rows "
+                             "(default: %(default)s)")
+
+
+def job_from_args(args, source):
+    return {
+        "source": source,
+        "output": args.output,
+        "format": args.format,
+        "stitch": not args.no_stitch,
+        "detect_end": not args.no_end_detection,
+        "trace": args.trace,
+        "profile": args.profile,
+        "drop_duplicates": not args.keep_duplicates,
+        "stop_on_loop": not args.no_loop_stop,
+        "remove_sticky": not args.keep_sticky,
+        "page_size": args.page_size,
+        "session": args.session,
+        "ocr": args.ocr,
+        "ocr_processes": args.ocr_processes,
+        "tile_format": args.tile_format,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scroll2Pdf without the GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    process = commands.add_parser("process", help="Stitch a folder of recorded frames into one output")
+    process.add_argument("frames", help="Folder of frame images, processed in file name order")
+    add_processing_options(process)
+
+    run = commands.add_parser("run", help="Run every job in a JSON jobs file")
+    run.add_argument("jobs", help="Path to the jobs file")
+    run.add_argument("--processes", type=int, help="Worker processes (default: one per CPU)")
+
+    capture = commands.add_parser("capture", help="Capture the screen live, like the Start button")
+    add_processing_options(capture)
+    capture.add_argument("--delay", type=float, default=0.5, help="Seconds to wait after each scroll")
+    capture.add_argument("--max-scrolls", type=int, default=10, help="0 = until the page ends")
+    capture.add_argument("--scroll-height", type=int, default=0, help="Pixels per scroll (0 = default)")
+    capture.add_argument("--fullscreen", action="store_true", help="Browser is already in fullscreen")
+    capture.add_argument("--fixed-delay", action="store_true", help="Always sleep the full delay")
+    capture.add_argument("--no-calibrate", action="store_true",
+                         help="Use the fixed default scroll height instead of measuring it")
+    capture.add_argument("--recalibrate", action="store_true",
+                         help="Measure the scroll distance again even if a profile is cached")
+    capture.add_argument("--browser", help="Browser name for the cached calibration profile (e.g. Firefox)")
+    target = capture.add_mutually_exclusive_group()
+    target.add_argument("--window", help="Capture the window whose title contains this text")
+    target.add_argument("--monitor", type=int, help="Capture this monitor (1 = primary)")
+
+    resume = commands.add_parser("resume", help="Continue an interrupted --session capture with its settings")
+    resume.add_argument("session", help="Session directory")
+    resume.add_argument("-o", "--output", help="Output file (default: the session's)")
+    resume.add_argument("--max-scrolls", type=int, help="Frames to add in this run (0 = until the page ends)")
+    resume.add_argument("--from-top", action="store_true",
+                        help="The browser was reloaded: scroll back down past the frames already taken")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_jobs(load_jobs(args.jobs), processes=args.processes)
+    else:
+        if args.command == "resume":
+            if not is_session(args.session):
+                print(f"FAILED {args.session}: not a session directory")
+                return 1
+            job = dict(load_settings(args.session), session=args.session)
+            job["output"] = args.output or job["output"]
+            if args.max_scrolls is not None:
+                job["max_frames"] = args.max_scrolls
+            if isinstance(job["source"], dict):
+                job["source"] = dict(job["source"], resume_from_top=args.from_top)
+            args.output = job["output"]
+        elif args.command == "process":
+            job = job_from_args(args, args.frames)
+        else:
+            job = job_from_args(args, {"type": "screen", "delay": args.delay, "scroll_height": args.scroll_height,
+                                       "fullscreen": args.fullscreen, "adaptive_delay": not args.fixed_delay,
+                                       "calibrate": not args.no_calibrate, "recalibrate": args.recalibrate,
+                                       "browser": args.browser, "window": args.window,
+                                       "monitor": args.monitor})
+            job["max_frames"] = args.max_scrolls
+        try:
+            results = [run_job(job)]
+        except Exception as e:
+            results = [{"output": args.output, "error": str(e)}]
+
+    for result in results:
+        print_result(result)
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,463 @@
+"""GUI-free capture core shared by the Qt app and the command line.
+
+Nothing here imports Qt, and pyautogui is only imported once a live screen
+source is used, so recorded sessions can be processed without a display.
+"""
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from calibration import ScrollProfiles, calibrate, profile_key
+from frame_store import FrameStore
+from grabbers import make_grabber, find_content_bbox
+from journal import SessionJournal, is_session
+from metrics import MetricsRecorder
+from ocr import OcrEngine, DEFAULT_LANG
+from pagination import PAGE_SIZES, DEFAULT_PAGE_SIZE, write_pages
+from pdf_writer import StreamingPdfWriter, DEFAULT_PROFILE
+from pipeline import CapturePipeline
+from settle import SettleWaiter
+from tall_export import export_tall_png, export_deep_zoom, DEFAULT_TILE_FORMAT
+from targets import make_target
+
+FULLSCREEN_SCROLL_HEIGHT = 1300
+WINDOWED_SCROLL_HEIGHT = 1245
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+OUTPUT_FORMATS = ("pdf", "png", "dzi")
+
+
+def _status(message):
+    print(message)
+
+
+class ScreenSource:
+    """Live frames: grab the screen (or a region of it), scroll, wait, repeat.
+
+    After resume() the first frame is taken one scroll further down, where
+    an interrupted capture would have continued. With resume_from_top the
+    browser is assumed to be back at the top of the page (reloaded after a
+    crash), and every scroll of the earlier run is repeated first.
+
+    With calibrate and no manual height, the scroll distance is measured
+    before the first frame (see calibration.py) unless a profile for this
+    screen, region and browser is already cached in profiles.
+    """
+
+    def __init__(self, delay=0.5, manual_height=0, is_fullscreen=False, adaptive_delay=False,
+                 grabber=None, bbox=None, auto_trim=False, scroller=None, resume_from_top=False,
+                 calibrate=False, browser=None, profiles=None, recalibrate=False):
+        self.delay = delay
+        self.manual_height = manual_height
+        self.is_fullscreen = is_fullscreen
+        self.adaptive_delay = adaptive_delay
+        self.grabber = grabber or make_grabber()
+        self.bbox = bbox  # Screen region to capture; None = whole screen
+        self.auto_trim = auto_trim
+        self.scroller = scroller  # callable(clicks) like pyautogui.scroll; None = the real mouse wheel
+        self.resume_from_top = resume_from_top
+        self.calibrate = calibrate
+        self.browser = browser  # Browser name for the profile key, see calibration.browser_name()
+        self.profiles = profiles
+        self.recalibrate = recalibrate  # Measure again even if a profile is cached
+        self.skip_scrolls = 0
+
+    def resume(self, pulled):
+        """Continue after the pulled frames an earlier run already took."""
+        self.skip_scrolls = pulled if self.resume_from_top else 1
+
+    def scroll(self, clicks):
+        if self.scroller is None:
+            import pyautogui
+            self.scroller = pyautogui.scroll
+        self.scroller(clicks)
+
+    def screen_bbox(self):
+        if self.bbox:
+            return self.bbox
+        return (0, 0) + tuple(self.grabber.screen_size())
+
+    def scroll_height(self, on_status):
+        if self.manual_height > 0:
+            on_status(f"Using manual height: {self.manual_height}px")
+            return self.manual_height
+        mode = "fullscreen" if self.is_fullscreen else "non-fullscreen"
+        height = FULLSCREEN_SCROLL_HEIGHT if self.is_fullscreen else WINDOWED_SCROLL_HEIGHT
+        on_status(f"Using default {mode} height: {height}px")
+        return height
+
+    def calibrated_height(self, scroll_height, on_status):
+        """Scroll clicks per frame from the cached or a freshly measured profile; scroll_height if that fails."""
+        if self.profiles is None:
+            self.profiles = ScrollProfiles()
+        key = profile_key(self.grabber.screen_size(), self.bbox, self.browser)
+        profile = None if self.recalibrate else self.profiles.get(key)
+        if profile:
+            on_status(f"Using cached scroll calibration: {profile['scroll_height']} clicks per frame")
+            return profile["scroll_height"]
+        profile = calibrate(self.grabber.grab, self.scroll, self.bbox, self.delay, on_status)
+        if profile is None:
+            return scroll_height
+        self.profiles.put(key, profile)
+        return profile["scroll_height"]
+
+    def trim_chrome(self, scroll_height, on_status):
+        """Probe-scroll once and shrink the capture region to the part of the screen that moves."""
+        on_status("Detecting toolbar and scrollbar...")
+        before = self.grabber.grab(self.bbox)
+        self.scroll(-scroll_height)
+        time.sleep(self.delay)
+        after = self.grabber.grab(self.bbox)
+        self.scroll(scroll_height)
+        time.sleep(self.delay)
+
+        left, top, right, bottom = find_content_bbox(before, after)
+        origin_x, origin_y = self.bbox[:2] if self.bbox else (0, 0)
+        self.bbox = (origin_x + left, origin_y + top, origin_x + right, origin_y + bottom)
+        on_status(f"Trimmed {top}px of toolbar and {before.width - right}px of scrollbar")
+
+    def frames(self, on_status=_status):
+        scroll_height = self.scroll_height(on_status)
+        if self.auto_trim:
+            self.trim_chrome(scroll_height, on_status)
+        if self.calibrate and self.manual_height <= 0:
+            scroll_height = self.calibrated_height(scroll_height, on_status)
+        # In adaptive mode the delay setting becomes the upper bound on waiting for the page to settle
+        settle_waiter = None
+        if self.adaptive_delay:
+            # Skip the top quarter: it holds browser chrome and content that was already on screen
+            left, top, right, bottom = self.screen_bbox()
+            settle_waiter = SettleWaiter(self.delay, bbox=(left, top + (bottom - top) // 4, right, bottom),
+                                         grab=self.grabber.grab)
+        if self.skip_scrolls:
+            on_status(f"Scrolling {self.skip_scrolls}x to where the session left off...")
+            for _ in range(self.skip_scrolls):
+                self.scroll(-scroll_height)
+        # The first frame waits like every later one, or lazy images on the first screen are caught loading
+        if settle_waiter:
+            settle_waiter.wait()
+        else:
+            time.sleep(self.delay)
+
+        # Stage times (seconds) of the frame just yielded; the scroll and wait that
+        # come before a frame are counted towards that frame
+        self.timings = {}
+        while True:
+            start = time.perf_counter()
+            frame = self.grabber.grab(self.bbox)
+            self.timings["grab"] = time.perf_counter() - start
+            yield frame
+
+            self.timings = {}
+            start = time.perf_counter()
+            self.scroll(-scroll_height)
+            self.timings["scroll"] = time.perf_counter() - start
+            if settle_waiter:
+                latency, settled = settle_waiter.wait()
+                self.timings["settle"] = latency
+                if settled:
+                    on_status(f"Page settled in {latency:.2f}s")
+                else:
+                    on_status(f"Page still changing after {latency:.2f}s - capturing anyway")
+            else:
+                start = time.perf_counter()
+                time.sleep(self.delay)
+                self.timings["sleep"] = time.perf_counter() - start
+
+
+class DirectorySource:
+    """Recorded frames: every image in a folder, in file name order."""
+
+    def __init__(self, path):
+        self.path = path
+        self.start = 0
+        self.timings = {}
+
+    def resume(self, pulled):
+        """Skip the frames an earlier run already took."""
+        self.start = pulled
+
+    def files(self):
+        paths = [p for p in glob.glob(os.path.join(self.path, "*"))
+                 if os.path.splitext(p)[1].lower() in FRAME_EXTENSIONS]
+        return sorted(paths)
+
+    def frames(self, on_status=_status):
+        paths = self.files()
+        if not paths:
+            raise FileNotFoundError(f"No frame images found in {self.path}")
+        for path in paths[self.start:]:
+            start = time.perf_counter()
+            with Image.open(path) as img:
+                frame = img.convert('RGB')
+            self.timings = {"grab": time.perf_counter() - start}
+            yield frame
+
+
+class CaptureSession:
+    """Pull frames from a source through the pipeline until the page ends.
+
+    run() returns the number of frames pulled. on_status and on_frame are
+    plain callables, so the Qt thread can pass signal emitters and the CLI
+    can pass print. Pass a MetricsRecorder to get per-frame stage timings.
+    drop_duplicates and stop_on_loop control the pipeline's frame index,
+    remove_sticky the cropping of fixed headers and footers.
+
+    With a SessionJournal the session is persisted as it runs. If the
+    journal already has frames, the source is resumed after them; the
+    caller restores the store and the PDF (SessionJournal.restore_store and
+    open_writer) before run(). An OcrEngine makes the streamed PDF searchable.
+    """
+
+    def __init__(self, source, max_frames=0, stitch=True, detect_end=True, store=None,
+                 pdf_writer=None, workers=None, on_status=_status, on_frame=None, metrics=None,
+                 drop_duplicates=True, stop_on_loop=True, journal=None, ocr=None, remove_sticky=True):
+        self.source = source
+        self.max_frames = max_frames
+        self.stitch = stitch
+        self.detect_end = detect_end
+        self.store = store if store is not None else FrameStore()
+        self.pdf_writer = pdf_writer
+        self.workers = workers
+        self.on_status = on_status
+        self.on_frame = on_frame
+        self.metrics = metrics
+        self.drop_duplicates = drop_duplicates
+        self.stop_on_loop = stop_on_loop
+        self.journal = journal
+        self.ocr = ocr
+        self.remove_sticky = remove_sticky
+        self.capturing = True
+        self.page_end_detected = False
+        self.loop_detected = False
+        self.duplicates = 0
+
+    def stop(self):
+        self.capturing = False
+
+    def run(self):
+        # Analysis, stitching and PDF encoding happen on worker threads; this loop only pulls frames
+        pipeline = CapturePipeline(self.store, self.pdf_writer, stitch=self.stitch, detect_end=self.detect_end,
+                                   workers=self.workers, on_status=self.on_status, on_frame=self.on_frame,
+                                   metrics=self.metrics, drop_duplicates=self.drop_duplicates,
+                                   stop_on_loop=self.stop_on_loop, journal=self.journal, ocr=self.ocr,
+                                   remove_sticky=self.remove_sticky)
+        if self.journal and self.journal.frames:
+            self.on_status(f"Resuming after {len(self.journal.frames)} stored frames")
+            self.source.resume(self.journal.pulled)
+        count = 0
+        frames = self.source.frames(self.on_status)
+        try:
+            while self.capturing and (self.max_frames == 0 or count < self.max_frames):
+                if pipeline.page_end.is_set():
+                    break
+                self.on_status(f"Capturing screenshot {count + 1}...")
+                frame = next(frames, None)
+                if frame is None:
+                    break
+                pipeline.submit(frame, getattr(self.source, "timings", None))
+                count += 1
+        finally:
+            frames.close()
+            pipeline.close()
+        self.pdf_writer = pipeline.writer
+        self.loop_detected = pipeline.loop_detected
+        self.page_end_detected = pipeline.page_end.is_set() and not self.loop_detected
+        self.duplicates = pipeline.duplicates
+        if self.journal:
+            self.journal.finish(pipeline.next_id, self.page_end_detected, self.loop_detected)
+        return count
+
+
+def save_tall_png(store, file_path):
+    """Write every stored strip into one PNG, streamed row by row (see tall_export.py)."""
+    export_tall_png(store, file_path)
+
+
+def make_source(spec, target=None, scroller=None, profiles=None):
+    """Build a frame source from a job spec's "source" entry (a folder path or a dict).
+
+    A screen source captures target if one is given, else the window
+    ("window", part of its title) or monitor ("monitor", 1 = primary) the
+    spec names, else "bbox" or the whole screen. scroller and profiles
+    override how it scrolls and where calibration profiles are cached.
+    """
+    if isinstance(spec, str):
+        spec = {"type": "directory", "path": spec}
+    kind = spec.get("type", "directory")
+    if kind == "directory":
+        return DirectorySource(spec["path"])
+    if kind == "screen":
+        if target is None and (spec.get("window") or spec.get("monitor")):
+            target = make_target(spec)
+            target.focus()
+        bbox, grabber = (tuple(spec["bbox"]) if spec.get("bbox") else None), None
+        if target is not None:
+            bbox, grabber, scroller = target.bbox, target.grabber, scroller or target.scroll
+        return ScreenSource(delay=spec.get("delay", 0.5), manual_height=spec.get("scroll_height", 0),
+                            is_fullscreen=spec.get("fullscreen", False),
+                            adaptive_delay=spec.get("adaptive_delay", True),
+                            grabber=grabber or make_grabber(spec.get("grabber", "auto")), bbox=bbox,
+                            auto_trim=spec.get("auto_trim", False), scroller=scroller,
+                            resume_from_top=spec.get("resume_from_top", False),
+                            calibrate=spec.get("calibrate", True), browser=spec.get("browser"),
+                            profiles=profiles, recalibrate=spec.get("recalibrate", False))
+    raise ValueError(f"Unknown frame source type: {kind}")
+
+
+def run_job(job, on_status=None, source=None, on_frame=None):
+    """Run one job spec to completion and return a summary dict.
+
+    A job is a dict with "source", "output" and optionally "format"
+    ("pdf", "png" or "dzi" for a Deep Zoom tile pyramid, guessed from the
+    output name otherwise), "tile_format" (for "dzi"), "max_frames",
+    "stitch", "detect_end", "workers", "trace" (a JSON-lines file for
+    per-frame timings), "profile" (a pdf_writer.PROFILES name),
+    "drop_duplicates", "stop_on_loop", "remove_sticky", "page_size" (a
+    pagination.PAGE_SIZES name; "screen" keeps one page per frame) and
+    "session" (a directory the capture is persisted to; if it already holds
+    a session, that session is resumed and extended), "ocr" (true or a
+    Tesseract language such as "eng+deu" for a searchable PDF) and
+    "ocr_processes".
+
+    source replaces the one job["source"] describes (SessionScheduler
+    passes sources that scroll through its input arbiter), and on_frame is
+    called with the number of stored frames as the capture grows.
+    """
+    output = job["output"]
+    output_format = job.get("format") or os.path.splitext(output)[1].lstrip(".").lower() or "pdf"
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    page_size = job.get("page_size") or DEFAULT_PAGE_SIZE
+    if page_size not in PAGE_SIZES:
+        raise ValueError(f"Unknown page size: {page_size}")
+    # Paper-sized pages are cut from the finished capture, so nothing is streamed while capturing
+    paginate = output_format == "pdf" and page_size != "screen"
+    profile = job.get("profile") or DEFAULT_PROFILE
+    if on_status is None:
+        name = job.get("name", output)
+        on_status = lambda message: print(f"[{name}] {message}")
+
+    start = time.perf_counter()
+    metrics = MetricsRecorder(job.get("trace"))
+    store = FrameStore()
+    ocr = None
+    if job.get("ocr") and output_format == "pdf":
+        ocr = OcrEngine(job["ocr"] if isinstance(job["ocr"], str) else DEFAULT_LANG,
+                        processes=job.get("ocr_processes"))
+    journal = None
+    if job.get("session"):
+        resuming = is_session(job["session"])
+        journal = SessionJournal(job["session"], settings=job)
+        if resuming:
+            journal.restore_store(store)
+    writer = None
+    if output_format == "pdf" and not paginate:
+        writer = journal.open_writer(store, profile, ocr) if journal else StreamingPdfWriter(profile=profile)
+    session = CaptureSession(source or make_source(job["source"]), max_frames=job.get("max_frames", 0),
+                             stitch=job.get("stitch", True), detect_end=job.get("detect_end", True),
+                             store=store, pdf_writer=writer, workers=job.get("workers"),
+                             on_status=on_status, on_frame=on_frame, metrics=metrics,
+                             drop_duplicates=job.get("drop_duplicates", True),
+                             stop_on_loop=job.get("stop_on_loop", True), journal=journal, ocr=ocr,
+                             remove_sticky=job.get("remove_sticky", True))
+    try:
+        frames = session.run()
+        if not store:
+            raise ValueError("No frames captured")
+        if paginate:
+            session.pdf_writer = StreamingPdfWriter(profile=profile)
+            write_pages(store, session.pdf_writer, page_size, ocr)
+        if output_format == "pdf":
+            if session.pdf_writer is None:
+                raise RuntimeError("PDF encoding failed")
+            session.pdf_writer.save_to(output)
+        elif output_format == "dzi":
+            tiles = export_deep_zoom(store, output, tile_format=job.get("tile_format", DEFAULT_TILE_FORMAT))
+        else:
+            save_tall_png(store, output)
+        pages = session.pdf_writer.page_count if output_format == "pdf" else len(store)
+        summary = {"output": output, "format": output_format, "frames": frames, "pages": pages,
+                   "height": sum(height for _, height in store.sizes),
+                   "page_end_detected": session.page_end_detected, "session": job.get("session"),
+                   "loop_detected": session.loop_detected, "duplicates_dropped": session.duplicates,
+                   "bytes": os.path.getsize(output) + (tiles["tile_bytes"] if output_format == "dzi" else 0),
+                   "seconds": round(time.perf_counter() - start, 3),
+                   "per_frame": metrics.summary()}
+        if output_format == "pdf":
+            summary["pdf"] = session.pdf_writer.stats()
+        elif output_format == "dzi":
+            summary.update(tiles)
+        if ocr:
+            summary.update(ocr.stats())
+        return summary
+    finally:
+        metrics.close()
+        if session.pdf_writer:
+            if journal and session.pdf_writer is writer:
+                # The streamed PDF belongs to the session and is extended if it is resumed
+                session.pdf_writer.close()
+            else:
+                session.pdf_writer.discard()
+        if journal:
+            journal.close()
+        if ocr:
+            ocr.close()
+        store.clear()
+
+
+def _run_job_quietly(job):
+    """Process-pool entry point: never raises, so one bad job can't sink the batch."""
+    try:
+        return run_job(job)
+    except Exception as e:
+        return {"output": job.get("output"), "error": str(e)}
+
+
+def run_jobs(jobs, processes=None):
+    """Run many jobs; recorded sources go to a process pool, live screen jobs share the screen.
+
+    Screen jobs that each name their own window, monitor or bbox are
+    captured at the same time by a SessionScheduler, as long as their
+    regions don't overlap; the others run one at a time afterwards.
+    Returns one summary per job, in the order given.
+    """
+    from scheduler import SessionScheduler
+    results = [None] * len(jobs)
+    scheduler = SessionScheduler()
+    scheduled, serial, pooled = [], [], []
+    for index, job in enumerate(jobs):
+        source = job.get("source")
+        if isinstance(source, dict) and source.get("type") == "screen":
+            # The mouse wheel is shared, so live captures only overlap on separate targets
+            try:
+                target = make_target(source)
+            except ValueError as e:
+                results[index] = {"output": job.get("output"), "error": str(e)}
+                continue
+            if target is None:
+                serial.append(index)
+                continue
+            try:
+                scheduler.add(job, target)
+                scheduled.append(index)
+            except ValueError:
+                # Overlapping targets would cover each other's regions
+                serial.append(index)
+        else:
+            # One worker thread (and OCR process) per job; the process pool provides the parallelism
+            pooled.append((index, dict(job, workers=job.get("workers", 1),
+                                       ocr_processes=job.get("ocr_processes", 1))))
+
+    if scheduled:
+        for index, result in zip(scheduled, scheduler.run()):
+            results[index] = result
+    for index in serial:
+        results[index] = _run_job_quietly(jobs[index])
+    if pooled:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for (index, _), result in zip(pooled, pool.map(_run_job_quietly, [job for _, job in pooled])):
+                results[index] = result
+    return results
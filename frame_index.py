@@ -0,0 +1,112 @@
+import numpy as np
+from PIL import Image
+
+from page_end import compare_thumbnails
+
+# dHash grid: HASH_SIZE x HASH_SIZE gradient bits (256 bits), taken from
+# the page-end thumbnail so no frame is resized twice
+HASH_SIZE = 16
+# Hashes this close (in differing bits) are candidate duplicates
+MAX_DISTANCE = 24
+# Candidates are confirmed on the thumbnails: at most this share of pixels may differ
+MIN_SIMILARITY = 0.995
+# This many duplicates in a row means the page is cycling through content it already showed
+LOOP_FRAMES = 3
+
+
+def dhash(thumbnail, size=HASH_SIZE):
+    """Difference hash of a grayscale thumbnail array, as an int of size * size bits."""
+    small = Image.fromarray(np.clip(thumbnail, 0, 255).astype(np.uint8))
+    pixels = np.asarray(small.resize((size + 1, size), Image.Resampling.BOX), dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over hashes, for "everything within distance d" lookups.
+
+    Hamming distance is a metric, so a query only has to descend into the
+    children whose edge distance is within d of its distance to the node,
+    which keeps lookups well below a linear scan as the index grows.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, value, {distance: child}]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, item, value):
+        self.size += 1
+        if self.root is None:
+            self.root = [item, value, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(item, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [item, value, {}]
+                return
+            node = child
+
+    def find(self, item, max_distance):
+        """Return (distance, value) for every stored hash within max_distance, nearest first."""
+        matches = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(item, node[0])
+            if distance <= max_distance:
+                matches.append((distance, node[1]))
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(matches, key=lambda match: match[0])
+
+
+class FrameIndex:
+    """Perceptual-hash index over every frame of a session.
+
+    check() looks a frame up against all earlier ones (not just the last),
+    confirms hash candidates on the stored thumbnails, and remembers the
+    frame if it is new. A run of loop_frames duplicates in a row is
+    reported as a loop: a carousel, a feed recycling items or a page
+    bouncing at the bottom.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE, min_similarity=MIN_SIMILARITY, loop_frames=LOOP_FRAMES):
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+        self.loop_frames = loop_frames
+        self.tree = BKTree()
+        self.thumbnails = {}  # frame id -> uint8 thumbnail of each indexed frame
+        self.repeats = 0
+
+    def reset(self):
+        self.tree = BKTree()
+        self.thumbnails = {}
+        self.repeats = 0
+
+    @property
+    def looping(self):
+        return self.loop_frames > 0 and self.repeats >= self.loop_frames
+
+    def check(self, frame_id, thumbnail, frame_hash=None):
+        """Return (earlier frame id, hash distance) if frame duplicates one, else None."""
+        if frame_hash is None:
+            frame_hash = dhash(thumbnail)
+        for distance, earlier in self.tree.find(frame_hash, self.max_distance):
+            similarity, _ = compare_thumbnails(thumbnail, self.thumbnails[earlier].astype(np.int16))
+            if similarity >= self.min_similarity:
+                self.repeats += 1
+                return earlier, distance
+        self.repeats = 0
+        self.tree.add(frame_hash, frame_id)
+        self.thumbnails[frame_id] = np.clip(thumbnail, 0, 255).astype(np.uint8)
+        return None
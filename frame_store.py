@@ -0,0 +1,159 @@
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+from PIL import Image
+
+DEFAULT_RAM_BUDGET = 1024 * 1024 * 1024  # 1 GB of decoded frames
+CHUNK_FRAMES = 16
+
+
+def frame_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+class FrameStore:
+    """List-like container for captured frames with a bounded RAM footprint.
+
+    The most recently used frames stay in memory up to ram_budget bytes.
+    Older ones are written to chunk files in a temp directory, either raw
+    or zlib-compressed, and are paged back in on access in least-recently-used
+    order. Raw frames are copied once straight out of a memory map of their
+    chunk, with no decoding and no intermediate read buffer; the map is
+    closed again right away, so no chunk stays mapped. Frames
+    that already exist as image files (a persisted session) are just
+    dropped from memory and reopened from their file.
+    """
+
+    def __init__(self, ram_budget=DEFAULT_RAM_BUDGET, compress=False, cache_dir=None,
+                 chunk_frames=CHUNK_FRAMES):
+        self.ram_budget = ram_budget
+        self.compress = compress
+        self.chunk_frames = chunk_frames
+        self.cache_root = cache_dir  # parent for the temp dir; None = system temp
+        self.cache_dir = None
+        self.hot = OrderedDict()  # index -> Image, oldest first
+        self.hot_bytes = 0
+        self.entries = []  # per frame: (mode, size, chunk location or image file path; None = memory only)
+        self.chunk_file = None
+        self.chunk_index = -1
+        self.chunk_count = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return len(self.entries) > 0
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def sizes(self):
+        """(width, height) of every frame, without loading any of them."""
+        return [size for _, size, _ in self.entries]
+
+    def append(self, img):
+        with self.lock:
+            index = len(self.entries)
+            self.entries.append((img.mode, img.size, None))
+            self._remember(index, img)
+
+    def append_file(self, path, size, mode='RGB'):
+        """Add a frame that lives in an image file; it is only opened when accessed."""
+        with self.lock:
+            self.entries.append((mode, tuple(size), path))
+
+    def attach_file(self, index, path):
+        """Note that frame index has been saved to path, so it never needs spilling."""
+        with self.lock:
+            mode, size, location = self.entries[index]
+            if location is None:
+                self.entries[index] = (mode, size, path)
+
+    def __getitem__(self, index):
+        with self.lock:
+            if index < 0:
+                index += len(self.entries)
+            if index in self.hot:
+                self.hot.move_to_end(index)
+                return self.hot[index]
+            img = self._load(index)
+            if self.compress or isinstance(self.entries[index][2], str):
+                # Decoding costs something, so keep the result around
+                self._remember(index, img)
+            return img
+
+    def _remember(self, index, img):
+        self.hot[index] = img
+        self.hot_bytes += frame_nbytes(img)
+        while self.hot_bytes > self.ram_budget and len(self.hot) > 1:
+            old_index, old_img = self.hot.popitem(last=False)
+            self.hot_bytes -= frame_nbytes(old_img)
+            if self.entries[old_index][2] is None:
+                self._spill(old_index, old_img)
+
+    def _chunk_path(self, chunk):
+        return os.path.join(self.cache_dir, f"chunk-{chunk:05d}.bin")
+
+    def _spill(self, index, img):
+        """Write a frame to the current chunk file; spilled frames are never rewritten."""
+        if self.cache_dir is None:
+            self.cache_dir = tempfile.mkdtemp(prefix="scroll2pdf-frames-", dir=self.cache_root)
+        if self.chunk_file is None or self.chunk_count >= self.chunk_frames:
+            if self.chunk_file:
+                self.chunk_file.close()
+            self.chunk_index += 1
+            self.chunk_count = 0
+            self.chunk_file = open(self._chunk_path(self.chunk_index), "wb")
+
+        data = img.tobytes()
+        if self.compress:
+            data = zlib.compress(data, 1)
+        offset = self.chunk_file.tell()
+        self.chunk_file.write(data)
+        self.chunk_file.flush()
+        self.chunk_count += 1
+        mode, size, _ = self.entries[index]
+        self.entries[index] = (mode, size, (self.chunk_index, offset, len(data)))
+
+    def _load(self, index):
+        mode, size, location = self.entries[index]
+        if isinstance(location, str):
+            with Image.open(location) as img:
+                return img.convert(mode)
+        chunk, offset, length = location
+        path = self._chunk_path(chunk)
+        if self.compress:
+            with open(path, "rb") as chunk_file:
+                chunk_file.seek(offset)
+                data = zlib.decompress(chunk_file.read(length))
+            return Image.frombytes(mode, size, data)
+        # Pillow copies the pixels out of the view, so the map can be closed before returning
+        with open(path, "rb") as chunk_file, mmap.mmap(chunk_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view, view[offset:offset + length] as data:
+                return Image.frombytes(mode, size, data)
+
+    def clear(self):
+        """Drop every frame and delete the on-disk cache."""
+        with self.lock:
+            self.hot.clear()
+            self.hot_bytes = 0
+            self.entries = []
+            if self.chunk_file:
+                self.chunk_file.close()
+                self.chunk_file = None
+            self.chunk_index = -1
+            self.chunk_count = 0
+            if self.cache_dir:
+                try:
+                    shutil.rmtree(self.cache_dir)
+                except OSError as e:
+                    print(f"Could not remove frame cache {self.cache_dir}: {str(e)}")
+                self.cache_dir = None
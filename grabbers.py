@@ -0,0 +1,137 @@
+import importlib.util
+import threading
+
+from PIL import Image
+
+# Only check that mss is there; it (like ImageGrab and numpy) is imported on first use to keep startup fast
+HAVE_MSS = importlib.util.find_spec("mss") is not None  # Fallback to Pillow's ImageGrab if it isn't
+
+# Auto-trim never removes more than this share of the frame from the top or the right
+MAX_TOP_TRIM = 1 / 5
+MAX_RIGHT_TRIM = 1 / 30
+# Gray-level change for a pixel to count as moved by the probe scroll
+TRIM_DIFF_THRESHOLD = 16
+
+
+class PillowGrabber:
+    """Screen grabs through PIL.ImageGrab; works everywhere Pillow does.
+
+    ImageGrab can only tell the screen size by grabbing all of it, so that
+    is done once and the size kept for the grabber's lifetime.
+    """
+
+    name = "pillow"
+
+    def __init__(self):
+        self.size = None
+
+    def grab(self, bbox=None):
+        from PIL import ImageGrab
+        return ImageGrab.grab(bbox=bbox)
+
+    def screen_size(self):
+        if self.size is None:
+            from PIL import ImageGrab
+            self.size = ImageGrab.grab().size
+        return self.size
+
+
+class MssGrabber:
+    """Screen grabs through mss, which is noticeably faster for repeated region grabs.
+
+    mss handles are not thread-safe, so every thread gets its own.
+    """
+
+    name = "mss"
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def _sct(self):
+        if not hasattr(self.local, "sct"):
+            import mss
+            self.local.sct = mss.mss()
+        return self.local.sct
+
+    def grab(self, bbox=None):
+        sct = self._sct()
+        if bbox is None:
+            monitor = sct.monitors[1]
+        else:
+            left, top, right, bottom = bbox
+            monitor = {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        shot = sct.grab(monitor)
+        return Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+
+    def screen_size(self):
+        monitor = self._sct().monitors[1]
+        return monitor["width"], monitor["height"]
+
+
+GRABBERS = {"pillow": PillowGrabber, "mss": MssGrabber}
+
+
+def available_grabbers():
+    return [name for name in GRABBERS if name != "mss" or HAVE_MSS]
+
+
+def make_grabber(name="auto"):
+    """Build a grabber by name; "auto" prefers mss when it is installed."""
+    if name == "auto":
+        name = "mss" if HAVE_MSS else "pillow"
+    if name == "mss" and not HAVE_MSS:
+        print("mss not installed, falling back to Pillow ImageGrab")
+        name = "pillow"
+    return GRABBERS[name]()
+
+
+def window_bbox(window, screen_size):
+    """Bounding box of a pygetwindow window, clipped to the primary screen."""
+    screen_width, screen_height = screen_size
+    left = max(0, window.left)
+    top = max(0, window.top)
+    right = min(screen_width, window.left + window.width)
+    bottom = min(screen_height, window.top + window.height)
+    if right - left < 50 or bottom - top < 50:
+        return None
+    return left, top, right, bottom
+
+
+def find_content_bbox(before, after):
+    """Find the scrolling part of two grabs taken either side of a probe scroll.
+
+    Toolbars, tab strips and the scrollbar track don't move when the page
+    scrolls, so static rows at the top and static columns at the right are
+    trimmed, up to MAX_TOP_TRIM / MAX_RIGHT_TRIM of the frame. Returns a
+    (left, top, right, bottom) box relative to the grabs.
+    """
+    import numpy as np
+    width, height = before.size
+    diff = np.abs(np.asarray(before.convert('L'), dtype=np.int16)
+                  - np.asarray(after.convert('L'), dtype=np.int16)) > TRIM_DIFF_THRESHOLD
+
+    changed_rows = np.flatnonzero(diff.any(axis=1))
+    changed_columns = np.flatnonzero(diff.any(axis=0))
+    if not changed_rows.size:
+        return 0, 0, width, height
+
+    top = int(changed_rows[0]) if changed_rows[0] <= height * MAX_TOP_TRIM else 0
+    right = int(changed_columns[-1]) + 1
+    if width - right > width * MAX_RIGHT_TRIM:
+        right = width
+
+    # The scrollbar thumb does move, but as one or two solid blocks; page
+    # content changes in many separate runs down the column
+    column_diff = diff[top:, :right]
+    runs = np.count_nonzero(column_diff[1:] != column_diff[:-1], axis=0)
+    limit = width * (1 - MAX_RIGHT_TRIM)
+    edge = right
+    while edge > limit and runs[edge - 1] == 0:
+        edge -= 1
+    thumb_end = edge
+    while edge > limit and 0 < runs[edge - 1] <= 4:
+        edge -= 1
+    if edge < thumb_end and edge > limit:
+        right = edge
+
+    return 0, top, right, height
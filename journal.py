@@ -0,0 +1,260 @@
+"""On-disk record of a capture session, so an interrupted capture can be resumed.
+
+A session directory holds:
+
+    manifest.json    settings of the capture, written once when it starts
+    journal.jsonl    one line per stored strip, PDF page and finished run, plus a
+                     "pages_reset" line whenever the PDF is rebuilt from the strips
+    strip-NNNNN.png  every stored strip, written before its journal line
+    thumbnails.bin   page-end thumbnail of the frame behind each strip
+    state.npz        thumbnail and stitching signature of the last stored frame
+    capture.pdf      the streamed PDF, extended in place on resume
+
+The journal is only ever appended to and flushed line by line, so after a
+crash everything up to the last complete line is still there; a torn last
+line is cut off when the session is reopened.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from pdf_writer import StreamingPdfWriter, DEFAULT_PROFILE
+
+SESSIONS_DIR = os.path.join(tempfile.gettempdir(), "scroll2pdf-sessions")
+MANIFEST = "manifest.json"
+JOURNAL = "journal.jsonl"
+THUMBNAILS = "thumbnails.bin"
+STATE = "state.npz"
+PDF = "capture.pdf"
+VERSION = 1
+# Strips are saved with fast zlib settings; they are read back rarely
+PNG_COMPRESS_LEVEL = 1
+
+
+def is_session(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def load_settings(path):
+    """Settings a session was started with, without opening its journal."""
+    with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)["settings"]
+
+
+def new_session_dir(root=SESSIONS_DIR):
+    """Create an empty, uniquely named session directory under root."""
+    os.makedirs(root, exist_ok=True)
+    return tempfile.mkdtemp(prefix=time.strftime("%Y%m%d-%H%M%S-"), dir=root)
+
+
+def latest_session(root=SESSIONS_DIR):
+    """Most recently modified session under root that has frames and was never saved, or None."""
+    if not os.path.isdir(root):
+        return None
+    candidates = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        journal_path = os.path.join(path, JOURNAL)
+        if is_session(path) and os.path.isfile(journal_path) and os.path.getsize(journal_path):
+            candidates.append((os.path.getmtime(journal_path), path))
+    for _, path in sorted(candidates, reverse=True):
+        try:
+            journal = SessionJournal(path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable session {path}: {str(e)}")
+            continue
+        journal.close()
+        if journal.frames and not journal.saved:
+            return path
+    return None
+
+
+def _write_atomic(path, data):
+    """Replace path with data so a crash leaves either the old or the new file."""
+    temp = path + ".tmp"
+    with open(temp, "wb") as temp_file:
+        temp_file.write(data)
+    os.replace(temp, path)
+
+
+class SessionJournal:
+    """Persist a capture as it happens and reload it to carry on later.
+
+    Opening a directory that already holds a session replays its journal:
+    frames lists the stored strips, pages the PDF page records, pulled how
+    many frames the source has delivered so far and finished the last
+    completed run (page-end state included). The pipeline saves strips with
+    save_strip() on its worker threads and records them in order with
+    add_frame() and add_page(); restore_store() and open_writer() rebuild
+    the frame store and the PDF for a resumed run.
+    """
+
+    def __init__(self, path, settings=None):
+        self.path = path
+        self.frames = []  # per stored strip: {"frame": source frame id, "size": [width, height]}
+        self.pages = []  # StreamingPdfWriter page records, in page order
+        self.pulled = 0
+        self.finished = None
+        self.saved = False
+        self.lock = threading.Lock()
+        if is_session(path):
+            with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as manifest_file:
+                self.manifest = json.load(manifest_file)
+            if self.manifest.get("version") != VERSION:
+                raise ValueError(f"Unsupported session version in {path}")
+            self._replay()
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.manifest = {"version": VERSION, "created": time.time(), "settings": settings or {}}
+            _write_atomic(os.path.join(path, MANIFEST), json.dumps(self.manifest, indent=2).encode())
+        self.journal = open(os.path.join(path, JOURNAL), "a", encoding="utf-8")
+
+    @property
+    def settings(self):
+        return self.manifest["settings"]
+
+    @property
+    def pdf_path(self):
+        return os.path.join(self.path, PDF)
+
+    def strip_path(self, index):
+        return os.path.join(self.path, f"strip-{index:05d}.png")
+
+    def _replay(self):
+        journal_path = os.path.join(self.path, JOURNAL)
+        if not os.path.exists(journal_path):
+            return
+        valid = 0
+        with open(journal_path, "rb") as journal_file:
+            for line in journal_file:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                kind = event.get("event")
+                if kind == "frame":
+                    if not os.path.exists(self.strip_path(len(self.frames))):
+                        break
+                    self.frames.append({"frame": event["frame"], "size": event["size"]})
+                    self.pulled = max(self.pulled, event["frame"] + 1)
+                elif kind == "page":
+                    self.pages.append(event["record"])
+                elif kind == "pages_reset":
+                    self.pages = []
+                elif kind == "end":
+                    self.finished = event
+                    self.pulled = max(self.pulled, event["pulled"])
+                elif kind == "saved":
+                    self.saved = True
+                valid += len(line)
+        # Drop a torn tail so new lines don't get glued onto it
+        with open(journal_path, "r+b") as journal_file:
+            journal_file.truncate(valid)
+        # Only as many pages as there are strips behind them can be trusted
+        del self.pages[len(self.frames):]
+
+    def _log(self, event):
+        self.journal.write(json.dumps(event) + "\n")
+        self.journal.flush()
+
+    def save_strip(self, index, img):
+        """Write strip index to its file; safe to call from several threads at once."""
+        path = self.strip_path(index)
+        img.save(path, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+        return path
+
+    def add_frame(self, frame_id, size, thumbnail, signature=None):
+        """Record the next strip, already saved by save_strip(), with the state needed to continue after it."""
+        import numpy as np
+        with self.lock:
+            index = len(self.frames)
+            thumbnail = np.clip(thumbnail, 0, 255).astype(np.uint8)
+            with open(os.path.join(self.path, THUMBNAILS), "r+b" if index else "wb") as thumbnails_file:
+                # Fixed-size records, so a write torn by a crash is simply overwritten
+                thumbnails_file.seek(index * thumbnail.size)
+                thumbnails_file.write(thumbnail.tobytes())
+            state_path = os.path.join(self.path, STATE)
+            with open(state_path + ".tmp", "wb") as state_file:
+                if signature is None:
+                    np.savez(state_file, thumbnail=thumbnail)
+                else:
+                    np.savez(state_file, thumbnail=thumbnail, signature=signature)
+            os.replace(state_path + ".tmp", state_path)
+            self.frames.append({"frame": frame_id, "size": list(size)})
+            self.pulled = max(self.pulled, frame_id + 1)
+            self._log({"event": "frame", "frame": frame_id, "size": list(size)})
+
+    def add_page(self, record):
+        with self.lock:
+            self.pages.append(record)
+            self._log({"event": "page", "record": record})
+
+    def finish(self, pulled, page_end_detected, loop_detected):
+        """Record the end of a run: how far the source got and how the run stopped."""
+        with self.lock:
+            self.pulled = max(self.pulled, pulled)
+            self.finished = {"event": "end", "pulled": self.pulled, "page_end_detected": page_end_detected,
+                             "loop_detected": loop_detected, "time": time.time()}
+            self._log(self.finished)
+
+    def mark_saved(self):
+        with self.lock:
+            self.saved = True
+            self._log({"event": "saved", "time": time.time()})
+
+    def thumbnails(self):
+        """(frame id, int16 thumbnail) of every stored strip, for rebuilding the frame index."""
+        import numpy as np
+        from page_end import THUMBNAIL_SIZE
+        path = os.path.join(self.path, THUMBNAILS)
+        if not self.frames or not os.path.exists(path):
+            return []
+        data = np.fromfile(path, dtype=np.uint8, count=len(self.frames) * THUMBNAIL_SIZE * THUMBNAIL_SIZE)
+        thumbnails = data.reshape(-1, THUMBNAIL_SIZE, THUMBNAIL_SIZE).astype(np.int16)
+        return [(entry["frame"], thumbnail) for entry, thumbnail in zip(self.frames, thumbnails)]
+
+    def last_state(self):
+        """(thumbnail, signature or None) of the last stored frame, or None if there is none."""
+        import numpy as np
+        path = os.path.join(self.path, STATE)
+        if not self.frames or not os.path.exists(path):
+            return None
+        with np.load(path) as state:
+            signature = state["signature"] if "signature" in state else None
+            return state["thumbnail"].astype(np.int16), signature
+
+    def restore_store(self, store):
+        """Add every saved strip to a FrameStore; strips are opened lazily from their files."""
+        for index, entry in enumerate(self.frames):
+            store.append_file(self.strip_path(index), entry["size"])
+
+    def open_writer(self, store, profile=DEFAULT_PROFILE, ocr=None):
+        """Open the session's PDF where it left off, encoding any strips it has no page for yet."""
+        pages = self.pages
+        if pages and (not os.path.exists(self.pdf_path) or os.path.getsize(self.pdf_path) < pages[-1]["end"]):
+            # The PDF was discarded after a write error; rebuild it from the strips. The old page
+            # records point into the discarded file, so they go too, in the journal as well
+            pages = None
+            with self.lock:
+                self.pages = []
+                self._log({"event": "pages_reset", "time": time.time()})
+        writer = StreamingPdfWriter(self.pdf_path, profile=profile, pages=pages)
+        for index in range(writer.page_count, len(store)):
+            img = store[index]
+            self.add_page(writer.add_page(img, ocr.submit(img).result() if ocr else None))
+        return writer
+
+    def close(self):
+        with self.lock:
+            if not self.journal.closed:
+                self.journal.close()
+
+    def delete(self):
+        """Close the journal and remove the whole session directory."""
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -1,104 +1,122 @@
+import multiprocessing
 import os
+import shutil
+import tempfile
+import threading
 import time
-from PIL import ImageGrab, Image
-import pyautogui
-import img2pdf
-try:
-    import pygetwindow as gw
-except ImportError:
-    gw = None  # Fallback if pygetwindow isn’t installed
+from pdf_writer import StreamingPdfWriter, PROFILES, DEFAULT_PROFILE, format_stats
+from frame_store import FrameStore
+from journal import SessionJournal, new_session_dir, latest_session
+from pagination import PAGE_SIZES, DEFAULT_PAGE_SIZE, write_pages
+from ocr import HAVE_PYTESSERACT
+from grabbers import make_grabber, available_grabbers
+from window_prep import WindowPreparer
+from calibration import browser_name
+from tall_export import export_tall_png, export_deep_zoom
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QLabel, QDoubleSpinBox, QSpinBox, QPushButton, QFileDialog, 
-                            QMessageBox, QFrame, QGridLayout, QProgressBar, QCheckBox)
+                            QMessageBox, QFrame, QGridLayout, QProgressBar, QCheckBox, QComboBox)
 from PyQt6.QtCore import QThread, pyqtSignal, Qt
 from PyQt6.QtGui import QIcon, QPalette, QColor
 
+class PrepareThread(QThread):
+    """Run the window preparation state machine off the GUI thread."""
+    status_update = pyqtSignal(str)
+    prepared = pyqtSignal(bool, object)
+
+    def __init__(self, desired_fullscreen, grabber, capture_window, ready):
+        super().__init__()
+        self.preparer = WindowPreparer(desired_fullscreen, grabber, capture_window, ready=ready,
+                                       on_status=self.status_update.emit)
+
+    def run(self):
+        is_fullscreen, bbox = self.preparer.run()
+        self.prepared.emit(is_fullscreen, bbox)
+
+    def stop(self):
+        self.preparer.cancel()
+
+    @property
+    def cancelled(self):
+        return self.preparer.cancelled.is_set()
+
 class CaptureThread(QThread):
     screenshot_taken = pyqtSignal(int)
     capture_complete = pyqtSignal(bool, int)
     status_update = pyqtSignal(str)
+    frame_metrics = pyqtSignal(dict)
 
-    def __init__(self, delay, max_scrolls, manual_height, is_fullscreen):
+    def __init__(self, delay, max_scrolls, manual_height, is_fullscreen, stitch=True, ram_budget_mb=1024,
+                 adaptive_delay=False, grabber=None, bbox=None, auto_trim=False, trace_path=None,
+                 profile=DEFAULT_PROFILE, drop_duplicates=True, journal=None, ocr=None, calibrate=False,
+                 browser=None, remove_sticky=True):
         super().__init__()
-        self.delay = delay
+        # The capture core pulls in numpy and the analysis modules; load them when a capture starts, not at launch
+        from core import CaptureSession, ScreenSource
+        from metrics import MetricsRecorder
         self.max_scrolls = max_scrolls
-        self.manual_height = manual_height
-        self.is_fullscreen = is_fullscreen
-        self.capturing = True
-        self.screenshots = []
-
-    def run(self):
-        time.sleep(3)  # Additional wait after fullscreen adjustment (total 5 seconds from start)
-        scroll_count = 0
-        previous_screenshot = None
-
-        if self.manual_height > 0:
-            scroll_height = self.manual_height
-            self.status_update.emit(f"Using manual height: {scroll_height}px")
+        self.metrics = MetricsRecorder(trace_path, on_record=self.frame_metrics.emit)
+        self.source = ScreenSource(delay, manual_height, is_fullscreen, adaptive_delay, grabber, bbox, auto_trim,
+                                   calibrate=calibrate, browser=browser)
+        self.screenshots = FrameStore(ram_budget=ram_budget_mb * 1024 * 1024)
+        self.journal = journal
+        self.ocr = ocr
+        if journal:
+            # Frames of an interrupted run come back from the session directory, and its PDF is extended
+            journal.restore_store(self.screenshots)
+            try:
+                self.pdf_writer = journal.open_writer(self.screenshots, profile, ocr)
+            except Exception as e:
+                print(f"Could not reopen the session PDF, pages will be encoded on save: {str(e)}")
+                self.pdf_writer = None
         else:
-            scroll_height = 1300 if self.is_fullscreen else 1245
-            mode = "fullscreen" if self.is_fullscreen else "non-fullscreen"
-            self.status_update.emit(f"Using default {mode} height: {scroll_height}px")
-
-        while self.capturing and (self.max_scrolls == 0 or scroll_count < self.max_scrolls):
-            self.status_update.emit(f"Capturing screenshot {scroll_count + 1}...")
-            current_screenshot = ImageGrab.grab()
-
-            if previous_screenshot is not None:
-                similarity, remaining_height = self.check_page_end(current_screenshot, previous_screenshot, scroll_height)
-                if similarity > 0.98:
-                    self.status_update.emit(f"High similarity detected: {similarity:.3f}")
-                    if remaining_height < 35:
-                        self.status_update.emit(f"Page end detected - remaining content: {remaining_height}px")
-                        break
-                    else:
-                        self.status_update.emit(f"Continuing - remaining content: {remaining_height}px")
-                else:
-                    self.status_update.emit(f"Content differs - similarity: {similarity:.3f}")
-
-            self.screenshots.append(current_screenshot)
-            self.screenshot_taken.emit(len(self.screenshots))
-            
-            previous_screenshot = current_screenshot
-            pyautogui.scroll(-scroll_height)
-            scroll_count += 1
-            time.sleep(self.delay)
+            self.pdf_writer = StreamingPdfWriter(profile=profile)
+        self.session = CaptureSession(self.source, max_scrolls, stitch, store=self.screenshots,
+                                      pdf_writer=self.pdf_writer, on_status=self.status_update.emit,
+                                      on_frame=self.screenshot_taken.emit, metrics=self.metrics,
+                                      drop_duplicates=drop_duplicates, stop_on_loop=drop_duplicates,
+                                      journal=journal, ocr=ocr, remove_sticky=remove_sticky)
 
+    def run(self):
+        scroll_count = self.session.run()
+        self.metrics.close()
+        self.pdf_writer = self.session.pdf_writer
+        self.finish_pdf()
         self.capture_complete.emit(scroll_count < self.max_scrolls or self.max_scrolls == 0, len(self.screenshots))
 
     def stop(self):
-        self.capturing = False
+        self.session.stop()
 
-    def check_page_end(self, img1, img2, scroll_height):
-        img1 = img1.resize((100, 100)).convert('L')
-        img2 = img2.resize((100, 100)).convert('L')
-        
-        pixels1 = list(img1.getdata())
-        pixels2 = list(img2.getdata())
-        diff_pixels = sum(1 for p1, p2 in zip(pixels1, pixels2) if abs(p1 - p2) > 40)
-        similarity = 1 - (diff_pixels / len(pixels1))
+    def finish_pdf(self):
+        if not self.pdf_writer:
+            return
+        try:
+            self.pdf_writer.close()
+        except Exception as e:
+            print(f"Failed to finalize streaming PDF: {str(e)}")
+            self.pdf_writer.discard()
+            self.pdf_writer = None
 
-        original_height = img2.size[1]
-        scale_factor = original_height / 100
-        
-        bottom_diff = 0
-        for y in range(99, -1, -1):
-            row1 = [img1.getpixel((x, y)) for x in range(100)]
-            row2 = [img2.getpixel((x, y)) for x in range(100)]
-            if any(abs(p1 - p2) > 40 for p1, p2 in zip(row1, row2)):
-                bottom_diff = 100 - y
-                break
-        
-        remaining_height = (bottom_diff * scale_factor) if bottom_diff > 0 else 0
-        
-        return similarity, remaining_height
+    def discard_pdf(self):
+        if self.pdf_writer:
+            self.pdf_writer.discard()
+            self.pdf_writer = None
 
 class AutoScrollCapturePDF(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.screenshots = []
+        self.screenshots = FrameStore()
+        self.grabber = make_grabber()
         self.capturing = False
         self.capture_thread = None
+        self.prepare_thread = None
+        self.preview_window = None
+        self.capture_settings = None
+        self.journal = None  # on-disk record of the current capture, see journal.py
+        self.ocr = None  # started on first use and kept, so its cache makes re-exports free
+        self.resuming = False
+        self.minimized = threading.Event()  # Set once the window has actually minimized for a capture
+        self.updating_style = False
         self.setWindowTitle("Scroll2Pdf")
         self.resize(600, 800)
         self.setup_ui()
@@ -106,6 +124,11 @@ class AutoScrollCapturePDF(QMainWindow):
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(icon_path))
         self.update_stylesheet_based_on_theme()
+        # A capture the app crashed in (or was closed on without saving) can be picked up again
+        self.pending_session = latest_session()
+        if self.pending_session:
+            self.resume_button.setEnabled(True)
+            self.status_label.setText("Unsaved capture found - press Resume Capture to continue it")
 
     def setup_ui(self):
         main_widget = QWidget()
@@ -130,7 +153,7 @@ class AutoScrollCapturePDF(QMainWindow):
         settings_layout.setSpacing(15)
         main_layout.addWidget(settings_frame)
 
-        delay_label = QLabel("Delay between scrolls (seconds):")
+        delay_label = QLabel("Delay between scrolls (seconds, max when adaptive):")
         settings_layout.addWidget(delay_label, 0, 0)
         self.delay_spin = QDoubleSpinBox()
         self.delay_spin.setRange(0.1, 5.0)
@@ -161,6 +184,103 @@ class AutoScrollCapturePDF(QMainWindow):
         self.fullscreen_check.setChecked(False)
         settings_layout.addWidget(self.fullscreen_check, 3, 1)
 
+        stitch_label = QLabel("Trim overlap between frames:")
+        settings_layout.addWidget(stitch_label, 4, 0)
+        self.stitch_check = QCheckBox()
+        self.stitch_check.setChecked(True)
+        settings_layout.addWidget(self.stitch_check, 4, 1)
+
+        memory_label = QLabel("Memory for frames (MB, rest goes to disk):")
+        settings_layout.addWidget(memory_label, 5, 0)
+        self.memory_spin = QSpinBox()
+        self.memory_spin.setRange(64, 16384)
+        self.memory_spin.setValue(1024)
+        self.memory_spin.setSingleStep(64)
+        self.memory_spin.setFixedWidth(120)
+        settings_layout.addWidget(self.memory_spin, 5, 1)
+
+        adaptive_label = QLabel("Adaptive delay (wait until page settles):")
+        settings_layout.addWidget(adaptive_label, 6, 0)
+        self.adaptive_check = QCheckBox()
+        self.adaptive_check.setChecked(True)
+        settings_layout.addWidget(self.adaptive_check, 6, 1)
+
+        region_label = QLabel("Capture browser window only:")
+        settings_layout.addWidget(region_label, 7, 0)
+        self.region_check = QCheckBox()
+        self.region_check.setChecked(True)
+        settings_layout.addWidget(self.region_check, 7, 1)
+
+        trim_label = QLabel("Auto-trim toolbar and scrollbar:")
+        settings_layout.addWidget(trim_label, 8, 0)
+        self.trim_check = QCheckBox()
+        self.trim_check.setChecked(False)
+        settings_layout.addWidget(self.trim_check, 8, 1)
+
+        grabber_label = QLabel("Screen grab backend:")
+        settings_layout.addWidget(grabber_label, 9, 0)
+        self.grabber_combo = QComboBox()
+        self.grabber_combo.addItems(["auto"] + available_grabbers())
+        self.grabber_combo.setFixedWidth(120)
+        settings_layout.addWidget(self.grabber_combo, 9, 1)
+
+        trace_label = QLabel("Save per-frame timing trace:")
+        settings_layout.addWidget(trace_label, 10, 0)
+        self.trace_check = QCheckBox()
+        self.trace_check.setChecked(False)
+        settings_layout.addWidget(self.trace_check, 10, 1)
+
+        profile_label = QLabel("PDF output profile:")
+        settings_layout.addWidget(profile_label, 11, 0)
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems(list(PROFILES))
+        self.profile_combo.setCurrentText(DEFAULT_PROFILE)
+        self.profile_combo.setToolTip("lossless: exact pixels, largest files\n"
+                                      "balanced: JPEG for photos, palette for text\n"
+                                      "smallest: stronger JPEG and fewer palette colours")
+        self.profile_combo.setFixedWidth(120)
+        settings_layout.addWidget(self.profile_combo, 11, 1)
+
+        repeat_label = QLabel("Drop repeated frames, stop on loops:")
+        settings_layout.addWidget(repeat_label, 12, 0)
+        self.repeat_check = QCheckBox()
+        self.repeat_check.setChecked(True)
+        settings_layout.addWidget(self.repeat_check, 12, 1)
+
+        page_size_label = QLabel("PDF page size:")
+        settings_layout.addWidget(page_size_label, 13, 0)
+        self.page_size_combo = QComboBox()
+        self.page_size_combo.addItems(list(PAGE_SIZES))
+        self.page_size_combo.setCurrentText(DEFAULT_PAGE_SIZE)
+        self.page_size_combo.setToolTip("screen: one page per captured frame\n"
+                                        "a4 / letter: paper-shaped pages, broken at blank rows between content")
+        self.page_size_combo.setFixedWidth(120)
+        settings_layout.addWidget(self.page_size_combo, 13, 1)
+
+        ocr_label = QLabel("Searchable PDF (OCR text layer):")
+        settings_layout.addWidget(ocr_label, 14, 0)
+        self.ocr_check = QCheckBox()
+        self.ocr_check.setChecked(False)
+        self.ocr_check.setToolTip("Recognise text with Tesseract while capturing and embed it invisibly in the PDF")
+        self.ocr_check.setEnabled(HAVE_PYTESSERACT)
+        settings_layout.addWidget(self.ocr_check, 14, 1)
+
+        calibrate_label = QLabel("Calibrate scroll distance:")
+        settings_layout.addWidget(calibrate_label, 15, 0)
+        self.calibrate_check = QCheckBox()
+        self.calibrate_check.setChecked(True)
+        self.calibrate_check.setToolTip("With manual height 0, measure how far one scroll moves the page before\n"
+                                        "capturing; the result is remembered per screen, window and browser")
+        settings_layout.addWidget(self.calibrate_check, 15, 1)
+
+        sticky_label = QLabel("Remove fixed headers and footers:")
+        settings_layout.addWidget(sticky_label, 16, 0)
+        self.sticky_check = QCheckBox()
+        self.sticky_check.setChecked(True)
+        self.sticky_check.setToolTip("Navigation bars, cookie banners and chat widgets that stay put while the\n"
+                                     "page scrolls are kept in the first frame only")
+        settings_layout.addWidget(self.sticky_check, 16, 1)
+
         status_frame = QFrame()
         status_frame.setObjectName("neumorphic")
         status_layout = QVBoxLayout(status_frame)
@@ -175,6 +295,10 @@ class AutoScrollCapturePDF(QMainWindow):
         self.counter_label.setObjectName("counter")
         status_layout.addWidget(self.counter_label)
 
+        self.metrics_label = QLabel("")
+        self.metrics_label.setObjectName("status")
+        status_layout.addWidget(self.metrics_label)
+
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
@@ -199,6 +323,13 @@ class AutoScrollCapturePDF(QMainWindow):
         self.stop_button.setEnabled(False)
         buttons_layout.addWidget(self.stop_button)
 
+        self.resume_button = QPushButton("Resume Capture")
+        self.resume_button.setObjectName("start")
+        self.resume_button.setToolTip("Continue the last capture from where it stopped, adding to its pages")
+        self.resume_button.clicked.connect(self.resume_capture)
+        self.resume_button.setEnabled(False)
+        buttons_layout.addWidget(self.resume_button)
+
         self.save_button = QPushButton("Save as PDF")
         self.save_button.setObjectName("save")
         self.save_button.clicked.connect(self.save_pdf)
@@ -241,7 +372,7 @@ class AutoScrollCapturePDF(QMainWindow):
                 QPushButton#clear:hover:!disabled { background-color: #d35400; color: white; }
                 QPushButton#preview { background-color: #9b59b6; }
                 QPushButton#preview:hover:!disabled { background-color: #8e44ad; }
-                QDoubleSpinBox, QSpinBox, QCheckBox { border: 1px solid rgba(255, 255, 255, 0.2); border-radius: 6px; padding: 6px; background-color: rgba(255, 255, 255, 0.05); color: #E0E0E0; }
+                QDoubleSpinBox, QSpinBox, QCheckBox, QComboBox { border: 1px solid rgba(255, 255, 255, 0.2); border-radius: 6px; padding: 6px; background-color: rgba(255, 255, 255, 0.05); color: #E0E0E0; }
                 QFrame#neumorphic { background-color: rgba(44, 62, 80, 0.7); border: 1px solid rgba(255, 255, 255, 0.1); border-radius: 16px; }
                 QProgressBar { border: 1px solid rgba(255, 255, 255, 0.2); border-radius: 5px; background-color: rgba(255, 255, 255, 0.05); }
                 QProgressBar::chunk { background-color: #3498db; border-radius: 3px; }
@@ -269,7 +400,7 @@ class AutoScrollCapturePDF(QMainWindow):
                 QPushButton#clear:hover:!disabled { background-color: #d35400; color: white; }
                 QPushButton#preview { background-color: #9b59b6; }
                 QPushButton#preview:hover:!disabled { background-color: #8e44ad; }
-                QDoubleSpinBox, QSpinBox, QCheckBox { border: 1px solid rgba(0, 0, 0, 0.2); border-radius: 6px; padding: 6px; background-color: rgba(255, 255, 255, 0.8); color: #333333; }
+                QDoubleSpinBox, QSpinBox, QCheckBox, QComboBox { border: 1px solid rgba(0, 0, 0, 0.2); border-radius: 6px; padding: 6px; background-color: rgba(255, 255, 255, 0.8); color: #333333; }
                 QFrame#neumorphic { background-color: rgba(255, 255, 255, 0.7); border: 1px solid rgba(0, 0, 0, 0.1); border-radius: 16px; }
                 QProgressBar { border: 1px solid rgba(0, 0, 0, 0.2); border-radius: 5px; background-color: rgba(255, 255, 255, 0.8); }
                 QProgressBar::chunk { background-color: #3498db; border-radius: 3px; }
@@ -279,150 +410,27 @@ class AutoScrollCapturePDF(QMainWindow):
             """)
 
     def changeEvent(self, event):
-        if event.type() == event.Type.StyleChange:
-            self.update_stylesheet_based_on_theme()
+        # setStyleSheet itself sends StyleChange (e.g. when it re-polishes a combo box), so don't recurse
+        if event.type() == event.Type.StyleChange and not self.updating_style:
+            self.updating_style = True
+            try:
+                self.update_stylesheet_based_on_theme()
+            finally:
+                self.updating_style = False
+        elif event.type() == event.Type.WindowStateChange and self.isMinimized():
+            self.minimized.set()
         super().changeEvent(event)
 
-    def is_fullscreen_active(self):
-        """Check if the current screen matches the full screen resolution."""
-        screen_width, screen_height = pyautogui.size()
-        screenshot = ImageGrab.grab()
-        screenshot_width, screenshot_height = screenshot.size
-        
-        # Stricter threshold: 98% of screen size
-        is_fullscreen = (screenshot_width >= screen_width * 0.98 and 
-                         screenshot_height >= screen_height * 0.98)
-        
-        # Additional check with pygetwindow if available
-        if gw:
-            browser_window = self.find_browser_window()
-            if browser_window:
-                try:
-                    win_width, win_height = browser_window.width, browser_window.height
-                    win_x, win_y = browser_window.left, browser_window.top
-                    print(f"Window size: {win_width}x{win_height}, Position: ({win_x}, {win_y})")
-                    # True fullscreen should have minimal offset and match screen size closely
-                    is_fullscreen = (is_fullscreen and 
-                                   win_width >= screen_width * 0.98 and 
-                                   win_height >= screen_height * 0.98 and 
-                                   win_x <= 5 and win_y <= 5)
-                except Exception as e:
-                    print(f"Error checking window size with pygetwindow: {str(e)}")
-        
-        print(f"Screen: {screen_width}x{screen_height}, Screenshot: {screenshot_width}x{screenshot_height}, "
-              f"Fullscreen detected: {is_fullscreen}")
-        return is_fullscreen
-
-    def find_browser_window(self):
-        """Find and return an active browser window using pygetwindow."""
-        if not gw:
-            print("pygetwindow not installed, falling back to pyautogui")
-            return None
-        
-        browser_titles = ["Chrome", "Firefox", "Edge", "Opera", "Safari"]
-        windows = gw.getAllWindows()
-        for window in windows:
-            if not window.title.strip():
-                continue
-            if any(browser in window.title for browser in browser_titles) and window.visible:
-                try:
-                    print(f"Found browser window: {window.title} (Active: {window.isActive})")
-                    if not window.isActive:
-                        window.activate()
-                        time.sleep(1)  # Wait for activation
-                    if window.isActive:
-                        return window
-                except Exception as e:
-                    print(f"Error activating window {window.title}: {str(e)}")
-        print("No suitable browser window found")
-        return None
-
-    def adjust_fullscreen(self, desired_fullscreen):
-        """Adjust fullscreen state with retries and improved detection."""
-        self.status_label.setText("Adjusting window mode...")
-        time.sleep(2)  # Initial delay to allow GUI minimization and browser focus
-        
-        browser_window = self.find_browser_window()
-        max_attempts = 3
-        attempt = 0
-        
-        while attempt < max_attempts:
-            attempt += 1
-            print(f"Fullscreen adjustment attempt {attempt}/{max_attempts}")
-            
-            if browser_window:
-                try:
-                    browser_window.activate()
-                    time.sleep(1)  # Ensure focus
-                    current_fullscreen = self.is_fullscreen_active()
-                    print(f"Desired fullscreen: {desired_fullscreen}, Current fullscreen: {current_fullscreen}")
-                    
-                    if desired_fullscreen != current_fullscreen:
-                        print(f"Toggling fullscreen with F11 (desired: {desired_fullscreen})")
-                        pyautogui.hotkey('f11')
-                        time.sleep(2)  # Wait for transition
-                        if self.is_fullscreen_active() == desired_fullscreen:
-                            self.status_label.setText(f"Switched to {'fullscreen' if desired_fullscreen else 'normal'} mode")
-                            return
-                        else:
-                            print(f"Fullscreen toggle failed on attempt {attempt}")
-                    else:
-                        # Force one toggle attempt if detection might be wrong
-                        if attempt == 1 and desired_fullscreen:
-                            print("Forcing fullscreen toggle due to potential detection error")
-                            pyautogui.hotkey('f11')
-                            time.sleep(2)
-                            if self.is_fullscreen_active():
-                                self.status_label.setText("Switched to fullscreen mode (forced)")
-                                return
-                            else:
-                                print("Forced toggle failed, continuing attempts")
-                        else:
-                            self.status_label.setText(f"Already in {'fullscreen' if current_fullscreen else 'normal'} mode")
-                            return
-                except Exception as e:
-                    print(f"Error with browser window adjustment: {str(e)}")
-            else:
-                # Fallback with pyautogui
-                print("Falling back to pyautogui")
-                pyautogui.moveTo(50, 50)
-                pyautogui.click()
-                time.sleep(1)
-                current_fullscreen = self.is_fullscreen_active()
-                print(f"Desired fullscreen: {desired_fullscreen}, Current fullscreen: {current_fullscreen}")
-                
-                if desired_fullscreen != current_fullscreen:
-                    print(f"Toggling fullscreen with F11 (fallback, attempt {attempt})")
-                    pyautogui.hotkey('f11')
-                    time.sleep(2)
-                    if self.is_fullscreen_active() == desired_fullscreen:
-                        self.status_label.setText(f"Switched to {'fullscreen' if desired_fullscreen else 'normal'} mode (fallback)")
-                        return
-                    else:
-                        print(f"Fullscreen toggle failed (fallback) on attempt {attempt}")
-                else:
-                    # Force one toggle attempt in fallback mode too
-                    if attempt == 1 and desired_fullscreen:
-                        print("Forcing fullscreen toggle due to potential detection error (fallback)")
-                        pyautogui.hotkey('f11')
-                        time.sleep(2)
-                        if self.is_fullscreen_active():
-                            self.status_label.setText("Switched to fullscreen mode (forced, fallback)")
-                            return
-                        else:
-                            print("Forced toggle failed (fallback), continuing attempts")
-                    else:
-                        self.status_label.setText(f"Already in {'fullscreen' if current_fullscreen else 'normal'} mode (fallback)")
-                        return
-        
-        self.status_label.setText(f"Failed to {'enter' if desired_fullscreen else 'exit'} fullscreen - press F11 manually")
-        print("Warning: All fullscreen adjustment attempts failed")
+    def resume_capture(self):
+        self.start_capture(resume=True)
 
-    def start_capture(self):
+    def start_capture(self, resume=False):
         if self.capturing:
             return
         self.capturing = True
+        self.resuming = bool(resume)
         self.start_button.setEnabled(False)
+        self.resume_button.setEnabled(False)
         self.stop_button.setEnabled(True)
         self.save_button.setEnabled(False)
         self.preview_button.setEnabled(False)
@@ -432,17 +440,67 @@ class AutoScrollCapturePDF(QMainWindow):
         max_scrolls = int(self.max_spin.value())
         manual_height = self.height_spin.value()
         is_fullscreen = self.fullscreen_check.isChecked()
+        stitch = self.stitch_check.isChecked()
+        ram_budget_mb = self.memory_spin.value()
+        adaptive_delay = self.adaptive_check.isChecked()
+        capture_window = self.region_check.isChecked()
+        auto_trim = self.trim_check.isChecked()
+        trace_path = None
+        if self.trace_check.isChecked():
+            trace_path = os.path.join(tempfile.gettempdir(), f"scroll2pdf-trace-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+            print(f"Writing timing trace to {trace_path}")
+        profile = self.profile_combo.currentText()
+        self.grabber = make_grabber(self.grabber_combo.currentText())
 
         QMessageBox.information(self, "Auto-Scrolling Capture", 
-            "Focus your browser window now. Fullscreen adjustment starts in 2 seconds if checked.\nCapture begins 5 seconds after adjustment.")
+            "Focus your browser window now. Fullscreen adjustment starts once this window is minimized if checked.\n"
+            "Capture begins as soon as the page has settled after adjustment.")
+        if self.resuming:
+            if not self.journal:
+                self.journal = SessionJournal(self.pending_session)
+                self.pending_session = None
+            # Carry on with the settings the session was started with
+            self.capture_settings = dict(self.journal.settings, trace_path=trace_path)
+        else:
+            self.capture_settings = dict(delay=delay, max_scrolls=max_scrolls, manual_height=manual_height,
+                                         stitch=stitch, ram_budget_mb=ram_budget_mb,
+                                         adaptive_delay=adaptive_delay, auto_trim=auto_trim,
+                                         trace_path=trace_path, profile=profile,
+                                         drop_duplicates=self.repeat_check.isChecked(),
+                                         searchable=self.ocr_check.isChecked(),
+                                         calibrate=self.calibrate_check.isChecked(),
+                                         remove_sticky=self.sticky_check.isChecked())
+        self.minimized.clear()
         self.showMinimized()
         self.status_label.setText("Preparing to capture...")
 
-        self.adjust_fullscreen(is_fullscreen)
-        time.sleep(3)  # Additional wait after adjustment (total 5 seconds from message)
+        # Window preparation waits on the browser and the screen, so it runs on its own thread
+        self.prepare_thread = PrepareThread(is_fullscreen, self.grabber, capture_window, self.minimized)
+        self.prepare_thread.status_update.connect(self.update_status)
+        self.prepare_thread.prepared.connect(self.begin_capture)
+        self.prepare_thread.start()
 
-        self.capture_thread = CaptureThread(delay, max_scrolls, manual_height, self.is_fullscreen_active())
+    def begin_capture(self, is_fullscreen, bbox):
+        if self.prepare_thread.cancelled:
+            return
+        self.close_preview()
+        if self.capture_thread:
+            if not self.resuming:
+                self.capture_thread.discard_pdf()
+            self.capture_thread.screenshots.clear()
+        if not self.resuming:
+            self.discard_session()
+            # Every frame is saved to the session directory as it is stored, so a crash loses nothing
+            self.journal = SessionJournal(new_session_dir(), settings=self.capture_settings)
+        settings = dict(self.capture_settings)
+        ocr = self.ocr_engine() if settings.pop("searchable", False) else None
+        # Calibration profiles are kept per browser, so tell the source which one it is scrolling
+        window = self.prepare_thread.preparer.window
+        browser = browser_name(window.title if window else None)
+        self.capture_thread = CaptureThread(is_fullscreen=is_fullscreen, grabber=self.grabber, bbox=bbox,
+                                            journal=self.journal, ocr=ocr, browser=browser, **settings)
         self.capture_thread.screenshot_taken.connect(self.update_counter)
+        self.capture_thread.frame_metrics.connect(self.update_metrics)
         self.capture_thread.capture_complete.connect(self.capture_finished)
         self.capture_thread.status_update.connect(self.update_status)
         self.capture_thread.start()
@@ -457,22 +515,38 @@ class AutoScrollCapturePDF(QMainWindow):
     def update_status(self, status):
         self.status_label.setText(status)
 
+    def update_metrics(self, record):
+        stages = [f"{key[:-3]} {value:.0f}ms" for key, value in record.items()
+                  if key.endswith("_ms") and key != "queue_wait_ms"]
+        self.metrics_label.setText(f"Frame {record['frame'] + 1}: " + ", ".join(stages))
+
     def capture_finished(self, page_end_detected, count):
         self.capturing = False
         self.start_button.setEnabled(True)
+        self.resume_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.save_button.setEnabled(True)
         self.preview_button.setEnabled(True)
         self.clear_button.setEnabled(True)
         self.showNormal()
-        self.status_label.setText("Capture complete" if page_end_detected else "Max scrolls reached")
+        if self.capture_thread.session.loop_detected:
+            self.status_label.setText("Capture stopped - the page keeps repeating earlier content")
+        else:
+            self.status_label.setText("Capture complete" if page_end_detected else "Max scrolls reached")
+        if self.capture_thread.session.duplicates:
+            print(f"Dropped {self.capture_thread.session.duplicates} repeated frames")
+        if self.capture_thread.metrics.trace_path:
+            self.metrics_label.setText(f"Timing trace: {self.capture_thread.metrics.trace_path}")
         self.progress_bar.setValue(100 if page_end_detected else self.progress_bar.value())
 
     def stop_capture(self):
+        if self.prepare_thread:
+            self.prepare_thread.stop()
         if self.capture_thread:
             self.capture_thread.stop()
         self.capturing = False
         self.start_button.setEnabled(True)
+        self.resume_button.setEnabled(self.journal is not None)
         self.stop_button.setEnabled(False)
         self.save_button.setEnabled(True)
         self.preview_button.setEnabled(True)
@@ -481,7 +555,13 @@ class AutoScrollCapturePDF(QMainWindow):
         self.showNormal()
 
     def clear_screenshots(self):
-        self.screenshots = []
+        if self.capture_thread:
+            self.capture_thread.wait()
+            self.capture_thread.discard_pdf()
+        self.close_preview()
+        self.screenshots.clear()
+        self.discard_session()
+        self.resume_button.setEnabled(False)
         self.counter_label.setText("Screenshots: 0")
         self.status_label.setText("Screenshots cleared")
         self.save_button.setEnabled(False)
@@ -489,46 +569,163 @@ class AutoScrollCapturePDF(QMainWindow):
         self.clear_button.setEnabled(False)
         self.progress_bar.setValue(0)
 
+    def ocr_engine(self):
+        """The app's OcrEngine, or None (with a warning) if Tesseract can't be run."""
+        if self.ocr is None:
+            from ocr import OcrEngine, ocr_available
+            if not ocr_available():
+                QMessageBox.warning(self, "OCR Unavailable",
+                                    "Tesseract was not found, so the PDF will not be searchable.\n"
+                                    "Install Tesseract and the pytesseract package to enable it.")
+                return None
+            self.ocr = OcrEngine()
+        return self.ocr
+
+    def discard_session(self):
+        """Delete the current session directory; its frames can't be resumed any more."""
+        if self.journal:
+            self.journal.delete()
+            self.journal = None
+        if self.pending_session:
+            shutil.rmtree(self.pending_session, ignore_errors=True)
+            self.pending_session = None
+
     def preview_screenshots(self):
         if not self.screenshots:
             QMessageBox.warning(self, "No Screenshots", "No screenshots to preview.")
             return
-        total_height = sum(img.height for img in self.screenshots)
-        combined = Image.new('RGB', (self.screenshots[0].width, total_height))
-        y_offset = 0
-        for img in self.screenshots:
-            combined.paste(img, (0, y_offset))
-            y_offset += img.height
-        combined.show()
+        self.close_preview()
+        # Only the frames scrolled into view get decoded, so this opens instantly for any capture length
+        from preview import PreviewDialog
+        self.preview_window = PreviewDialog(self.screenshots, self)
+        self.preview_window.show()
+
+    def close_preview(self):
+        if self.preview_window:
+            self.preview_window.close()
+            self.preview_window = None
 
     def save_pdf(self):
         if not self.screenshots:
             QMessageBox.warning(self, "No Screenshots", "No screenshots to save.")
             return
 
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save PDF As", "", "PDF files (*.pdf)")
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save PDF As", "",
+                                                   "PDF files (*.pdf);;Tall PNG image (*.png);;"
+                                                   "Deep Zoom tiles (*.dzi)")
         if not file_path:
             return
+        if os.path.splitext(file_path)[1].lower() in (".png", ".dzi"):
+            self.save_image(file_path)
+            return
 
+        # The capture thread has already written the pages; let it finish and copy the file
+        profile = self.profile_combo.currentText()
+        page_size = self.page_size_combo.currentText()
+        searchable = self.ocr_check.isChecked()
+        writer = None
+        if self.capture_thread:
+            self.capture_thread.wait()
+            writer = self.capture_thread.pdf_writer
+        if (writer and writer.page_count == len(self.screenshots) and writer.profile == profile
+                and page_size == "screen" and (self.capture_thread.ocr is not None) == searchable):
+            try:
+                self.status_label.setText("Saving PDF...")
+                writer.save_to(file_path)
+                self.pdf_saved(file_path, writer.stats())
+                return
+            except Exception as e:
+                print(f"Streaming PDF copy failed, re-encoding frames: {str(e)}")
+
+        # Profile or page size differs from the capture (or the streamed file is unusable): encode the stored frames again
+        writer = None
         try:
-            self.status_label.setText("Saving PDF...")
-            rgb_screenshots = [img.convert('RGB') for img in self.screenshots]
-            rgb_screenshots[0].save(file_path, save_all=True, append_images=rgb_screenshots[1:], resolution=100.0)
-            QMessageBox.information(self, "Success", f"PDF saved at: {file_path}")
-            self.status_label.setText("PDF saved successfully")
+            self.status_label.setText(f"Saving PDF ({profile})...")
+            # OCR results are cached by frame content, so only frames never recognised before cost anything
+            ocr = self.ocr_engine() if searchable else None
+            writer = StreamingPdfWriter(profile=profile)
+            if page_size == "screen":
+                words = ocr.map(self.screenshots) if ocr else None
+                for img in self.screenshots:
+                    writer.add_page(img, next(words) if words else None)
+            else:
+                write_pages(self.screenshots, writer, page_size, ocr)
+            writer.save_to(file_path)
+            self.pdf_saved(file_path, writer.stats())
         except Exception as e:
             try:
+                import img2pdf
                 with open(file_path, "wb") as pdf_file:
                     pdf_file.write(img2pdf.convert([img.convert('RGB') for img in self.screenshots]))
                 QMessageBox.information(self, "Success", f"PDF saved using fallback method at: {file_path}")
                 self.status_label.setText("PDF saved successfully (fallback)")
+                if self.journal:
+                    self.journal.mark_saved()
             except Exception as e2:
                 QMessageBox.critical(self, "Error", f"Failed to save PDF:\nPrimary error: {str(e)}\nFallback error: {str(e2)}")
                 self.status_label.setText("Error saving PDF")
                 print(f"Primary error: {str(e)}\nFallback error: {str(e2)}")
+        finally:
+            if writer:
+                writer.discard()
+
+    def save_image(self, file_path):
+        """Export the capture as one tall PNG or a Deep Zoom pyramid, streamed frame by frame."""
+        if self.capture_thread:
+            self.capture_thread.wait()
+        try:
+            self.status_label.setText("Exporting image...")
+            if file_path.lower().endswith(".dzi"):
+                stats = export_deep_zoom(self.screenshots, file_path)
+                summary = f"{stats['tiles']} tiles in {stats['levels']} levels"
+            else:
+                export_tall_png(self.screenshots, file_path)
+                summary = f"{os.path.getsize(file_path) / 1024:.0f} KB"
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export image:\n{str(e)}")
+            self.status_label.setText("Error exporting image")
+            print(f"Image export error: {str(e)}")
+            return
+        if self.journal:
+            self.journal.mark_saved()
+        print(f"Saved {file_path}: {summary}")
+        QMessageBox.information(self, "Success", f"Image saved at: {file_path}\n{summary}")
+        self.status_label.setText("Image saved successfully")
+
+    def pdf_saved(self, file_path, stats):
+        if self.journal:
+            self.journal.mark_saved()
+        summary = format_stats(stats)
+        print(f"Saved {file_path}: {summary}")
+        QMessageBox.information(self, "Success", f"PDF saved at: {file_path}\n{summary}")
+        self.status_label.setText("PDF saved successfully")
+        self.metrics_label.setText(summary)
+
+    def closeEvent(self, event):
+        if self.prepare_thread:
+            self.prepare_thread.stop()
+            self.prepare_thread.wait()
+        if self.capture_thread:
+            self.capture_thread.stop()
+            self.capture_thread.wait()
+            if not self.journal or self.journal.saved:
+                self.capture_thread.discard_pdf()
+        self.close_preview()
+        self.screenshots.clear()
+        if self.ocr:
+            self.ocr.close()
+        if self.journal:
+            # Unsaved captures stay on disk and are offered for resuming on the next launch
+            if self.journal.saved:
+                self.journal.delete()
+            else:
+                self.journal.close()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     import sys
+    # OCR runs in a process pool, which needs this in a frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     window = AutoScrollCapturePDF()
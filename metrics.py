@@ -0,0 +1,58 @@
+import json
+import threading
+import time
+
+
+class MetricsRecorder:
+    """Collect per-frame stage timings from the capture loop and the pipeline threads.
+
+    Stages report into a frame's record as they happen (add / add_time);
+    once the frame is stored and written, finish() hands the complete
+    record to on_record and, if a trace path was given, appends it to a
+    JSON-lines file. Times are stored in milliseconds under "<stage>_ms".
+    """
+
+    def __init__(self, trace_path=None, on_record=None):
+        self.trace_path = trace_path
+        self.trace = open(trace_path, "a", encoding="utf-8") if trace_path else None
+        self.on_record = on_record
+        self.records = {}
+        self.totals = {}
+        self.counts = {}  # frames that reported each total
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def add(self, frame_id, **values):
+        with self.lock:
+            self.records.setdefault(frame_id, {"frame": frame_id}).update(values)
+
+    def add_time(self, frame_id, stage, seconds):
+        self.add(frame_id, **{f"{stage}_ms": round(seconds * 1000, 3)})
+
+    def finish(self, frame_id, **values):
+        """Close a frame's record and publish it."""
+        with self.lock:
+            record = self.records.pop(frame_id, {"frame": frame_id})
+            record.update(values)
+            record["t"] = round(time.time() - self.started, 3)
+            for key, value in record.items():
+                # None means the stage didn't happen for this frame (no PDF writer, say)
+                if value is not None and (key.endswith("_ms") or key.endswith("bytes")):
+                    self.totals[key] = self.totals.get(key, 0) + value
+                    self.counts[key] = self.counts.get(key, 0) + 1
+            if self.trace:
+                self.trace.write(json.dumps(record) + "\n")
+                self.trace.flush()
+        if self.on_record:
+            self.on_record(record)
+
+    def summary(self):
+        """Mean of every timing and byte count over the finished frames that reported it."""
+        with self.lock:
+            return {key: round(total / self.counts[key], 3) for key, total in self.totals.items()}
+
+    def close(self):
+        with self.lock:
+            if self.trace:
+                self.trace.close()
+                self.trace = None
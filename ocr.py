@@ -0,0 +1,205 @@
+"""Local OCR for searchable PDFs, run in a process pool and cached by frame content.
+
+Text is recognised with Tesseract through pytesseract, one stored strip at
+a time, as a list of words with their pixel boxes. Results are keyed by a
+hash of the strip's pixels (and the language), kept in memory and on disk,
+so duplicate frames and re-exports with another profile or page size never
+run OCR again. The disk cache is capped by size and age.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from PIL import Image
+
+# Only check that pytesseract is there; it also needs the tesseract binary, see ocr_available()
+HAVE_PYTESSERACT = importlib.util.find_spec("pytesseract") is not None
+
+DEFAULT_LANG = "eng"
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "scroll2pdf-ocr")
+# Words Tesseract is less sure about than this (0-100) are left out of the text layer
+MIN_CONFIDENCE = 30
+# Strips in flight per worker process when mapping over many frames
+WINDOW_PER_PROCESS = 2
+# The on-disk cache is pruned to this size, oldest use first, and entries unused this long are dropped
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+
+def ocr_available():
+    """True if pytesseract is installed and can run the tesseract binary."""
+    if not HAVE_PYTESSERACT:
+        return False
+    import pytesseract
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+def content_key(img, lang=DEFAULT_LANG):
+    """Hash of a frame's pixels and the OCR language, used as the cache key."""
+    digest = hashlib.sha1(f"{lang}:{img.mode}:{img.width}x{img.height}:".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def recognize(mode, size, data, lang=DEFAULT_LANG, min_confidence=MIN_CONFIDENCE):
+    """Return [text, left, top, width, height] for every word on the image; runs in a worker process."""
+    import pytesseract
+    img = Image.frombytes(mode, size, data)
+    result = pytesseract.image_to_data(img, lang=lang, output_type=pytesseract.Output.DICT)
+    words = []
+    for text, confidence, left, top, width, height in zip(result["text"], result["conf"], result["left"],
+                                                          result["top"], result["width"], result["height"]):
+        text = text.strip()
+        if text and float(confidence) >= min_confidence:
+            words.append([text, left, top, width, height])
+    return words
+
+
+class OcrCache:
+    """Word lists by content key, in memory and as small JSON files in cache_dir.
+
+    A file's modification time is its last use; prune() drops files unused
+    for max_age seconds and then the least recently used ones until the
+    folder is below max_bytes.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        with self.lock:
+            words = self.entries.get(key)
+        if words is not None or not self.cache_dir:
+            return words
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as cache_file:
+                words = json.load(cache_file)
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            return None
+        with self.lock:
+            self.entries[key] = words
+        return words
+
+    def put(self, key, words):
+        with self.lock:
+            self.entries[key] = words
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp = self._path(key) + ".tmp"
+            with open(temp, "w", encoding="utf-8") as cache_file:
+                json.dump(words, cache_file)
+            os.replace(temp, self._path(key))
+        except OSError as e:
+            print(f"Could not write OCR cache: {str(e)}")
+
+    def prune(self, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        """Delete expired and least recently used files; returns how many were removed."""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        cutoff = time.time() - max_age
+        removed = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+class OcrEngine:
+    """Recognise text on frames in a process pool, overlapped with capture.
+
+    submit() returns a Future of the word list right away: cached frames
+    resolve at once, frames already in flight share one job, and the rest
+    go to the pool, which scales with the number of cores. The pool is
+    only started on the first cache miss.
+    """
+
+    def __init__(self, lang=DEFAULT_LANG, processes=None, cache_dir=CACHE_DIR):
+        self.lang = lang
+        self.processes = processes or os.cpu_count() or 1
+        self.cache = OcrCache(cache_dir)
+        self.pool = None
+        self.pending = {}  # content key -> Future, while a frame is being recognised
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def submit(self, img):
+        key = content_key(img, self.lang)
+        words = self.cache.get(key)
+        with self.lock:
+            if words is not None:
+                self.hits += 1
+                future = Future()
+                future.set_result(words)
+                return future
+            future = self.pending.get(key)
+            if future is not None:
+                self.hits += 1
+                return future
+            self.misses += 1
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.processes)
+            future = self.pool.submit(recognize, img.mode, img.size, img.tobytes(), self.lang)
+            self.pending[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done))
+        return future
+
+    def _finished(self, key, future):
+        if future.exception() is None:
+            self.cache.put(key, future.result())
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def map(self, images):
+        """Yield the word list of every image in order, with a bounded number in flight."""
+        window = deque()
+        for img in images:
+            window.append(self.submit(img))
+            if len(window) >= self.processes * WINDOW_PER_PROCESS:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+    def stats(self):
+        with self.lock:
+            return {"ocr_frames": self.misses, "ocr_cached": self.hits}
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+        self.cache.prune()
@@ -0,0 +1,79 @@
+import numpy as np
+
+# Defaults carried over from the original CaptureThread.check_page_end
+THUMBNAIL_SIZE = 100
+PIXEL_DIFF_THRESHOLD = 40
+SIMILARITY_THRESHOLD = 0.98
+REMAINING_HEIGHT_THRESHOLD = 35
+# Let Pillow box-reduce big frames before the final resample; 3.0 is
+# visually indistinguishable from a full resample and several times faster on 4K
+REDUCING_GAP = 3.0
+
+
+def downsample(img, size=THUMBNAIL_SIZE, reducing_gap=REDUCING_GAP):
+    """Shrink a frame to a size x size grayscale array used for comparisons."""
+    return np.asarray(img.resize((size, size), reducing_gap=reducing_gap).convert('L'), dtype=np.int16)
+
+
+def compare_thumbnails(current, previous, pixel_threshold=PIXEL_DIFF_THRESHOLD):
+    """Return (similarity, remaining_height) for two downsampled frames.
+
+    Both values come out of a single diff mask: similarity is the share of
+    pixels that stayed within the threshold, and remaining_height is the
+    number of rows from the bottom up to the lowest row that changed.
+    The height is measured in thumbnail rows, as it always has been.
+    """
+    diff = np.abs(current - previous) > pixel_threshold
+    similarity = 1 - diff.mean()
+
+    changed_rows = np.flatnonzero(diff.any(axis=1))
+    remaining_height = float(diff.shape[0] - changed_rows[-1]) if changed_rows.size else 0
+
+    return float(similarity), remaining_height
+
+
+class PageEndDetector:
+    """Compare each captured frame against the previous one to spot the page end.
+
+    The downsampled array of the last frame is cached, so every frame is
+    resized exactly once no matter how many comparisons it takes part in.
+    """
+
+    def __init__(self, size=THUMBNAIL_SIZE, pixel_threshold=PIXEL_DIFF_THRESHOLD,
+                 similarity_threshold=SIMILARITY_THRESHOLD,
+                 remaining_threshold=REMAINING_HEIGHT_THRESHOLD, reducing_gap=REDUCING_GAP):
+        self.size = size
+        self.reducing_gap = reducing_gap
+        self.pixel_threshold = pixel_threshold
+        self.similarity_threshold = similarity_threshold
+        self.remaining_threshold = remaining_threshold
+        self.previous = None
+
+    def reset(self):
+        self.previous = None
+
+    def thumbnail(self, frame):
+        return downsample(frame, self.size, self.reducing_gap)
+
+    def push(self, frame):
+        """Feed the next frame; returns (similarity, remaining_height) or None for the first one."""
+        return self.push_thumbnail(self.thumbnail(frame))
+
+    def push_thumbnail(self, current):
+        """Same as push() for a frame that was already run through thumbnail()."""
+        result = None
+        if self.previous is not None:
+            result = compare_thumbnails(current, self.previous, self.pixel_threshold)
+        self.previous = current
+        return result
+
+    def is_similar(self, similarity):
+        return similarity > self.similarity_threshold
+
+    def is_page_end(self, similarity, remaining_height):
+        return self.is_similar(similarity) and remaining_height < self.remaining_threshold
+
+
+def check_page_end(img1, img2, pixel_threshold=PIXEL_DIFF_THRESHOLD):
+    """One-off comparison of two full frames, without any caching."""
+    return compare_thumbnails(downsample(img1), downsample(img2), pixel_threshold)
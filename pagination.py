@@ -0,0 +1,138 @@
+"""Cut a capture into paper-shaped pages at quiet rows instead of at frame edges.
+
+The stored strips are scanned once, a few hundred rows at a time, into a
+per-row activity profile (how much each row varies across and how much it
+differs from the row above). Page breaks then go to the quietest row just
+above each target page height, which is usually the gap between two lines
+of text or around an image, and pages are assembled from the strips they
+span one at a time.
+"""
+import bisect
+
+from PIL import Image
+
+# Page height as a multiple of the capture width, from the paper's aspect ratio
+PAPER_SIZES = {"a4": 297 / 210, "letter": 11 / 8.5}
+# "screen" keeps one PDF page per stored frame, as before
+PAGE_SIZES = ("screen",) + tuple(PAPER_SIZES)
+DEFAULT_PAGE_SIZE = "screen"
+# Rows converted and diffed at once; bounds the profile's working memory
+STRIP_ROWS = 256
+# A break may move up by at most this share of the page height to find a quiet row
+SEARCH_FRACTION = 0.15
+# Rows within this much activity of the quietest one count as equally quiet
+QUIET_TOLERANCE = 0.5
+
+
+def page_height_for(width, page_size):
+    """Target page height in pixels for a capture of the given width."""
+    if page_size not in PAPER_SIZES:
+        raise ValueError(f"Unknown page size: {page_size}")
+    return max(1, round(width * PAPER_SIZES[page_size]))
+
+
+def row_activity(store, strip_rows=STRIP_ROWS):
+    """Return a float32 array with one activity value per row of the whole capture.
+
+    Activity is the mean absolute difference between neighbouring pixels in
+    the row plus the mean absolute difference to the row above, so blank
+    rows and rows of a flat background score 0. Every frame is read in
+    strips of strip_rows, so memory does not grow with the capture height.
+    """
+    import numpy as np
+    sizes = store.sizes
+    activity = np.empty(sum(height for _, height in sizes), dtype=np.float32)
+    row = 0
+    previous = None  # last row of the strip before, so the vertical diff carries across strips and frames
+    for index, (width, height) in enumerate(sizes):
+        frame = store[index]
+        for top in range(0, height, strip_rows):
+            bottom = min(height, top + strip_rows)
+            gray = np.asarray(frame.crop((0, top, width, bottom)).convert('L'), dtype=np.int16)
+            across = np.abs(np.diff(gray, axis=1)).mean(axis=1) if width > 1 else np.zeros(len(gray))
+            if previous is None or previous.shape[0] != width:
+                previous = gray[0]
+            above = np.abs(np.diff(gray, axis=0, prepend=previous[None, :])).mean(axis=1)
+            activity[row:row + len(gray)] = across + above
+            previous = gray[-1]
+            row += len(gray)
+    return activity
+
+
+def find_breaks(activity, page_height, search=SEARCH_FRACTION, tolerance=QUIET_TOLERANCE):
+    """Return (top, bottom) row ranges of the pages, none taller than page_height.
+
+    Each break goes to the quietest row in the last search share of the
+    page; among rows about as quiet as that, the lowest one wins so pages
+    stay close to the target height.
+    """
+    import numpy as np
+    total = len(activity)
+    window = max(1, int(page_height * search))
+    pages = []
+    top = 0
+    while total - top > page_height:
+        low = top + page_height - window
+        candidates = activity[low:top + page_height + 1]
+        quiet = np.flatnonzero(candidates <= candidates.min() + tolerance)
+        # Breaking at row r ends the page just above it
+        bottom = max(top + 1, low + int(quiet[-1]))
+        pages.append((top, bottom))
+        top = bottom
+    if top < total:
+        pages.append((top, total))
+    return pages
+
+
+def paginate(store, page_size):
+    """Page ranges for the stored capture at the given paper size."""
+    width = max(width for width, _ in store.sizes)
+    return find_breaks(row_activity(store), page_height_for(width, page_size))
+
+
+def iter_pages(store, pages):
+    """Yield one RGB image per (top, bottom) range, loading only the frames it spans."""
+    sizes = store.sizes
+    width = max(width for width, _ in sizes)
+    offsets = [0]
+    for _, height in sizes:
+        offsets.append(offsets[-1] + height)
+    for top, bottom in pages:
+        page = Image.new('RGB', (width, bottom - top), "white")
+        index = bisect.bisect_right(offsets, top) - 1
+        while index < len(sizes) and offsets[index] < bottom:
+            frame_top = offsets[index]
+            crop_top = max(top, frame_top) - frame_top
+            crop_bottom = min(bottom, offsets[index + 1]) - frame_top
+            strip = store[index].crop((0, crop_top, sizes[index][0], crop_bottom))
+            page.paste(strip.convert('RGB'), (0, frame_top + crop_top - top))
+            index += 1
+        yield page
+
+
+def page_words(store, strip_words, pages):
+    """Move per-strip OCR words onto the pages their boxes start on, in page coordinates."""
+    result = [[] for _ in pages]
+    tops = [top for top, _ in pages]
+    offset = 0
+    for (_, height), words in zip(store.sizes, strip_words):
+        for text, left, top, width, word_height in words or ():
+            y = offset + top
+            page = bisect.bisect_right(tops, y) - 1
+            page_top, page_bottom = pages[page]
+            result[page].append([text, left, y - page_top, width, min(word_height, page_bottom - y)])
+        offset += height
+    return result
+
+
+def write_pages(store, writer, page_size, ocr=None):
+    """Add the capture to a StreamingPdfWriter as paper-shaped pages; returns the page count.
+
+    With an OcrEngine the text is recognised per stored strip, so results
+    cached during capture are reused whatever the page size.
+    """
+    pages = paginate(store, page_size)
+    words = page_words(store, list(ocr.map(store)), pages) if ocr else [None] * len(pages)
+    for page, page_text in zip(iter_pages(store, pages), words):
+        writer.add_page(page, page_text)
+    return len(pages)
@@ -0,0 +1,449 @@
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+from PIL import Image
+
+# Same page scale Pillow used for us in save_pdf (resolution=100.0)
+RESOLUTION = 100.0
+JPEG_QUALITY = 75
+
+# Output profiles: what photo-like and text-like pages are encoded as.
+#   jpeg_quality   - JPEG quality for photo pages; None keeps them lossless (Flate)
+#   palette_colors - text pages are quantized to this many colours; 0 only uses a
+#                    palette when the page already has 256 colours or fewer
+#   compress_level - zlib level for Flate streams
+PROFILES = {
+    "lossless": {"jpeg_quality": None, "palette_colors": 0, "compress_level": 6},
+    "balanced": {"jpeg_quality": JPEG_QUALITY, "palette_colors": 256, "compress_level": 6},
+    "smallest": {"jpeg_quality": 45, "palette_colors": 32, "compress_level": 9},
+}
+DEFAULT_PROFILE = "balanced"
+
+# Content analysis looks at every SAMPLE_STEP-th pixel in both directions
+SAMPLE_STEP = 4
+# Largest R/G/B spread still counted as gray, and the share of pixels allowed to exceed it
+GRAY_TOLERANCE = 6
+GRAY_OUTLIERS = 0.001
+# A page is text-like when its FLAT_COLORS most common colours cover FLAT_SHARE of it
+FLAT_COLORS = 16
+FLAT_SHARE = 0.85
+# Invisible OCR text uses a glyph-less font whose every glyph is this wide (as a
+# share of the font size), stretched to each word's box
+TEXT_FONT_WIDTH = 0.5
+# Text codes are UTF-16 code units; characters outside the BMP become U+FFFD
+REPLACEMENT_CHARACTER = "\ufffd"
+
+
+def format_stats(stats):
+    """One-line summary of StreamingPdfWriter.stats() for the GUI and the CLI."""
+    encoders = ", ".join(f"{encoder} {count}" for encoder, count in sorted(stats["encoders"].items()))
+    return (f"{stats['profile']} profile: {stats['bytes'] / 1024:.0f} KB, "
+            f"{stats['encode_seconds']:.1f}s encoding, {stats['deduplicated']} identical pages shared"
+            + (f" ({encoders})" if encoders else "")
+            + (f", {stats['text_pages']} pages searchable" if stats.get("text_pages") else ""))
+
+
+def text_layer(words, page_height, scale):
+    """Content-stream operators that draw OCR words invisibly over their boxes.
+
+    words are [text, left, top, width, height] in page pixels; scale turns
+    pixels into points. Rendering mode 3 keeps the text out of sight while
+    it stays searchable and selectable. Text is written as two-byte codes
+    for the Identity-H font from text_font_objects(), so any script works.
+    """
+    ops = ["BT 3 Tr"]
+    for text, left, top, width, height in words:
+        text = "".join(char if ord(char) <= 0xFFFF else REPLACEMENT_CHARACTER for char in text)
+        size = max(1.0, height * scale)
+        stretch = 100.0 * width * scale / (size * TEXT_FONT_WIDTH * len(text))
+        encoded = text.encode("utf-16-be").hex()
+        ops.append(f"/F1 {size:.2f} Tf {stretch:.1f} Tz 1 0 0 1 {left * scale:.2f} "
+                   f"{(page_height - top - height) * scale:.2f} Tm <{encoded}> Tj")
+    ops.append("ET")
+    return "\n".join(ops).encode()
+
+
+def glyphless_truetype():
+    """A minimal TrueType font with an empty .notdef and one empty glyph TEXT_FONT_WIDTH em wide.
+
+    Only the tables a PDF needs for an embedded CIDFontType2 are included
+    (head, hhea, maxp, hmtx, loca, glyf); nothing is ever drawn with it.
+    """
+    units = 1000
+    advance = int(units * TEXT_FONT_WIDTH)
+    tables = {
+        b"head": struct.pack(">IIIIHHqqhhhhHHhhh", 0x00010000, 0x00010000, 0, 0x5F0F3CF5, 0x000B, units,
+                             0, 0, 0, 0, advance, units, 0, 8, 2, 0, 0),
+        b"hhea": struct.pack(">I3hH3h3h4hhH", 0x00010000, units, 0, 0, advance, 0, 0, advance, 1, 0, 0,
+                             0, 0, 0, 0, 0, 2),
+        b"maxp": struct.pack(">IH13H", 0x00010000, 2, 0, 0, 0, 0, 2, 0, 0, 0, 0, 0, 0, 0, 0),
+        b"hmtx": struct.pack(">HhHh", advance, 0, advance, 0),
+        b"loca": struct.pack(">3H", 0, 0, 0),
+        b"glyf": b"",
+    }
+
+    def checksum(data):
+        data += b"\0" * (-len(data) % 4)
+        return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+    count = len(tables)
+    power = 1 << (count.bit_length() - 1)
+    directory = struct.pack(">IHHHH", 0x00010000, count, power * 16, power.bit_length() - 1, (count - power) * 16)
+    offset = len(directory) + 16 * count
+    entries, body = b"", b""
+    for tag in sorted(tables):
+        data = tables[tag]
+        entries += struct.pack(">4sIII", tag, checksum(data), offset + len(body), len(data))
+        body += data + b"\0" * (-len(data) % 4)
+    font = bytearray(directory + entries + body)
+    # head.checkSumAdjustment makes the whole font sum to the magic number
+    head_offset = struct.unpack(">I", font[font.index(b"head") + 8:font.index(b"head") + 12])[0]
+    struct.pack_into(">I", font, head_offset + 8, (0xB1B0AFBA - checksum(bytes(font))) & 0xFFFFFFFF)
+    return bytes(font)
+
+
+def to_unicode_cmap():
+    """ToUnicode CMap that maps every two-byte code to the same UTF-16 code point (surrogates excluded)."""
+    ranges = [f"<{high:02X}00> <{high:02X}FF> <{high:02X}00>" for high in range(256) if not 0xD8 <= high <= 0xDF]
+    return ("/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+            "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+            "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+            f"{len(ranges)} beginbfrange\n" + "\n".join(ranges) + "\nendbfrange\n"
+            "endcmap\nCMapName currentdict /CIDInit /ProcSet findresource /defineresource pop\nend\nend").encode()
+
+
+def text_font_objects(font_id, first_id):
+    """(id, body, stream) of the text layer's font: a Type0 font over a glyph-less CIDFontType2.
+
+    Identity-H takes the UTF-16 codes from text_layer() as CIDs, every CID
+    maps to the one blank glyph, and the ToUnicode CMap turns the codes
+    back into text for search and copy.
+    """
+    cid_font, descriptor, font_file, cid_to_gid, to_unicode = range(first_id, first_id + 5)
+    program = glyphless_truetype()
+    gid_map = zlib.compress(b"\0\1" * 65536)
+    cmap = zlib.compress(to_unicode_cmap())
+    width = int(1000 * TEXT_FONT_WIDTH)
+    return [
+        (font_id, f"<< /Type /Font /Subtype /Type0 /BaseFont /GlyphLessFont /Encoding /Identity-H "
+                  f"/DescendantFonts [{cid_font} 0 R] /ToUnicode {to_unicode} 0 R >>", None),
+        (cid_font, f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /GlyphLessFont "
+                   f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                   f"/FontDescriptor {descriptor} 0 R /DW {width} /CIDToGIDMap {cid_to_gid} 0 R >>", None),
+        (descriptor, f"<< /Type /FontDescriptor /FontName /GlyphLessFont /Flags 5 /FontBBox [0 0 {width} 1000] "
+                     f"/ItalicAngle 0 /Ascent 1000 /Descent 0 /CapHeight 1000 /StemV 80 "
+                     f"/FontFile2 {font_file} 0 R >>", None),
+        (font_file, f"<< /Length {len(program)} /Length1 {len(program)} >>", program),
+        (cid_to_gid, f"<< /Length {len(gid_map)} /Filter /FlateDecode >>", gid_map),
+        (to_unicode, f"<< /Length {len(cmap)} /Filter /FlateDecode >>", cmap),
+    ]
+
+
+def analyse_page(img):
+    """Classify a page as ("text" or "photo", is_gray) from a sparse pixel sample."""
+    import numpy as np
+    sample = np.asarray(img)[::SAMPLE_STEP, ::SAMPLE_STEP].astype(np.int32)
+    spread = sample.max(axis=2) - sample.min(axis=2)
+    is_gray = np.count_nonzero(spread > GRAY_TOLERANCE) <= spread.size * GRAY_OUTLIERS
+    packed = (sample[..., 0] << 16) | (sample[..., 1] << 8) | sample[..., 2]
+    counts = np.sort(np.unique(packed, return_counts=True)[1])
+    flat = counts[-FLAT_COLORS:].sum() / packed.size
+    return ("text" if flat >= FLAT_SHARE else "photo"), bool(is_gray)
+
+
+def exact_palette(img, colors):
+    """Convert an RGB image that uses only the given colours to mode P without loss."""
+    import numpy as np
+    table = np.array(sorted((r << 16) | (g << 8) | b for r, g, b in colors), dtype=np.uint32)
+    pixels = np.asarray(img).astype(np.uint32)
+    packed = (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+    indexed = Image.frombytes('P', img.size, np.searchsorted(table, packed).astype(np.uint8).tobytes())
+    indexed.putpalette(np.stack([table >> 16, (table >> 8) & 255, table & 255], axis=1).astype(np.uint8).tobytes())
+    return indexed
+
+
+def png_parts(img, compress_level):
+    """Encode img as PNG and return (bit depth, palette bytes, IDAT data).
+
+    PNG's zlib stream with per-row predictors is exactly what a FlateDecode
+    image with /Predictor 15 expects, so it can go into the PDF untouched.
+    """
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", compress_level=compress_level)
+    png = buffer.getvalue()
+    position = 8
+    bit_depth, palette, idat = 8, b"", []
+    while position < len(png):
+        length, kind = struct.unpack(">I4s", png[position:position + 8])
+        chunk = png[position + 8:position + 8 + length]
+        if kind == b"IHDR":
+            bit_depth = chunk[8]
+        elif kind == b"PLTE":
+            palette = chunk
+        elif kind == b"IDAT":
+            idat.append(chunk)
+        position += length + 12
+    return bit_depth, palette, b"".join(idat)
+
+
+class StreamingPdfWriter:
+    """Write a PDF one page at a time into a temp file.
+
+    Every page is encoded and flushed as soon as it is added, so nothing but
+    the current frame is held in memory. close() writes the page tree and
+    the xref table; after that the file is a complete PDF and save_to()
+    only has to copy it.
+
+    Each page's encoding is picked by analyse_page() within the limits of
+    the output profile (see PROFILES), and byte-identical images are only
+    stored once.
+
+    add_page() returns a small record of the objects it wrote. Passing the
+    records of an earlier run as pages reopens that file, cuts off whatever
+    came after the last recorded page (a torn write or the closing page
+    tree) and carries on appending, so an interrupted capture keeps its PDF.
+
+    Pages given OCR words get their own content stream with an invisible
+    text layer (see text_layer), which makes the PDF searchable.
+    """
+
+    def __init__(self, path=None, resolution=RESOLUTION, quality=None, profile=DEFAULT_PROFILE, pages=None):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown output profile: {profile}")
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="scroll2pdf-", suffix=".pdf")
+            os.close(fd)
+        self.path = path
+        self.resolution = resolution
+        self.profile = profile
+        self.settings = dict(PROFILES[profile])
+        if quality is not None:
+            self.settings["jpeg_quality"] = quality
+        self.offsets = {}
+        self.page_ids = []
+        self.images = {}  # image stream digest -> XObject id, for sharing identical pages
+        self.contents = {}  # page size -> content stream id
+        self.font_id = None  # the text layer's font, written with the first page that has text
+        self.text_pages = 0
+        self.deduplicated = 0
+        self.encoders = {}  # encoder name -> pages
+        self.encode_seconds = 0.0
+        self.stats_lock = threading.Lock()  # encode_image() runs on pipeline worker threads
+        self.next_id = 3  # 1 = catalog, 2 = page tree, both written in close()
+        self.closed = False
+        if pages:
+            self.file = open(path, "r+b")
+            self._replay(pages)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _replay(self, pages):
+        """Restore the object table from earlier page records and truncate after the last page."""
+        for record in pages:
+            for obj_id, offset in record["objects"]:
+                self.offsets[obj_id] = offset
+                self.next_id = max(self.next_id, obj_id + 1)
+            if record["image"]:
+                digest, image_id = record["image"]
+                self.images[bytes.fromhex(digest)] = image_id
+            else:
+                self.deduplicated += 1
+            if record["content"]:
+                width, height, content_id = record["content"]
+                self.contents[(width, height)] = content_id
+            # "font" in older sessions was a WinAnsi Helvetica; pages after a resume get the Unicode font
+            if record.get("unicode_font"):
+                self.font_id = record["unicode_font"]
+            if record.get("text"):
+                self.text_pages += 1
+            self.page_ids.append(record["page"])
+        self.file.truncate(pages[-1]["end"])
+        self.file.seek(pages[-1]["end"])
+
+    @property
+    def page_count(self):
+        return len(self.page_ids)
+
+    def _reserve(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body, stream=None):
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode())
+        self.file.write(body)
+        if stream is not None:
+            self.file.write(b"\nstream\n")
+            self.file.write(stream)
+            self.file.write(b"\nendstream")
+        self.file.write(b"\nendobj\n")
+
+    def encode_image(self, img):
+        """Return (dictionary entries, stream bytes) for an image XObject."""
+        start = time.perf_counter()
+        img = img.convert('RGB')
+        kind, is_gray = analyse_page(img)
+        quality = self.settings["jpeg_quality"]
+        if kind == "photo" and quality is not None:
+            encoder, entries, data = self._encode_jpeg(img.convert('L') if is_gray else img, quality)
+        else:
+            encoder, entries, data = self._encode_flate(img, kind, is_gray)
+        with self.stats_lock:
+            self.encoders[encoder] = self.encoders.get(encoder, 0) + 1
+            self.encode_seconds += time.perf_counter() - start
+        return entries, data
+
+    def _encode_jpeg(self, img, quality):
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=quality)
+        color_space = "/DeviceGray" if img.mode == "L" else "/DeviceRGB"
+        entries = (f"/Width {img.width} /Height {img.height} /ColorSpace {color_space} "
+                   f"/BitsPerComponent 8 /Filter /DCTDecode")
+        return ("jpeg-gray" if img.mode == "L" else "jpeg"), entries, buffer.getvalue()
+
+    def _encode_flate(self, img, kind, is_gray):
+        colors = self.settings["palette_colors"]
+        used = img.getcolors(colors or 256)
+        if used is not None:
+            # Few enough colours for an exact palette, which is lossless
+            img, encoder = exact_palette(img, [color for _, color in used]), "palette"
+        elif kind == "text" and colors:
+            img, encoder = img.quantize(colors, method=Image.Quantize.FASTOCTREE), "palette"
+        elif is_gray:
+            img, encoder = img.convert('L'), "flate-gray"
+        else:
+            encoder = "flate"
+
+        bit_depth, palette, data = png_parts(img, self.settings["compress_level"])
+        if img.mode == "P":
+            color_space = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+            channels = 1
+        elif img.mode == "L":
+            color_space, channels = "/DeviceGray", 1
+        else:
+            color_space, channels = "/DeviceRGB", 3
+        entries = (f"/Width {img.width} /Height {img.height} /ColorSpace {color_space} "
+                   f"/BitsPerComponent {bit_depth} /Filter /FlateDecode "
+                   f"/DecodeParms << /Predictor 15 /Colors {channels} /BitsPerComponent {bit_depth} "
+                   f"/Columns {img.width} >>")
+        return encoder, entries, data
+
+    def add_page(self, img, words=None):
+        """Encode img and append it as a new page; returns the page record."""
+        return self.add_encoded_page(img.size, *self.encode_image(img), words=words)
+
+    def add_encoded_page(self, size, entries, data, words=None):
+        """Append a page from the output of encode_image(), which may run on another thread.
+
+        Returns the page record: the objects written with their offsets, the
+        new image and content stream (if any) and where the page ends.
+        words are OCR results for the page, laid over it as invisible text.
+        """
+        if self.closed:
+            raise ValueError("PDF writer is already closed")
+        width = size[0] * 72.0 / self.resolution
+        height = size[1] * 72.0 / self.resolution
+
+        # Pages that encode to the same bytes (repeated frames, blank strips) share one image
+        record = {"objects": [], "image": None, "content": None}
+        digest = hashlib.sha1(entries.encode() + data).digest()
+        image_id = self.images.get(digest)
+        if image_id is None:
+            image_id = self.images[digest] = self._reserve()
+            self._write_object(image_id, f"<< /Type /XObject /Subtype /Image {entries} "
+                                         f"/Length {len(data)} >>".encode(), data)
+            record["image"] = [digest.hex(), image_id]
+            record["objects"].append([image_id, self.offsets[image_id]])
+        else:
+            self.deduplicated += 1
+        image = f"q {width:.2f} 0 0 {height:.2f} 0 0 cm /Im0 Do Q".encode()
+        fonts = ""
+        if words:
+            # Text differs on every page, so these content streams are never shared
+            if self.font_id is None:
+                self.font_id = record["unicode_font"] = self._reserve()
+                first_id = self.next_id
+                self.next_id += 5
+                for obj_id, body, stream in text_font_objects(self.font_id, first_id):
+                    self._write_object(obj_id, body.encode(), stream)
+                    record["objects"].append([obj_id, self.offsets[obj_id]])
+            content = image + b"\n" + text_layer(words, size[1], 72.0 / self.resolution)
+            content_id = self._reserve()
+            self._write_object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+            record["objects"].append([content_id, self.offsets[content_id]])
+            record["text"] = True
+            self.text_pages += 1
+            fonts = f" /Font << /F1 {self.font_id} 0 R >>"
+        else:
+            content_id = self.contents.get(tuple(size))
+            if content_id is None:
+                content_id = self.contents[tuple(size)] = self._reserve()
+                self._write_object(content_id, f"<< /Length {len(image)} >>".encode(), image)
+                record["content"] = [size[0], size[1], content_id]
+                record["objects"].append([content_id, self.offsets[content_id]])
+        page_id = self._reserve()
+        self._write_object(page_id, (f"<< /Type /Page /Parent 2 0 R "
+                                     f"/MediaBox [0 0 {width:.2f} {height:.2f}] "
+                                     f"/Resources << /XObject << /Im0 {image_id} 0 R >>{fonts} >> "
+                                     f"/Contents {content_id} 0 R >>").encode())
+        self.page_ids.append(page_id)
+        self.file.flush()
+        record["objects"].append([page_id, self.offsets[page_id]])
+        record.update(page=page_id, end=self.file.tell())
+        return record
+
+    def close(self):
+        """Write the page tree, xref and trailer. Safe to call more than once."""
+        if self.closed:
+            return
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self.file.tell()
+        self.file.write(f"xref\n0 {self.next_id}\n".encode())
+        self.file.write(b"0000000000 65535 f \n")
+        for obj_id in range(1, self.next_id):
+            self.file.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode())
+        self.file.write(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\n"
+                        f"startxref\n{xref_offset}\n%%EOF\n".encode())
+        self.file.close()
+        self.closed = True
+
+    def stats(self):
+        """Profile, size so far, total encode time and how each page was encoded."""
+        with self.stats_lock:
+            encoders = dict(self.encoders)
+            encode_seconds = self.encode_seconds
+        if not self.file.closed:
+            size = self.file.tell()
+        else:
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"profile": self.profile, "pages": self.page_count, "bytes": size,
+                "encode_seconds": round(encode_seconds, 3), "deduplicated": self.deduplicated,
+                "encoders": encoders, "text_pages": self.text_pages}
+
+    def save_to(self, file_path):
+        """Finish the document if needed and copy it to file_path."""
+        self.close()
+        shutil.copyfile(self.path, file_path)
+
+    def discard(self):
+        """Close and delete the temp file."""
+        if not self.file.closed:
+            self.file.close()
+        self.closed = True
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
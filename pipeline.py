@@ -0,0 +1,395 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from frame_index import FrameIndex, dhash
+from ocr import WINDOW_PER_PROCESS
+from page_end import PageEndDetector
+from sticky import StickyBands, crop_bands
+from stitching import FrameStitcher, row_signature
+
+# Frames allowed in flight between the grab and the PDF write
+MAX_PENDING = 6
+# Longest the capture thread waits for a free slot before analysing the frame itself
+MAX_WAIT = 2.0
+
+
+def default_workers():
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+class CapturePipeline:
+    """Turn grabbed frames into stored strips and PDF pages off the capture thread.
+
+    submit() only hands the frame over. Downsampling for page-end detection,
+    the stitching signature and the PDF encode run on a thread pool (Pillow
+    and NumPy release the GIL for the heavy parts). A collector thread then
+    applies the results in capture order, since page-end and overlap checks
+    depend on the previous frame.
+
+    At most max_pending frames are in flight, so memory stays bounded
+    however slow the encoder is. When the pool falls behind, submit() waits
+    up to max_wait seconds for a slot, then analyses the frame itself while
+    the encoder catches up, and only queues it once a slot is free.
+
+    Every frame is also looked up in a perceptual-hash FrameIndex of the
+    whole session. Repeats of any earlier frame are dropped when
+    drop_duplicates is set, and a run of them stops the capture (through
+    page_end, with loop_detected set) when stop_on_loop is set.
+
+    If a MetricsRecorder is given, every stage reports its timing into the
+    frame's record, along with the page-end and stitching numbers.
+
+    With an OcrEngine, each stored strip is sent off for text recognition as
+    soon as it is stored, and the writer lays the words over its page.
+    Without a streaming writer (paper-sized pages are cut after capture)
+    the strips are still recognised while capturing, so pagination later
+    finds the words in the OCR cache; as in OcrEngine.map(), only a few
+    strips per OCR process are queued at once.
+
+    With remove_sticky, fixed headers and footers are tracked with
+    StickyBands and cropped from every frame after the first, so stitching,
+    page-end detection and the output only see the scrolling region. A
+    band that isn't confirmed yet is only cropped if the stitcher then
+    finds the overlap, and a frame whose cropped region doesn't line up is
+    kept whole.
+
+    With a SessionJournal, every stored strip and PDF page is persisted as
+    it happens, and a journal that already has frames seeds the page-end,
+    stitching and duplicate state so a resumed capture carries straight on.
+    """
+
+    def __init__(self, store, pdf_writer=None, stitch=True, detect_end=True, workers=None,
+                 max_pending=MAX_PENDING, max_wait=MAX_WAIT, on_status=None, on_frame=None, metrics=None,
+                 drop_duplicates=True, stop_on_loop=True, journal=None, ocr=None, remove_sticky=True):
+        self.store = store
+        self.writer = pdf_writer
+        self.detector = PageEndDetector()
+        self.detect_end = detect_end
+        self.stitcher = FrameStitcher() if stitch else None
+        self.sticky = StickyBands() if remove_sticky else None
+        self.crop = (0, 0)  # bands cropped from the last accepted frame
+        self.previous_frame = None
+        self.index = FrameIndex() if drop_duplicates or stop_on_loop else None
+        self.drop_duplicates = drop_duplicates
+        self.stop_on_loop = stop_on_loop
+        self.duplicates = 0
+        self.loop_detected = False
+        self.max_wait = max_wait
+        self.on_status = on_status or (lambda message: None)
+        self.on_frame = on_frame or (lambda count: None)
+        self.metrics = metrics
+        self.journal = journal
+        self.ocr = ocr
+        self.ocr_pending = deque()  # OCR futures of strips no writer waits for
+        self.next_id = 0
+        if journal and journal.frames:
+            self._resume(journal)
+        self.page_end = threading.Event()
+        self.pool = ThreadPoolExecutor(max_workers=workers or default_workers())
+        self.slots = threading.Semaphore(max_pending)
+        self.analysed = queue.Queue()
+        self.encoded = queue.Queue()
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.writer_thread = threading.Thread(target=self._write, daemon=True)
+        self.collector.start()
+        self.writer_thread.start()
+
+    def _resume(self, journal):
+        """Continue from the last frame an earlier run stored."""
+        self.next_id = journal.pulled
+        if self.index:
+            for frame_id, thumbnail in journal.thumbnails():
+                self.index.check(frame_id, thumbnail)
+            self.index.repeats = 0
+        state = journal.last_state()
+        if state:
+            thumbnail, signature = state
+            self.detector.previous = thumbnail
+            # The journal keeps the full signature; bands are found again from the next frame on
+            if self.stitcher and signature is not None:
+                self.stitcher.previous = signature
+            if self.sticky:
+                self.sticky.previous = signature
+
+    def _time(self, frame_id, stage, start):
+        if self.metrics:
+            self.metrics.add_time(frame_id, stage, time.perf_counter() - start)
+
+    def analyse(self, frame, frame_id=None):
+        """Per-frame work that doesn't depend on any other frame.
+
+        The thumbnail is taken of the region inside the sticky bands known
+        right now; those bands are returned too, so the collector can tell
+        if they changed in the meantime.
+        """
+        start = time.perf_counter()
+        bands = self.sticky.bands if self.sticky else (0, 0)
+        signature = row_signature(frame) if self.stitcher or self.sticky else None
+        thumbnail = self.detector.thumbnail(crop_bands(frame, bands))
+        frame_hash = dhash(thumbnail) if self.index else None
+        self._time(frame_id, "downsample", start)
+        return thumbnail, signature, frame_hash, bands
+
+    def save_strip(self, journal, index, img, frame_id=None):
+        start = time.perf_counter()
+        path = journal.save_strip(index, img)
+        self._time(frame_id, "persist", start)
+        return path
+
+    def encode(self, writer, img, frame_id=None):
+        start = time.perf_counter()
+        encoded = writer.encode_image(img)
+        self._time(frame_id, "encode", start)
+        return encoded
+
+    def submit(self, frame, timings=None):
+        """Queue a freshly grabbed frame; called from the capture thread.
+
+        timings are the capture loop's own stage times in seconds (grab,
+        scroll, settle...), recorded with the frame when metrics are on.
+        """
+        frame_id = self.next_id
+        self.next_id += 1
+        if self.metrics:
+            self.metrics.add(frame_id, width=frame.width, height=frame.height,
+                             raw_bytes=frame.width * frame.height * len(frame.getbands()))
+            for stage, seconds in (timings or {}).items():
+                self.metrics.add_time(frame_id, stage, seconds)
+        start = time.perf_counter()
+        if self.slots.acquire(timeout=self.max_wait):
+            self._time(frame_id, "queue_wait", start)
+            future = self.pool.submit(self.analyse, frame, frame_id)
+        else:
+            self.on_status("Encoder is behind - analysing frame inline")
+            future = Future()
+            future.set_result(self.analyse(frame, frame_id))
+            # Still takes a slot, so frames can't pile up behind a slow encoder
+            self.slots.acquire()
+            self._time(frame_id, "queue_wait", start)
+        self.analysed.put((frame_id, frame, future))
+
+    def _collect(self):
+        """Apply page-end detection and stitching in capture order."""
+        while True:
+            item = self.analysed.get()
+            if item is None:
+                self.encoded.put(None)
+                return
+            frame_id, frame, future = item
+            try:
+                thumbnail, signature, frame_hash, bands = future.result()
+                new_rows = self._accept(frame_id, frame, thumbnail, signature, frame_hash, bands)
+            except Exception as e:
+                print(f"Frame analysis failed: {str(e)}")
+                new_rows = None
+            if new_rows is None:
+                self._done(frame_id, stored=False)
+                continue
+            self.store.append(new_rows)
+            self.on_frame(len(self.store))
+            persist = None
+            if self.journal:
+                # The strip is saved on the pool; the writer thread records it in order
+                index = len(self.store) - 1
+                saved = self.pool.submit(self.save_strip, self.journal, index, new_rows, frame_id)
+                persist = (saved, index, thumbnail, signature)
+            writer = self.writer
+            text = self.ocr.submit(new_rows) if self.ocr else None
+            if text and not writer:
+                self._hold_ocr(text)
+                text = None
+            if writer or persist:
+                future = self.pool.submit(self.encode, writer, new_rows, frame_id) if writer else None
+                self.encoded.put((frame_id, new_rows.size, future, persist, text))
+            else:
+                self._done(frame_id, stored=True, stored_height=new_rows.height)
+
+    def _hold_ocr(self, text):
+        """Track OCR nobody waits for, and wait for the oldest once too many strips are queued."""
+        self.ocr_pending.append(text)
+        while self.ocr_pending and (self.ocr_pending[0].done()
+                                    or len(self.ocr_pending) > self.ocr.processes * WINDOW_PER_PROCESS):
+            # exception() waits without raising; a failed strip is just recognised again when paginating
+            self.ocr_pending.popleft().exception()
+
+    def _accept(self, frame_id, frame, thumbnail, signature, frame_hash=None, bands=(0, 0)):
+        """Return the rows of frame worth keeping, or None to drop it."""
+        if self.page_end.is_set():
+            return None
+        whole = frame
+        if self.sticky:
+            frame, thumbnail, signature, frame_hash = self._unstick(frame_id, frame, thumbnail, signature,
+                                                                    frame_hash, bands)
+        start = time.perf_counter()
+        result = self.detector.push_thumbnail(thumbnail)
+        self._time(frame_id, "compare", start)
+        if result is not None:
+            similarity, remaining_height = result
+            if self.metrics:
+                self.metrics.add(frame_id, similarity=round(similarity, 4), remaining_height=remaining_height)
+            if self.detector.is_similar(similarity):
+                self.on_status(f"High similarity detected: {similarity:.3f}")
+                if self.detect_end and self.detector.is_page_end(similarity, remaining_height):
+                    self.on_status(f"Page end detected - remaining content: {remaining_height}px")
+                    self.page_end.set()
+                    return None
+                self.on_status(f"Continuing - remaining content: {remaining_height}px")
+            else:
+                self.on_status(f"Content differs - similarity: {similarity:.3f}")
+
+        if self.index and self._is_repeat(frame_id, frame, thumbnail, signature, frame_hash):
+            return None
+
+        if not self.stitcher:
+            return frame
+        # Keep only the rows this scroll actually revealed
+        start = time.perf_counter()
+        new_rows = self.stitcher.add(frame, signature)
+        self._time(frame_id, "stitch", start)
+        if self.metrics:
+            self.metrics.add(frame_id, offset=self.stitcher.last_offset)
+        if self.stitcher.last_offset is None and result is not None:
+            self.on_status("Could not match overlap - keeping full frame")
+            # Sticky bands included, so nothing under them is lost
+            return whole
+        return new_rows
+
+    def _unstick(self, frame_id, frame, thumbnail, signature, frame_hash, bands):
+        """Crop fixed headers and footers; returns frame, thumbnail, signature and hash of the scrolling region."""
+        start = time.perf_counter()
+        previous_signature = self.sticky.previous
+        if self.sticky.push(signature):
+            top, bottom = self.sticky.bands
+            self.on_status(f"Fixed bands found: {top}px at the top, {bottom}px at the bottom - cropping them")
+        crop = self.sticky.bands
+        if crop == (0, 0) and self.stitcher:
+            # Not confirmed yet, but safe to try: the frame is kept whole unless the stitcher lines the rest up
+            crop = self.sticky.candidate
+        if crop != self.crop:
+            # Compare against the previous frame cropped the same way
+            if self.stitcher and previous_signature is not None:
+                self.stitcher.previous = crop_bands(previous_signature, crop)
+            if self.previous_frame is not None:
+                self.detector.previous = self.detector.thumbnail(crop_bands(self.previous_frame, crop))
+        self.crop = crop
+        self.previous_frame = frame
+        if crop != bands:
+            thumbnail = self.detector.thumbnail(crop_bands(frame, crop))
+            frame_hash = dhash(thumbnail) if self.index else None
+        self._time(frame_id, "sticky", start)
+        if self.metrics and crop != (0, 0):
+            self.metrics.add(frame_id, sticky_top=crop[0], sticky_bottom=crop[1])
+        signature = crop_bands(signature, crop) if signature is not None else None
+        return crop_bands(frame, crop), thumbnail, signature, frame_hash
+
+    def _is_repeat(self, frame_id, frame, thumbnail, signature, frame_hash):
+        """Look the frame up in the session index; True if it should be dropped."""
+        start = time.perf_counter()
+        match = self.index.check(frame_id, thumbnail, frame_hash)
+        self._time(frame_id, "index", start)
+        if match is None:
+            return False
+        earlier, distance = match
+        if self.metrics:
+            self.metrics.add(frame_id, duplicate_of=earlier, hash_distance=distance)
+        if self.stop_on_loop and self.index.looping:
+            self.on_status(f"Loop detected - the last {self.index.repeats} frames all repeat earlier ones")
+            self.loop_detected = True
+            self.page_end.set()
+            return True
+        if not self.drop_duplicates:
+            return False
+        self.on_status(f"Frame {frame_id + 1} repeats frame {earlier + 1} - dropped")
+        self.duplicates += 1
+        if self.stitcher:
+            # Keep overlap matching in step with what is on screen
+            self.stitcher.add(frame, signature)
+        return True
+
+    def _write(self):
+        """Journal stored strips and append encoded pages to the PDF, in order."""
+        while True:
+            item = self.encoded.get()
+            if item is None:
+                return
+            frame_id, size, future, persist, text = item
+            values = {}
+            try:
+                if persist:
+                    self._record(frame_id, size, *persist)
+                if self.writer and future:
+                    written = self._write_page(frame_id, size, future, text)
+                    if written:
+                        record, values["encoded_bytes"] = written
+                        self._journal_page(record)
+            finally:
+                # Whatever failed above, the frame's slot must come back or the capture stalls
+                self._done(frame_id, stored=True, stored_height=size[1], **values)
+
+    def _write_page(self, frame_id, size, future, text):
+        """Append an encoded strip to the PDF; returns (page record, encoded bytes), or None if the writer failed."""
+        try:
+            entries, data = future.result()
+            words = self._words(frame_id, text) if text else None
+            start = time.perf_counter()
+            record = self.writer.add_encoded_page(size, entries, data, words)
+            self._time(frame_id, "write", start)
+            return record, len(data)
+        except Exception as e:
+            print(f"Streaming PDF writer failed: {str(e)}")
+            self.writer.discard()
+            self.writer = None
+            return None
+
+    def _journal_page(self, record):
+        """Journal a written PDF page; a journal error leaves the PDF alone and only ends resumability."""
+        journal = self.journal
+        if not journal:
+            return
+        try:
+            journal.add_page(record)
+        except Exception as e:
+            print(f"Session journal failed, capture is no longer resumable: {str(e)}")
+            self.journal = None
+
+    def _words(self, frame_id, text):
+        """Wait for a strip's OCR result; a failed recognition just leaves the page without text."""
+        start = time.perf_counter()
+        try:
+            words = text.result()
+        except Exception as e:
+            print(f"OCR failed: {str(e)}")
+            words = None
+        self._time(frame_id, "ocr_wait", start)
+        return words
+
+    def _record(self, frame_id, size, saved, index, thumbnail, signature):
+        """Journal a stored strip once its file is written."""
+        journal = self.journal
+        if not journal:
+            return
+        try:
+            path = saved.result()
+            journal.add_frame(frame_id, size, thumbnail, signature)
+            # The strip is on disk now, so the store can drop it from memory without spilling
+            self.store.attach_file(index, path)
+        except Exception as e:
+            print(f"Session journal failed, capture is no longer resumable: {str(e)}")
+            self.journal = None
+
+    def _done(self, frame_id, **values):
+        """Frame is fully handled: free its slot and publish its metrics."""
+        self.slots.release()
+        if self.metrics:
+            self.metrics.finish(frame_id, **values)
+
+    def close(self):
+        """Wait until every submitted frame is stored and written."""
+        self.analysed.put(None)
+        self.collector.join()
+        self.writer_thread.join()
+        self.pool.shutdown()
@@ -0,0 +1,163 @@
+"""In-app preview of a capture that only ever decodes what is on screen.
+
+The view is a QAbstractScrollArea whose scroll range comes from the frame
+sizes alone, so opening it touches no pixels. Frames that come into view
+are scaled to the viewport width on a background thread and kept in a
+bounded least-recently-used cache of thumbnails.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from PyQt6.QtWidgets import QAbstractScrollArea, QDialog, QVBoxLayout, QLabel
+from PyQt6.QtCore import pyqtSignal, Qt, QRect
+from PyQt6.QtGui import QImage, QPainter, QColor
+
+CACHE_BYTES = 96 * 1024 * 1024  # scaled thumbnails kept around for scrolling back
+PLACEHOLDER_COLOR = QColor(200, 200, 200)
+SCROLL_STEP = 40
+
+
+class ThumbnailCache:
+    """Bounded LRU cache of frames scaled to a given width, as QImages."""
+
+    def __init__(self, store, max_bytes=CACHE_BYTES):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.images = OrderedDict()  # (index, width) -> QImage, oldest first
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, index, width):
+        with self.lock:
+            image = self.images.get((index, width))
+            if image is not None:
+                self.images.move_to_end((index, width))
+            return image
+
+    def load(self, index, width):
+        """Scale one frame to width and cache it; safe to call from a worker thread."""
+        frame = self.store[index].convert('RGB')
+        height = max(1, round(frame.height * width / frame.width))
+        thumbnail = frame.resize((width, height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        data = thumbnail.tobytes()
+        image = QImage(data, width, height, width * 3, QImage.Format.Format_RGB888).copy()
+        with self.lock:
+            self.images[(index, width)] = image
+            self.bytes += image.sizeInBytes()
+            while self.bytes > self.max_bytes and len(self.images) > 1:
+                _, old = self.images.popitem(last=False)
+                self.bytes -= old.sizeInBytes()
+        return image
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+            self.bytes = 0
+
+
+class PreviewView(QAbstractScrollArea):
+    """Virtualized vertical strip of every stored frame, fitted to the viewport width."""
+
+    tile_ready = pyqtSignal()
+
+    def __init__(self, store, parent=None, cache_bytes=CACHE_BYTES):
+        super().__init__(parent)
+        self.store = store
+        self.sizes = store.sizes
+        self.max_width = max((width for width, _ in self.sizes), default=1)
+        self.cache = ThumbnailCache(store, cache_bytes)
+        self.loader = ThreadPoolExecutor(max_workers=1)
+        self.pending = set()
+        self.closed = False
+        self.wanted = set()  # frames visible at the last paint; stale requests are skipped
+        self.offsets = [0]
+        self.tile_width = 1
+        self.tile_ready.connect(self.viewport().update)
+        self.verticalScrollBar().setSingleStep(SCROLL_STEP)
+        self.update_layout()
+
+    def update_layout(self):
+        """Recompute every frame's scaled top edge for the current viewport width."""
+        self.tile_width = max(1, self.viewport().width())
+        scale = self.tile_width / self.max_width
+        self.offsets = [0]
+        for _, height in self.sizes:
+            self.offsets.append(self.offsets[-1] + max(1, round(height * scale)))
+        bar = self.verticalScrollBar()
+        bar.setRange(0, max(0, self.offsets[-1] - self.viewport().height()))
+        bar.setPageStep(self.viewport().height())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_layout()
+
+    def visible_frames(self):
+        top = self.verticalScrollBar().value()
+        bottom = top + self.viewport().height()
+        first = max(0, bisect.bisect_right(self.offsets, top) - 1)
+        last = min(len(self.sizes), bisect.bisect_left(self.offsets, bottom))
+        return range(first, last)
+
+    def frame_width(self, index):
+        # Frames narrower than the widest one keep their relative width
+        width = self.sizes[index][0]
+        return max(1, round(self.tile_width * width / self.max_width))
+
+    def request(self, index, width):
+        key = (index, width)
+        if self.closed or key in self.pending:
+            return
+        self.pending.add(key)
+        self.loader.submit(self._load, index, width)
+
+    def _load(self, index, width):
+        try:
+            if index in self.wanted:
+                self.cache.load(index, width)
+                self.tile_ready.emit()
+        except Exception as e:
+            print(f"Preview failed to load frame {index + 1}: {str(e)}")
+        finally:
+            self.pending.discard((index, width))
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        top = self.verticalScrollBar().value()
+        frames = self.visible_frames()
+        self.wanted = set(frames)
+        for index in frames:
+            width = self.frame_width(index)
+            rect = QRect(0, self.offsets[index] - top, width, self.offsets[index + 1] - self.offsets[index])
+            image = self.cache.get(index, width)
+            if image is None:
+                painter.fillRect(rect, PLACEHOLDER_COLOR)
+                self.request(index, width)
+            else:
+                painter.drawImage(rect.topLeft(), image)
+        painter.end()
+
+    def close_loader(self):
+        self.closed = True
+        self.wanted = set()
+        self.loader.shutdown(wait=True, cancel_futures=True)
+        self.cache.clear()
+
+
+class PreviewDialog(QDialog):
+    """Non-modal window around a PreviewView."""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Screenshot Preview")
+        self.resize(900, 800)
+        self.view = PreviewView(store, self)
+        sizes = store.sizes
+        info = QLabel(f"{len(sizes)} screenshots, {sum(height for _, height in sizes)}px tall")
+        info.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout = QVBoxLayout(self)
+        layout.addWidget(info)
+        layout.addWidget(self.view)
+        self.finished.connect(self.view.close_loader)
@@ -0,0 +1,98 @@
+"""Run several live captures at once, each on its own window or screen region.
+
+Every session gets its own thread, source, pipeline, store and output, so
+grabbing, comparing, stitching and encoding overlap freely between them.
+Only the mouse wheel and window focus are shared: every scroll goes
+through one InputArbiter, which gives the input to one target at a time
+and refocuses only when it moves to another target. While one session
+waits for its page to settle or grabs its region, the others scroll.
+
+Targets must not overlap on screen, or one session's window would cover
+the region another one grabs.
+"""
+import threading
+import time
+
+from calibration import ScrollProfiles
+from targets import InputArbiter
+
+
+def regions_overlap(first, second):
+    """Whether two targets can see each other's pixels: same screen (grabber) and intersecting regions."""
+    if first.grabber is not second.grabber:
+        return False
+    if first.bbox is None or second.bbox is None:
+        return True
+    left, top, right, bottom = first.bbox
+    other_left, other_top, other_right, other_bottom = second.bbox
+    return left < other_right and other_left < right and top < other_bottom and other_top < bottom
+
+
+class SessionScheduler:
+    """Capture jobs concurrently on distinct targets, time-slicing only the shared input.
+
+    add() takes a run_job() spec whose "source" is a screen source, and the
+    target to capture it from (see targets.py). run() blocks until every
+    session has finished and returns one summary per job, in the order
+    added; a failed session gets {"output", "error"} like run_jobs().
+    on_update(progress) is called from the session threads whenever a
+    session's progress dict (name, target, frames, status, done, result)
+    changes; without it, status messages are printed with the job name
+    in front, as run_job() does.
+    """
+
+    def __init__(self, arbiter=None, on_update=None, profiles=None):
+        self.arbiter = arbiter or InputArbiter()
+        self.on_update = on_update
+        self.profiles = profiles or ScrollProfiles()
+        self.sessions = []
+        self.lock = threading.Lock()
+        self.seconds = 0.0
+
+    def add(self, job, target):
+        """Queue a job on target; raises ValueError if target overlaps one already added."""
+        for _, other, _ in self.sessions:
+            if regions_overlap(target, other):
+                raise ValueError(f"{target.name} overlaps {other.name}")
+        progress = {"name": job.get("name", job["output"]), "target": target.name, "frames": 0,
+                    "status": "Waiting", "done": False, "result": None}
+        self.sessions.append((job, target, progress))
+        return progress
+
+    def _update(self, progress, **changes):
+        with self.lock:
+            progress.update(changes)
+        if self.on_update:
+            self.on_update(progress)
+        elif "status" in changes:
+            print(f"[{progress['name']}] {changes['status']}")
+
+    def _run_session(self, job, target, progress):
+        from core import make_source, run_job
+        try:
+            source = make_source(job["source"], target=target, scroller=self.arbiter.scroller(target),
+                                 profiles=self.profiles)
+            # Bring the target up before its first grab; later scrolls refocus it when needed
+            self.arbiter.focus(target)
+            result = run_job(job, on_status=lambda message: self._update(progress, status=message),
+                             source=source, on_frame=lambda count: self._update(progress, frames=count))
+        except Exception as e:
+            result = {"output": job.get("output"), "error": str(e)}
+        self._update(progress, done=True, result=result,
+                     status=f"Failed: {result['error']}" if "error" in result else "Done")
+
+    def run(self):
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._run_session, args=session, name=f"capture-{index}", daemon=True)
+                   for index, session in enumerate(self.sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.seconds = time.perf_counter() - start
+        return [progress["result"] for _, _, progress in self.sessions]
+
+    def stats(self):
+        """Input arbitration counters and wall time of the last run()."""
+        return dict(self.arbiter.stats(), sessions=len(self.sessions),
+                    seconds=round(self.seconds, 3))
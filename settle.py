@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+
+POLL_INTERVAL = 0.05
+STABLE_POLLS = 2
+# Shortest time the screen has to stay unchanged; lazy images often swap in a few hundred ms after a scroll
+MIN_QUIET = 0.4
+# Largest gray-level change of any thumbnail pixel still counted as "not moving"
+TOLERANCE = 8
+POLL_SIZE = 64
+
+
+def grab_region(bbox=None):
+    from PIL import ImageGrab
+    return ImageGrab.grab(bbox=bbox)
+
+
+class SettleWaiter:
+    """Wait after a scroll until the screen stops changing, instead of a fixed sleep.
+
+    The region is polled at low resolution. The frame is considered
+    settled once stable_polls consecutive polls match the one before and
+    nothing has changed for at least min_quiet seconds; a quick pair of
+    matching polls alone would accept placeholders that are about to be
+    swapped for lazy-loaded images. max_wait caps the wait for pages that
+    never stop animating.
+    """
+
+    def __init__(self, max_wait, bbox=None, interval=POLL_INTERVAL, stable_polls=STABLE_POLLS,
+                 tolerance=TOLERANCE, grab=grab_region, min_quiet=MIN_QUIET):
+        self.max_wait = max_wait
+        self.min_quiet = min_quiet
+        self.bbox = bbox
+        self.interval = interval
+        self.stable_polls = stable_polls
+        self.tolerance = tolerance
+        self.grab = grab
+
+    def poll(self):
+        img = self.grab(self.bbox)
+        return np.asarray(img.resize((POLL_SIZE, POLL_SIZE), reducing_gap=2.0).convert('L'), dtype=np.int16)
+
+    def wait(self):
+        """Block until settled or max_wait passes; returns (latency in seconds, settled)."""
+        start = time.perf_counter()
+        deadline = start + self.max_wait
+        previous = self.poll()
+        stable = 0
+        changed = start  # last time the screen was seen changing
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return time.perf_counter() - start, False
+            time.sleep(min(self.interval, remaining))
+            current = self.poll()
+            now = time.perf_counter()
+            if np.abs(current - previous).max() <= self.tolerance:
+                stable += 1
+                if stable >= self.stable_polls and now - changed >= self.min_quiet:
+                    return now - start, True
+            else:
+                stable = 0
+                changed = now
+            previous = current
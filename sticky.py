@@ -0,0 +1,102 @@
+"""Find fixed headers and footers that stay put while the page scrolls.
+
+Navigation bars, cookie banners and chat widgets sit at the same place in
+every frame. Comparing the row signatures of two consecutive frames at the
+same positions shows them as a run of unchanged rows at the top or bottom,
+while the content in between has moved. Once a band has been seen in
+STICKY_FRAMES frames in a row it is confirmed, and later frames can be
+cropped to the scrolling region in between.
+"""
+import numpy as np
+
+from stitching import ROW_TOLERANCE, MIN_ROW_CONTRAST
+
+# Consecutive frames a band has to stay unchanged in before it is confirmed
+STICKY_FRAMES = 3
+# Bands thinner than this are left alone
+MIN_BAND_ROWS = 8
+# Neither band may cover more than this share of the frame
+MAX_BAND_SHARE = 0.3
+# The rows in between only count as scrolled if fewer than this share of their detailed rows stayed put
+MAX_STATIC_SHARE = 0.5
+
+
+def static_bands(previous, current, min_rows=MIN_BAND_ROWS, max_share=MAX_BAND_SHARE):
+    """(top, bottom) rows that didn't change between two row signatures, or None if nothing scrolled.
+
+    Only runs of unchanged rows at the very top and bottom count, and only
+    when most of the detailed rows between them did change.
+    """
+    if previous is None or previous.shape != current.shape:
+        return None
+    height = current.shape[0]
+    static = np.abs(previous - current).max(axis=1) <= ROW_TOLERANCE
+    limit = int(height * max_share)
+    changed = np.flatnonzero(~static)
+    if not changed.size:
+        return None
+    top = min(int(changed[0]), limit)
+    bottom = min(height - 1 - int(changed[-1]), limit)
+    middle = slice(top, height - bottom)
+    detailed = (current[middle].max(axis=1) - current[middle].min(axis=1)) >= MIN_ROW_CONTRAST
+    if not detailed.any() or static[middle][detailed].mean() >= MAX_STATIC_SHARE:
+        return None
+    return (top if top >= min_rows else 0), (bottom if bottom >= min_rows else 0)
+
+
+class StickyBands:
+    """Track fixed bands at the top and bottom of the frame across a capture.
+
+    push() takes each frame's full row signature. bands is the confirmed
+    (top, bottom) number of rows to crop from frames, and candidate what
+    the last two frames alone suggest, which callers can try early if they
+    have another way to check it (the stitcher finding an overlap). A band
+    that changes is dropped straight away, so content is never cropped
+    because of a banner that has since gone.
+    """
+
+    def __init__(self, frames=STICKY_FRAMES, min_rows=MIN_BAND_ROWS, max_share=MAX_BAND_SHARE):
+        self.frames = frames
+        self.min_rows = min_rows
+        self.max_share = max_share
+        self.previous = None
+        self.runs = [0, 0]  # consecutive comparisons each band was seen in
+        self.heights = [0, 0]  # smallest height of each band over its run
+        self.candidate = (0, 0)
+
+    @property
+    def bands(self):
+        return tuple(height if runs >= self.frames - 1 else 0 for height, runs in zip(self.heights, self.runs))
+
+    def reset(self):
+        self.previous = None
+        self.runs = [0, 0]
+        self.heights = [0, 0]
+        self.candidate = (0, 0)
+
+    def push(self, signature):
+        """Feed the next frame's full signature; returns True if the confirmed bands changed."""
+        before = self.bands
+        previous, self.previous = self.previous, signature
+        found = static_bands(previous, signature, self.min_rows, self.max_share)
+        if found is None:
+            # The page didn't move, so this frame says nothing about the bands
+            return False
+        for side, height in enumerate(found):
+            if height:
+                self.heights[side] = min(self.heights[side], height) if self.runs[side] else height
+                self.runs[side] += 1
+            else:
+                self.heights[side] = self.runs[side] = 0
+        self.candidate = found
+        return self.bands != before
+
+
+def crop_bands(frame, bands):
+    """The part of a frame (an image or a row signature) between (top, bottom) bands."""
+    top, bottom = bands
+    if not top and not bottom:
+        return frame
+    if hasattr(frame, "crop"):
+        return frame.crop((0, top, frame.width, frame.height - bottom))
+    return frame[top:len(frame) - bottom]
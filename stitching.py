@@ -0,0 +1,116 @@
+import numpy as np
+
+# Width of the per-row signature; full height is kept so offsets are pixel exact
+SIGNATURE_COLUMNS = 64
+# Rows are matched in runs of this many, so flat blocks still have unique edges
+WINDOW_ROWS = 8
+# Rows flatter than this (max - min) are blank space and can't vote for an offset
+MIN_ROW_CONTRAST = 8
+# A run seen more often than this is a repeating pattern, not a landmark
+MAX_ROW_REPEATS = 4
+MIN_VOTES = 8
+# A row counts as matching when no column differs by more than this
+ROW_TOLERANCE = 16
+# Share of overlap rows allowed to mismatch when confirming an offset
+MAX_OVERLAP_ERROR = 0.02
+
+
+def row_signature(img, columns=SIGNATURE_COLUMNS):
+    """Grayscale array of the frame squeezed horizontally to a few columns."""
+    return np.asarray(img.convert('L').resize((columns, img.height), reducing_gap=3.0), dtype=np.int16)
+
+
+def window_keys(signature, rows=WINDOW_ROWS):
+    """Hashable key for every run of `rows` consecutive signature rows."""
+    row_ids = np.array([hash(row.tobytes()) for row in signature], dtype=np.int64)
+    return [row_ids[y:y + rows].tobytes() for y in range(len(row_ids) - rows + 1)]
+
+
+def overlap_error(previous, current, offset):
+    """Share of rows that disagree between previous[offset:] and the top of current."""
+    height = previous.shape[0] - offset
+    if height <= 0:
+        return float('inf')
+    diff = np.abs(previous[offset:] - current[:height]).max(axis=1)
+    return float((diff > ROW_TOLERANCE).mean())
+
+
+def estimate_offset(previous, current, min_votes=MIN_VOTES, max_error=MAX_OVERLAP_ERROR):
+    """Estimate how many rows the content moved up between two row signatures.
+
+    Every distinctive run of rows in the current frame is looked up by value
+    in the previous frame, and each match votes for the displacement that would line
+    them up. The winner is confirmed on the whole overlap before it is used.
+    Returns None if the frames don't overlap in a trustworthy way.
+    """
+    if previous.shape != current.shape:
+        return None
+    if overlap_error(previous, current, 0) <= max_error:
+        return 0
+
+    height = previous.shape[0]
+    previous_keys = window_keys(previous)
+    current_keys = window_keys(current)
+    contrast = current.max(axis=1) - current.min(axis=1)
+    positions = {}
+    for y, key in enumerate(previous_keys):
+        positions.setdefault(key, []).append(y)
+
+    votes = np.zeros(height, dtype=np.int64)
+    for y, key in enumerate(current_keys):
+        if contrast[y:y + WINDOW_ROWS].max() < MIN_ROW_CONTRAST:
+            continue
+        matches = positions.get(key)
+        if not matches or len(matches) > MAX_ROW_REPEATS:
+            continue
+        for match in matches:
+            if match > y:
+                votes[match - y] += 1
+
+    for offset in np.argsort(votes)[::-1][:3]:
+        if votes[offset] < min_votes:
+            break
+        if overlap_error(previous, current, offset) <= max_error:
+            return int(offset)
+    return None
+
+
+class FrameStitcher:
+    """Trim each captured frame down to the rows the last scroll revealed.
+
+    Pasting the returned strips end to end gives one seamless document,
+    without the duplicated or missing bands a fixed scroll height leaves.
+    """
+
+    def __init__(self, columns=SIGNATURE_COLUMNS):
+        self.columns = columns
+        self.previous = None
+        self.last_offset = None
+
+    def reset(self):
+        self.previous = None
+        self.last_offset = None
+
+    def signature(self, frame):
+        return row_signature(frame, self.columns)
+
+    def add(self, frame, signature=None):
+        """Return the part of frame that wasn't on screen before, or None if nothing new.
+
+        signature can be passed in when it was computed ahead of time.
+        """
+        current = signature if signature is not None else self.signature(frame)
+        previous, self.previous = self.previous, current
+        if previous is None:
+            self.last_offset = None
+            return frame
+
+        offset = estimate_offset(previous, current)
+        self.last_offset = offset
+        if offset is None:
+            # No reliable overlap (scrolled further than a screen, or the page
+            # changed under us) - keep the whole frame rather than lose content
+            return frame
+        if offset == 0:
+            return None
+        return frame.crop((0, frame.height - offset, frame.width, frame.height))
@@ -0,0 +1,301 @@
+"""Export a whole capture as one tall image or a Deep Zoom tile pyramid.
+
+Neither export builds the full canvas. Frames are fed in one at a time
+(straight from a FrameStore, or as they are captured) and written out a
+strip of rows at a time:
+
+- StreamingPngWriter filters each row (None, Sub or Up, whichever looks
+  smallest) and pushes it through one incremental zlib stream. The image
+  height goes into the PNG header when the writer is closed.
+- DeepZoomWriter cuts every resolution level into tiles as soon as it has
+  enough rows, and halves rows pairwise into the next level down, so each
+  level only keeps about one row of tiles in memory.
+
+Memory stays at roughly one frame plus encoder state, and time grows
+linearly with the number of pixels, however tall the page is.
+"""
+import math
+import os
+import shutil
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+PNG_COMPRESS_LEVEL = 6
+# Rows filtered at once; bounds the filter's working memory
+STRIP_ROWS = 256
+# Compressed bytes collected before an IDAT chunk is written
+IDAT_BYTES = 1024 * 1024
+# Deep Zoom defaults, as used by OpenSeadragon and deepzoom.py
+TILE_SIZE = 254
+TILE_OVERLAP = 1
+TILE_FORMATS = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP"}
+DEFAULT_TILE_FORMAT = "jpg"
+TILE_QUALITY = 90
+# Tiles waiting for an encoder thread, per thread
+TILES_PER_WORKER = 4
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def frame_rows(img, width):
+    """RGB rows of a frame as a uint8 array, padded with white on the right up to width."""
+    import numpy as np
+    rows = np.asarray(img.convert('RGB'))
+    if rows.shape[1] < width:
+        rows = np.pad(rows, ((0, 0), (0, width - rows.shape[1]), (0, 0)), constant_values=255)
+    return rows[:, :width]
+
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+
+def filter_rows(rows, previous):
+    """PNG-filter a (height, width * 3) uint8 block; returns it with a filter byte in front of each row.
+
+    Every row gets None, Sub or Up, whichever has the smallest sum of
+    absolute (signed) bytes, the usual PNG heuristic. previous is the row
+    above the block (zeros for the first row of the image).
+    """
+    import numpy as np
+    sub = rows.copy()
+    sub[:, 3:] -= rows[:, :-3]
+    up = rows - np.vstack([previous[None, :], rows[:-1]])
+    candidates = np.stack([rows, sub, up])
+    scores = np.abs(candidates.view(np.int8).astype(np.int16)).sum(axis=2, dtype=np.int64)
+    choice = scores.argmin(axis=0)
+    out = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = choice
+    out[:, 1:] = np.take_along_axis(candidates, choice[None, :, None], axis=0)[0]
+    return out
+
+
+class StreamingPngWriter:
+    """Write an 8-bit RGB PNG of a fixed width, row strips at a time, without knowing its height upfront."""
+
+    def __init__(self, path, width, compress_level=PNG_COMPRESS_LEVEL):
+        import numpy as np
+        self.path = path
+        self.width = width
+        self.height = 0
+        self.file = open(path, "wb")
+        self.compressor = zlib.compressobj(compress_level)
+        self.pending = []
+        self.pending_bytes = 0
+        self.previous = np.zeros(width * 3, dtype=np.uint8)
+        self.file.write(PNG_SIGNATURE)
+        # Written again with the real height on close()
+        self.file.write(png_chunk(b"IHDR", self._header()))
+
+    def _header(self):
+        return struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+
+    def add(self, img):
+        """Append a frame below everything added so far."""
+        rows = frame_rows(img, self.width)
+        for top in range(0, len(rows), STRIP_ROWS):
+            strip = rows[top:top + STRIP_ROWS].reshape(-1, self.width * 3)
+            self._push(self.compressor.compress(filter_rows(strip, self.previous).tobytes()))
+            self.previous = strip[-1]
+        self.height += len(rows)
+
+    def _push(self, data, force=False):
+        if data:
+            self.pending.append(data)
+            self.pending_bytes += len(data)
+        if self.pending_bytes >= IDAT_BYTES or (force and self.pending_bytes):
+            self.file.write(png_chunk(b"IDAT", b"".join(self.pending)))
+            self.pending = []
+            self.pending_bytes = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self._push(self.compressor.flush(), force=True)
+            self.file.write(png_chunk(b"IEND", b""))
+            self.file.seek(len(PNG_SIGNATURE))
+            self.file.write(png_chunk(b"IHDR", self._header()))
+        finally:
+            self.file.close()
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class PyramidLevel:
+    """One resolution level of a Deep Zoom pyramid, tiled as rows stream in.
+
+    Levels are numbered by how often they were halved (0 = full size)
+    while streaming, because the Deep Zoom level numbers depend on the
+    final height; DeepZoomWriter renames the folders at the end.
+    """
+
+    def __init__(self, writer, reduction, width):
+        self.writer = writer
+        self.reduction = reduction
+        self.width = width
+        self.folder = os.path.join(writer.files_dir, f"r{reduction}")
+        os.makedirs(self.folder)
+        self.buffer = None  # rows from buffer_top on that are still needed for tiles
+        self.buffer_top = 0
+        self.height = 0
+        self.tile_row = 0
+        self.odd_row = None  # last row of an odd count, waiting for its partner to be halved
+        self.child = None
+
+    def push(self, rows):
+        import numpy as np
+        self.buffer = rows if self.buffer is None else np.concatenate([self.buffer, rows])
+        self.height += len(rows)
+        size, overlap = self.writer.tile_size, self.writer.overlap
+        while self.height >= (self.tile_row + 1) * size + overlap:
+            self._emit()
+        self._halve(rows)
+
+    def _emit(self):
+        size, overlap = self.writer.tile_size, self.writer.overlap
+        top = max(0, self.tile_row * size - overlap)
+        bottom = min(self.height, (self.tile_row + 1) * size + overlap)
+        band = self.buffer[top - self.buffer_top:bottom - self.buffer_top]
+        for column, left in enumerate(range(0, self.width, size)):
+            tile = band[:, max(0, left - overlap):min(self.width, left + size + overlap)]
+            self.writer.save_tile(tile, os.path.join(self.folder, f"{column}_{self.tile_row}"))
+        self.tile_row += 1
+        # Keep only the rows the next tile row starts with (its top overlap included)
+        keep = max(0, self.tile_row * size - overlap)
+        self.buffer = self.buffer[keep - self.buffer_top:]
+        self.buffer_top = keep
+
+    def _halve(self, rows, final=False):
+        """Average rows pairwise (and columns pairwise) into the next smaller level."""
+        import numpy as np
+        if self.odd_row is not None:
+            rows = np.concatenate([self.odd_row, rows])
+            self.odd_row = None
+        if len(rows) % 2 and not final:
+            self.odd_row = rows[-1:]
+            rows = rows[:-1]
+        if not len(rows):
+            return
+        if len(rows) % 2:
+            rows = np.concatenate([rows, rows[-1:]])
+        total = rows[0::2].astype(np.uint16) + rows[1::2]
+        if self.width % 2:
+            total = np.concatenate([total, total[:, -1:]], axis=1)
+        half = ((total[:, 0::2] + total[:, 1::2] + 2) // 4).astype(np.uint8)
+        if self.child is None:
+            self.child = PyramidLevel(self.writer, self.reduction + 1, half.shape[1])
+        self.child.push(half)
+
+    def finish(self):
+        """Write the last, shorter row of tiles and flush the levels below; returns the level count."""
+        while self.tile_row * self.writer.tile_size < self.height:
+            self._emit()
+        self.buffer = None
+        if self.odd_row is not None and not (self.width == 1 and self.height == 1):
+            self._halve(self.odd_row[:0], final=True)
+        return 1 + (self.child.finish() if self.child else 0)
+
+
+class DeepZoomWriter:
+    """Write a Deep Zoom image (name.dzi plus a name_files folder of tiles) from streamed frames.
+
+    Tiles are encoded on a small thread pool (Pillow releases the GIL
+    while encoding), with a bounded number waiting, so memory stays flat.
+    """
+
+    def __init__(self, path, width, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, tile_format=DEFAULT_TILE_FORMAT,
+                 quality=TILE_QUALITY, workers=None):
+        if tile_format not in TILE_FORMATS:
+            raise ValueError(f"Unknown tile format: {tile_format}")
+        self.path = path
+        self.width = width
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.tile_format = tile_format
+        self.quality = quality
+        self.files_dir = os.path.splitext(path)[0] + "_files"
+        # Tiles of an earlier export with the same name would mix with the new ones
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+        os.makedirs(self.files_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.in_flight = deque()
+        self.tiles = 0
+        self.tile_bytes = 0
+        self.top = PyramidLevel(self, 0, width)
+
+    @property
+    def height(self):
+        return self.top.height
+
+    def add(self, img):
+        self.top.push(frame_rows(img, self.width))
+
+    def save_tile(self, tile, path):
+        self.in_flight.append(self.pool.submit(self._save, tile, path))
+        self.tiles += 1
+        while len(self.in_flight) > self.workers * TILES_PER_WORKER:
+            self.tile_bytes += self.in_flight.popleft().result()
+
+    def _save(self, tile, path):
+        """Encode one tile; returns its size in bytes."""
+        path = f"{path}.{self.tile_format}"
+        options = {"quality": self.quality} if self.tile_format != "png" else {}
+        Image.fromarray(tile).save(path, format=TILE_FORMATS[self.tile_format], **options)
+        return os.path.getsize(path)
+
+    def close(self):
+        """Finish every level and write the .dzi descriptor; returns {"levels", "tiles", "tile_bytes"}."""
+        try:
+            levels = self.top.finish()
+            while self.in_flight:
+                self.tile_bytes += self.in_flight.popleft().result()
+        finally:
+            self.pool.shutdown()
+        max_level = math.ceil(math.log2(max(self.width, self.height, 1)))
+        for reduction in range(levels):
+            os.replace(os.path.join(self.files_dir, f"r{reduction}"),
+                       os.path.join(self.files_dir, str(max_level - reduction)))
+        with open(self.path, "w", encoding="utf-8") as dzi_file:
+            dzi_file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                           f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{self.tile_size}" '
+                           f'Overlap="{self.overlap}" Format="{self.tile_format}">\n'
+                           f'  <Size Width="{self.width}" Height="{self.height}"/>\n'
+                           '</Image>\n')
+        return {"levels": levels, "tiles": self.tiles, "tile_bytes": self.tile_bytes}
+
+    def discard(self):
+        self.pool.shutdown(cancel_futures=True)
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+
+
+def _export(writer, frames):
+    try:
+        for img in frames:
+            writer.add(img)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.close()
+
+
+def export_tall_png(store, path, compress_level=PNG_COMPRESS_LEVEL):
+    """Write every stored frame, top to bottom, into one PNG at path."""
+    width = max(width for width, _ in store.sizes)
+    _export(StreamingPngWriter(path, width, compress_level), store)
+
+
+def export_deep_zoom(store, path, tile_format=DEFAULT_TILE_FORMAT, tile_size=TILE_SIZE, overlap=TILE_OVERLAP,
+                     quality=TILE_QUALITY):
+    """Write the stored frames as a Deep Zoom pyramid (path.dzi + path_files); returns DeepZoomWriter.close()'s stats."""
+    width = max(width for width, _ in store.sizes)
+    return _export(DeepZoomWriter(path, width, tile_size, overlap, tile_format, quality), store)
@@ -0,0 +1,179 @@
+"""Where a live capture looks and scrolls, and who gets the mouse wheel when.
+
+A capture target is anything with:
+
+    name            label for status messages
+    bbox            (left, top, right, bottom) screen region to grab, or None for the whole screen
+    grabber         grabber to use for it, or None for the default one
+    focus()         make the next scroll land on this target
+    scroll(clicks)  scroll it, like pyautogui.scroll
+
+ScreenTarget is a fixed region (a monitor, or part of one) and WindowTarget
+a desktop window found by its title. The benchmarks plug simulated windows
+in the same way, so several sessions can be exercised without a display.
+
+The wheel and keyboard focus are shared by every window on the desktop,
+so when several sessions run at once an InputArbiter hands them out one
+scroll at a time, in the order they were asked for.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from window_prep import FOCUS_TIMEOUT, load_pygetwindow, wait_until
+
+# Minimum size of a window worth capturing
+MIN_WINDOW_SIZE = 50
+
+
+def monitor_bbox(index):
+    """Screen region of monitor index (1 = primary, as in mss), or None if there is no such monitor."""
+    from grabbers import HAVE_MSS
+    if HAVE_MSS:
+        import mss
+        with mss.mss() as sct:
+            if not 0 < index < len(sct.monitors):
+                return None
+            monitor = sct.monitors[index]
+            return (monitor["left"], monitor["top"],
+                    monitor["left"] + monitor["width"], monitor["top"] + monitor["height"])
+    if index != 1:
+        print("mss not installed, only the primary monitor can be captured")
+        return None
+    import pyautogui
+    width, height = pyautogui.size()
+    return 0, 0, width, height
+
+
+def find_window(title):
+    """First visible window whose title contains title, or None."""
+    gw = load_pygetwindow()
+    if not gw:
+        print("pygetwindow not installed, windows can't be found by title")
+        return None
+    for window in gw.getAllWindows():
+        if title in window.title and window.visible:
+            return window
+    return None
+
+
+class ScreenTarget:
+    """A fixed screen region; scrolls go to wherever the pointer is, so it is moved there first."""
+
+    def __init__(self, bbox=None, name=None, grabber=None):
+        self.bbox = tuple(bbox) if bbox else None
+        self.name = name or (f"region {self.bbox}" if self.bbox else "screen")
+        self.grabber = grabber
+
+    def center(self):
+        if self.bbox:
+            left, top, right, bottom = self.bbox
+            return (left + right) // 2, (top + bottom) // 2
+        import pyautogui
+        width, height = pyautogui.size()
+        return width // 2, height // 2
+
+    def focus(self):
+        import pyautogui
+        pyautogui.moveTo(*self.center())
+
+    def scroll(self, clicks):
+        import pyautogui
+        pyautogui.scroll(clicks, *self.center())
+
+
+class WindowTarget(ScreenTarget):
+    """A desktop window found by (part of) its title; activated before it is scrolled."""
+
+    def __init__(self, title, grabber=None):
+        self.window = find_window(title)
+        if self.window is None:
+            raise ValueError(f"No window titled like {title!r}")
+        left, top = self.window.left, self.window.top
+        width, height = self.window.width, self.window.height
+        if width < MIN_WINDOW_SIZE or height < MIN_WINDOW_SIZE:
+            raise ValueError(f"Window {self.window.title!r} is too small to capture")
+        super().__init__((left, top, left + width, top + height), self.window.title, grabber)
+
+    def focus(self):
+        try:
+            if not self.window.isActive:
+                self.window.activate()
+                wait_until(lambda: self.window.isActive, FOCUS_TIMEOUT)
+        except Exception as e:
+            print(f"Error activating window {self.name}: {str(e)}")
+        super().focus()
+
+
+def make_target(spec, grabber=None):
+    """Target for a screen source spec with "window" (a title), "monitor" (a number) or "bbox"; None if none is set."""
+    if spec.get("window"):
+        return WindowTarget(spec["window"], grabber)
+    if spec.get("monitor"):
+        bbox = monitor_bbox(spec["monitor"])
+        if bbox is None:
+            raise ValueError(f"No monitor {spec['monitor']}")
+        return ScreenTarget(bbox, f"monitor {spec['monitor']}", grabber)
+    if spec.get("bbox"):
+        return ScreenTarget(spec["bbox"], grabber=grabber)
+    return None
+
+
+class InputArbiter:
+    """Hand the shared mouse wheel and focus to one target at a time, first come first served.
+
+    scroll() waits for its turn, focuses the target if another one had the
+    input last, scrolls and lets go straight away, so sessions only queue
+    for the scroll itself, never for each other's settle waits or grabs.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+        self.current = None  # target that had the input last
+        self.turns = 0
+        self.switches = 0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def turn(self):
+        start = time.perf_counter()
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            while ticket != self.serving:
+                self.condition.wait()
+            self.wait_seconds += time.perf_counter() - start
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.serving += 1
+                self.condition.notify_all()
+
+    def _focus(self, target):
+        if self.current is not target:
+            target.focus()
+            self.current = target
+            self.switches += 1
+
+    def focus(self, target):
+        """Give target the input now, e.g. to raise its window before the first grab."""
+        with self.turn():
+            self._focus(target)
+
+    def scroll(self, target, clicks):
+        with self.turn():
+            self.turns += 1
+            self._focus(target)
+            target.scroll(clicks)
+
+    def scroller(self, target):
+        """callable(clicks) for ScreenSource that scrolls target through the arbiter."""
+        return lambda clicks: self.scroll(target, clicks)
+
+    def stats(self):
+        with self.condition:
+            return {"input_turns": self.turns, "focus_switches": self.switches,
+                    "input_wait_seconds": round(self.wait_seconds, 3)}
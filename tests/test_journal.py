@@ -0,0 +1,107 @@
+import json
+import os
+import re
+
+import numpy as np
+from PIL import Image
+
+from frame_store import FrameStore
+from journal import JOURNAL, SessionJournal
+from pdf_writer import StreamingPdfWriter
+from simulator import SimulatedPage
+
+
+def check_pdf(path):
+    """Assert the PDF has one trailer whose xref points at every object; returns its page count."""
+    with open(path, "rb") as pdf_file:
+        data = pdf_file.read()
+    assert data.count(b"%%EOF") == 1
+    xref = int(re.search(rb"startxref\n(\d+)\n%%EOF", data).group(1))
+    assert data.startswith(b"xref\n", xref)
+    count = int(re.match(rb"xref\n0 (\d+)\n", data[xref:]).group(1))
+    entries = data[xref:].split(b"\n")[2:2 + count]
+    for obj_id, entry in enumerate(entries[1:], start=1):
+        offset = int(entry[:10])
+        assert data.startswith(f"{obj_id} 0 obj\n".encode(), offset)
+    return int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", data).group(1))
+
+
+def frames(count, seed=0):
+    page = SimulatedPage(width=320, height=240, page_height=2000, seed=seed)
+    images = []
+    for _ in range(count):
+        images.append(page.grab())
+        page.scroll(-240)
+    return images
+
+
+def test_writer_resume_appends_after_last_page(tmp_path):
+    path = str(tmp_path / "capture.pdf")
+    writer = StreamingPdfWriter(path)
+    first, second, third = frames(3)
+    records = [writer.add_page(first), writer.add_page(second, words=[["Привет", 10, 10, 80, 20]])]
+    writer.close()
+    # A torn page write after the closing trailer is cut off too
+    with open(path, "ab") as pdf_file:
+        pdf_file.write(b"99 0 obj\n<< /Len")
+
+    writer = StreamingPdfWriter(path, pages=records)
+    assert writer.page_count == 2
+    writer.add_page(third, words=[["world", 10, 10, 80, 20]])
+    writer.close()
+    assert check_pdf(path) == 3
+    with open(path, "rb") as pdf_file:
+        # The resumed page reuses the text font written with the second page
+        assert pdf_file.read().count(b"/Subtype /Type0") == 1
+
+
+def journal_session(path, images):
+    journal = SessionJournal(path, settings={})
+    for index, img in enumerate(images):
+        journal.save_strip(index, img)
+        journal.add_frame(index, img.size, np.zeros((100, 100)))
+    return journal
+
+
+def test_replay_drops_pages_before_reset(tmp_path):
+    path = str(tmp_path / "session")
+    journal = journal_session(path, frames(2))
+    journal.add_page({"page": 3, "end": 100})
+    journal.journal.write(json.dumps({"event": "pages_reset", "time": 0}) + "\n")
+    journal.add_page({"page": 5, "end": 200})
+    journal.close()
+
+    replayed = SessionJournal(path)
+    assert replayed.pages == [{"page": 5, "end": 200}]
+    replayed.close()
+
+
+def test_rebuilt_pdf_replaces_stale_page_records(tmp_path):
+    path = str(tmp_path / "session")
+    images = frames(2)
+    journal = journal_session(path, images)
+    store = FrameStore()
+    for img in images:
+        store.append(img)
+    journal.open_writer(store, profile="lossless").close()
+    journal.close()
+    # The PDF went away (a write error discards it); the next run rebuilds it with other settings
+    os.remove(os.path.join(path, "capture.pdf"))
+
+    journal = SessionJournal(path)
+    journal.open_writer(store, profile="smallest").close()
+    rebuilt = journal.pages
+    journal.close()
+    with open(os.path.join(path, JOURNAL), encoding="utf-8") as journal_file:
+        assert sum('"pages_reset"' in line for line in journal_file) == 1
+
+    # Resuming again must use the records of the rebuilt PDF, not the discarded one
+    journal = SessionJournal(path)
+    assert journal.pages == rebuilt
+    assert journal.pages[-1]["end"] <= os.path.getsize(journal.pdf_path)
+    writer = journal.open_writer(store, profile="smallest")
+    writer.add_page(Image.new("RGB", (320, 240), "white"))
+    writer.close()
+    journal.close()
+    assert check_pdf(journal.pdf_path) == 3
+    store.clear()
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from frame_store import FrameStore
+from pipeline import CapturePipeline
+from simulator import SimulatedPage
+
+
+class SlowWriter:
+    """Stands in for StreamingPdfWriter with an encoder far slower than the capture loop."""
+
+    def __init__(self, encode_seconds):
+        self.encode_seconds = encode_seconds
+        self.pages = 0
+        self.lock = threading.Lock()
+
+    def encode_image(self, img):
+        time.sleep(self.encode_seconds)
+        return "", b"data"
+
+    def add_encoded_page(self, size, entries, data, words=None):
+        with self.lock:
+            self.pages += 1
+        return {"page": self.pages}
+
+    def discard(self):
+        pass
+
+
+def capture(pipeline, page, frames, on_submit=None):
+    for _ in range(frames):
+        pipeline.submit(page.grab())
+        if on_submit:
+            on_submit()
+        page.scroll(-200)
+    pipeline.close()
+
+
+def make_pipeline(store, writer, messages, **options):
+    return CapturePipeline(store, writer, workers=1, detect_end=False, drop_duplicates=False,
+                           stop_on_loop=False, remove_sticky=False, on_status=messages.append, **options)
+
+
+def test_slow_writer_keeps_frames_in_flight_bounded():
+    page = SimulatedPage(width=320, height=400, page_height=4000)
+    store, writer, messages = FrameStore(), SlowWriter(0.1), []
+    pipeline = make_pipeline(store, writer, messages, max_pending=2, max_wait=0.02)
+    submitted, in_flight = [0], []
+
+    def on_submit():
+        submitted[0] += 1
+        with writer.lock:
+            in_flight.append(submitted[0] - writer.pages)
+
+    capture(pipeline, page, 8, on_submit)
+    assert max(in_flight) <= 2
+    assert "Encoder is behind - analysing frame inline" in messages
+    # Frames analysed inline are still stitched and written in capture order
+    assert writer.pages == len(store) == 8
+    assert sum(height for _, height in store.sizes) == 400 + 7 * 200
+    store.clear()
+
+
+def test_fast_writer_never_falls_back_inline():
+    page = SimulatedPage(width=320, height=400, page_height=4000)
+    store, writer, messages = FrameStore(), SlowWriter(0.0), []
+    capture(make_pipeline(store, writer, messages), page, 4)
+    assert "Encoder is behind - analysing frame inline" not in messages
+    assert writer.pages == len(store) == 4
+    store.clear()
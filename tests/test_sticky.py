@@ -0,0 +1,60 @@
+from simulator import SimulatedPage
+from sticky import STICKY_FRAMES, StickyBands, crop_bands
+from stitching import row_signature
+
+
+def scrolled_signatures(page, count, pixels=200):
+    signatures = []
+    for _ in range(count):
+        signatures.append(row_signature(page.grab()))
+        page.scroll(-pixels)
+    return signatures
+
+
+def test_bands_confirmed_after_sticky_frames():
+    page = SimulatedPage(width=640, height=480, page_height=4000, sticky_header=60, sticky_footer=40)
+    sticky = StickyBands()
+    changed = [sticky.push(signature) for signature in scrolled_signatures(page, STICKY_FRAMES + 2)]
+    # Two frames only make a candidate; the third confirms the smallest height seen so far
+    assert changed == [False] * (STICKY_FRAMES - 1) + [True, False, False]
+    assert sticky.bands == (60, 40)
+
+
+def test_candidate_is_not_confirmed_early():
+    page = SimulatedPage(width=640, height=480, page_height=4000, sticky_header=60)
+    sticky = StickyBands()
+    for signature in scrolled_signatures(page, STICKY_FRAMES - 1):
+        sticky.push(signature)
+    assert sticky.candidate[0] >= 60
+    assert sticky.bands == (0, 0)
+
+
+def test_unmoved_frame_says_nothing():
+    page = SimulatedPage(width=640, height=480, page_height=4000, sticky_header=60)
+    sticky = StickyBands()
+    signatures = scrolled_signatures(page, STICKY_FRAMES)
+    for signature in signatures:
+        sticky.push(signature)
+    assert not sticky.push(signatures[-1].copy())
+    assert sticky.bands == (60, 0)
+    assert sticky.runs[0] == STICKY_FRAMES - 1
+
+
+def test_band_that_goes_away_is_dropped():
+    page = SimulatedPage(width=640, height=480, page_height=4000, sticky_header=60)
+    sticky = StickyBands()
+    for signature in scrolled_signatures(page, STICKY_FRAMES):
+        sticky.push(signature)
+    # The banner is closed: from now on the top rows scroll with the page
+    page.sticky_header = 0
+    page.scroll(-200)
+    assert sticky.push(row_signature(page.grab()))
+    assert sticky.bands == (0, 0)
+
+
+def test_crop_bands_on_images_and_signatures():
+    page = SimulatedPage(width=640, height=480, page_height=4000)
+    frame = page.grab()
+    assert crop_bands(frame, (60, 40)).size == (640, 380)
+    assert crop_bands(row_signature(frame), (60, 40)).shape == (380, 64)
+    assert crop_bands(frame, (0, 0)) is frame
@@ -0,0 +1,55 @@
+from simulator import SimulatedPage
+from stitching import FrameStitcher, estimate_offset, row_signature
+
+
+def frames_after(page, *scrolls):
+    """Signature of the viewport now and after each scroll (in pixels down)."""
+    signatures = [row_signature(page.grab())]
+    for pixels in scrolls:
+        page.scroll(-pixels)
+        signatures.append(row_signature(page.grab()))
+    return signatures
+
+
+def test_offset_matches_scroll():
+    page = SimulatedPage(width=640, height=480, page_height=4000)
+    previous, current = frames_after(page, 300)
+    assert estimate_offset(previous, current) == 300
+
+
+def test_no_overlap_returns_none():
+    page = SimulatedPage(width=640, height=480, page_height=4000)
+    previous, current = frames_after(page, 1000)
+    assert estimate_offset(previous, current) is None
+
+
+def test_page_bottom_clamps_offset():
+    page = SimulatedPage(width=640, height=480, page_height=2000)
+    page.scroll(-1400)
+    # Only 120 rows are left below the viewport
+    previous, current, last = frames_after(page, 300, 300)
+    assert estimate_offset(previous, current) == 120
+    assert estimate_offset(current, last) == 0
+
+
+def test_stitcher_keeps_whole_frame_without_overlap():
+    page = SimulatedPage(width=640, height=480, page_height=4000)
+    stitcher = FrameStitcher()
+    first = page.grab()
+    assert stitcher.add(first) is first
+    page.scroll(-300)
+    assert stitcher.add(page.grab()).size == (640, 300)
+    page.scroll(-1000)
+    frame = page.grab()
+    assert stitcher.add(frame) is frame
+    assert stitcher.last_offset is None
+
+
+def test_stitcher_drops_frame_at_page_bottom():
+    page = SimulatedPage(width=640, height=480, page_height=2000)
+    page.scroll(-1520)
+    stitcher = FrameStitcher()
+    stitcher.add(page.grab())
+    page.scroll(-300)
+    assert stitcher.add(page.grab()) is None
+    assert stitcher.last_offset == 0
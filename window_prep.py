@@ -0,0 +1,239 @@
+"""Get the browser window ready for a capture without blocking the GUI.
+
+Everything here runs on a worker thread. Instead of fixed sleeps, each
+step waits for something observable: the app window reporting it has
+minimized, the browser window reporting it is active, or the screen
+no longer changing after a fullscreen toggle.
+"""
+import threading
+import time
+
+from grabbers import window_bbox
+
+BROWSER_TITLES = ["Chrome", "Firefox", "Edge", "Opera", "Safari"]
+MAX_ATTEMPTS = 3
+# Upper bounds on the event-based waits that replaced the old fixed sleeps
+MINIMIZE_TIMEOUT = 2.0
+FOCUS_TIMEOUT = 1.0
+TRANSITION_TIMEOUT = 2.0
+SETTLE_TIMEOUT = 3.0
+# Window transitions animate for a while; poll slower and want more quiet polls than after a scroll
+TRANSITION_INTERVAL = 0.1
+TRANSITION_STABLE_POLLS = 3
+
+_gw = None
+
+
+def load_pygetwindow():
+    """Import pygetwindow on first use; None if it isn't installed."""
+    global _gw
+    if _gw is None:
+        try:
+            import pygetwindow
+            _gw = pygetwindow
+        except (ImportError, NotImplementedError):
+            _gw = False  # Fallback if pygetwindow isn’t installed (or, on Linux, refuses to import)
+    return _gw or None
+
+
+def wait_until(predicate, timeout, interval=0.05, cancel=None):
+    """Poll predicate until it is true or timeout passes; returns its last result."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        if predicate():
+            return True
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0 or (cancel is not None and cancel.is_set()):
+            return False
+        if cancel is not None:
+            cancel.wait(min(interval, remaining))
+        else:
+            time.sleep(min(interval, remaining))
+
+
+def find_browser_window(focus_timeout=FOCUS_TIMEOUT):
+    """Find and return an active browser window using pygetwindow."""
+    gw = load_pygetwindow()
+    if not gw:
+        print("pygetwindow not installed, falling back to pyautogui")
+        return None
+
+    for window in gw.getAllWindows():
+        if not window.title.strip():
+            continue
+        if any(browser in window.title for browser in BROWSER_TITLES) and window.visible:
+            try:
+                print(f"Found browser window: {window.title} (Active: {window.isActive})")
+                if not window.isActive:
+                    window.activate()
+                    wait_until(lambda: window.isActive, focus_timeout)
+                if window.isActive:
+                    return window
+            except Exception as e:
+                print(f"Error activating window {window.title}: {str(e)}")
+    print("No suitable browser window found")
+    return None
+
+
+def is_fullscreen_active(grabber, browser_window=None):
+    """Check if the current screen matches the full screen resolution."""
+    import pyautogui
+    screen_width, screen_height = pyautogui.size()
+    screenshot_width, screenshot_height = grabber.screen_size()
+
+    # Stricter threshold: 98% of screen size
+    is_fullscreen = (screenshot_width >= screen_width * 0.98 and
+                     screenshot_height >= screen_height * 0.98)
+
+    # Additional check with pygetwindow if available
+    if load_pygetwindow():
+        browser_window = browser_window or find_browser_window()
+        if browser_window:
+            try:
+                win_width, win_height = browser_window.width, browser_window.height
+                win_x, win_y = browser_window.left, browser_window.top
+                print(f"Window size: {win_width}x{win_height}, Position: ({win_x}, {win_y})")
+                # True fullscreen should have minimal offset and match screen size closely
+                is_fullscreen = (is_fullscreen and
+                                 win_width >= screen_width * 0.98 and
+                                 win_height >= screen_height * 0.98 and
+                                 win_x <= 5 and win_y <= 5)
+            except Exception as e:
+                print(f"Error checking window size with pygetwindow: {str(e)}")
+
+    print(f"Screen: {screen_width}x{screen_height}, Screenshot: {screenshot_width}x{screenshot_height}, "
+          f"Fullscreen detected: {is_fullscreen}")
+    return is_fullscreen
+
+
+class WindowPreparer:
+    """State machine that focuses the browser and sets its fullscreen mode.
+
+    States run in order FIND -> FOCUS -> CHECK -> (TOGGLE -> VERIFY) -> SETTLE,
+    going back to FOCUS when a toggle didn't take, up to max_attempts times.
+    ready is an optional threading.Event the GUI sets once it has minimized.
+    run() returns (is_fullscreen, bbox), where bbox is the browser window's
+    screen region when capture_window is set and a window was found.
+    """
+
+    FIND, FOCUS, CHECK, TOGGLE, VERIFY, SETTLE, DONE = "find", "focus", "check", "toggle", "verify", "settle", "done"
+
+    def __init__(self, desired_fullscreen, grabber, capture_window=True, ready=None, on_status=print,
+                 max_attempts=MAX_ATTEMPTS):
+        self.desired_fullscreen = desired_fullscreen
+        self.grabber = grabber
+        self.capture_window = capture_window
+        self.ready = ready
+        self.on_status = on_status
+        self.max_attempts = max_attempts
+        self.cancelled = threading.Event()
+        self.window = None
+        self.attempt = 0
+        self.forced = False
+        self.fallback = ""
+        self.result = (False, None)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def wait_for_screen(self, timeout):
+        """Wait until the screen stops changing; returns the seconds waited."""
+        from settle import SettleWaiter
+        waiter = SettleWaiter(timeout, interval=TRANSITION_INTERVAL, stable_polls=TRANSITION_STABLE_POLLS,
+                              grab=self.grabber.grab)
+        latency, _ = waiter.wait()
+        return latency
+
+    def is_fullscreen_active(self):
+        return is_fullscreen_active(self.grabber, self.window)
+
+    def run(self):
+        handlers = {self.FIND: self.find, self.FOCUS: self.focus, self.CHECK: self.check,
+                    self.TOGGLE: self.toggle, self.VERIFY: self.verify, self.SETTLE: self.settle}
+        state = self.FIND
+        start = time.perf_counter()
+        while state != self.DONE and not self.cancelled.is_set():
+            try:
+                state = handlers[state]()
+            except Exception as e:
+                print(f"Error with browser window adjustment: {str(e)}")
+                if state == self.SETTLE:
+                    break
+                state = self.FOCUS if self.attempt < self.max_attempts else self.SETTLE
+        print(f"Window preparation took {time.perf_counter() - start:.2f}s")
+        return self.result
+
+    def find(self):
+        self.on_status("Adjusting window mode...")
+        if self.ready is not None:
+            self.ready.wait(MINIMIZE_TIMEOUT)
+        self.window = find_browser_window()
+        if not self.window:
+            print("Falling back to pyautogui")
+            self.fallback = " (fallback)"
+        return self.FOCUS
+
+    def focus(self):
+        self.attempt += 1
+        print(f"Fullscreen adjustment attempt {self.attempt}/{self.max_attempts}")
+        if self.window:
+            self.window.activate()
+            wait_until(lambda: self.window.isActive, FOCUS_TIMEOUT, cancel=self.cancelled)
+        else:
+            import pyautogui
+            pyautogui.moveTo(50, 50)
+            pyautogui.click()
+            self.wait_for_screen(FOCUS_TIMEOUT)
+        return self.CHECK
+
+    def check(self):
+        current_fullscreen = self.is_fullscreen_active()
+        print(f"Desired fullscreen: {self.desired_fullscreen}, Current fullscreen: {current_fullscreen}")
+        if self.desired_fullscreen != current_fullscreen:
+            self.forced = False
+            return self.TOGGLE
+        # Force one toggle attempt if detection might be wrong
+        if self.attempt == 1 and self.desired_fullscreen:
+            print(f"Forcing fullscreen toggle due to potential detection error{self.fallback}")
+            self.forced = True
+            return self.TOGGLE
+        self.on_status(f"Already in {'fullscreen' if current_fullscreen else 'normal'} mode{self.fallback}")
+        return self.SETTLE
+
+    def toggle(self):
+        import pyautogui
+        print(f"Toggling fullscreen with F11 (desired: {self.desired_fullscreen}){self.fallback}")
+        pyautogui.hotkey('f11')
+        return self.VERIFY
+
+    def verify(self):
+        latency = self.wait_for_screen(TRANSITION_TIMEOUT)
+        print(f"Window transition settled in {latency:.2f}s")
+        if self.is_fullscreen_active() == self.desired_fullscreen:
+            if self.forced:
+                self.on_status(f"Switched to fullscreen mode (forced{', fallback' if self.fallback else ''})")
+            else:
+                self.on_status(f"Switched to {'fullscreen' if self.desired_fullscreen else 'normal'} mode{self.fallback}")
+            return self.SETTLE
+        print(f"Fullscreen toggle failed{self.fallback} on attempt {self.attempt}")
+        if self.attempt < self.max_attempts:
+            return self.FOCUS
+        self.on_status(f"Failed to {'enter' if self.desired_fullscreen else 'exit'} fullscreen - press F11 manually")
+        print("Warning: All fullscreen adjustment attempts failed")
+        return self.SETTLE
+
+    def settle(self):
+        # Let the page finish redrawing after the mode change before the first frame is taken
+        self.on_status("Waiting for the page to settle...")
+        latency = self.wait_for_screen(SETTLE_TIMEOUT)
+        print(f"Screen settled {latency:.2f}s after window preparation")
+
+        is_fullscreen = self.is_fullscreen_active()
+        bbox = None
+        if self.capture_window:
+            window = self.window or find_browser_window()
+            if window:
+                bbox = window_bbox(window, self.grabber.screen_size())
+            print(f"Capture region: {bbox or 'full screen'}")
+        self.result = (is_fullscreen, bbox)
+        return self.DONE